@@ -0,0 +1,97 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Compares reading every sensor each frame through the synchronous and asyncio APIs.
+
+RacecarSimServer stands in for RacecarSim and sends frames as soon as the previous
+one is finished, optionally delaying every datagram to simulate a network link.
+Each frame reads the color image, depth image, lidar scan, and IMU, either one
+request at a time, in a single snapshot, or with every request in flight at once
+from a coroutine update function.
+
+Run with RacecarSim closed, since the stand-in server binds the RacecarSim ports:
+    python3 bench_async_transport.py [num_frames]
+"""
+
+import asyncio
+import sys
+
+import numpy as np
+
+sys.path.insert(1, "../library")
+sys.path.insert(1, "../library/simulation")
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer
+
+
+def read_sync(rc: RacecarSim) -> None:
+    rc.camera.get_color_image_no_copy()
+    rc.camera.get_depth_image()
+    rc.lidar.get_samples()
+    rc.physics.get_linear_acceleration()
+    rc.physics.get_angular_velocity()
+
+
+async def read_async(rc: RacecarSim) -> None:
+    await asyncio.gather(
+        rc.camera.fetch_color_image_no_copy(),
+        rc.camera.fetch_depth_image(),
+        rc.lidar.fetch_samples(),
+        rc.physics.fetch_linear_acceleration(),
+        rc.physics.fetch_angular_velocity(),
+    )
+
+
+def run(
+    name: str,
+    version: int,
+    latency: float,
+    num_frames: int,
+    snapshot: bool,
+    update,
+) -> None:
+    server = RacecarSimServer(
+        max_version=version, tick_rate=0, max_frames=num_frames, latency=latency
+    )
+    server.start()
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+        rc.set_snapshot_mode(snapshot)
+        if asyncio.iscoroutinefunction(update):
+            # go only uses the event loop if a user function is a coroutine function
+            async def async_update():
+                await update(rc)
+
+            rc.set_start_update(lambda: None, async_update)
+        else:
+            rc.set_start_update(lambda: None, lambda: update(rc))
+        rc.go()
+    finally:
+        server.stop()
+
+    # Skip start and the first few updates, which include one-time allocations
+    frame_times = np.array(server.frame_times[5:]) * 1000
+    print(
+        f"{name:>9} (v{version}) | "
+        f"{latency * 1000:.1f} ms latency | "
+        f"mean {frame_times.mean():>5.2f} ms | "
+        f"p50 {np.percentile(frame_times, 50):>5.2f} ms | "
+        f"p95 {np.percentile(frame_times, 95):>5.2f} ms"
+    )
+
+
+def main() -> None:
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    for latency in (0.0, 0.001):
+        run("sync", 1, latency, num_frames, False, read_sync)
+        run("sync", 3, latency, num_frames, False, read_sync)
+        run("snapshot", 3, latency, num_frames, True, read_sync)
+        run("asyncio", 1, latency, num_frames, False, read_async)
+        run("asyncio", 3, latency, num_frames, False, read_async)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Measures how long lidar, IMU, and controller messages wait behind camera decoding.
+
+Fake messages are fed straight into the callbacks of the real sensor modules at each
+sensor's rate: JPEG color images at 30 Hz, scans at 10 Hz, accelerometer and
+gyroscope samples at 63 and 200 Hz, and controller state at 50 Hz.  In serial mode
+every callback runs on one thread, as under the single threaded executor; in
+isolated mode each callback group runs on its own thread, as under RacecarReal's
+multithreaded executor.  The delay from each message's delivery until its callback
+finishes is reported for each sensor.
+
+Run on the car, since the modules create ROS nodes (no messages are published):
+    python3 bench_callback_isolation.py [seconds] [width] [height]
+"""
+
+import concurrent.futures
+import sys
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+import cv2 as cv
+import numpy as np
+import rclpy as ros2
+
+sys.path.insert(1, "../library")
+sys.path.insert(1, "../library/real")
+from camera_real import CameraReal
+from controller_real import ControllerReal
+from lidar_real import LidarReal
+from physics_real import PhysicsReal
+
+
+def make_sources(
+    width: int, height: int
+) -> List[Tuple[str, str, float, Callable, SimpleNamespace]]:
+    """
+    Returns the name, callback group, rate, callback, and fake message of each sensor.
+    """
+    camera = CameraReal()
+    lidar = LidarReal()
+    physics = PhysicsReal()
+    controller = ControllerReal(None)
+
+    # A noisy gradient, so the JPEG costs about as much to decode as a camera image
+    rng = np.random.default_rng(0)
+    image = np.linspace(0, 255, width * height * 3).reshape((height, width, 3))
+    image = (image + rng.integers(0, 32, image.shape)).astype(np.uint8)
+    _, jpeg = cv.imencode(".jpg", image)
+
+    vector = SimpleNamespace(x=0.1, y=9.8, z=0.2)
+    imu = SimpleNamespace(linear_acceleration=vector, angular_velocity=vector)
+    return [
+        (
+            "color",
+            "color",
+            30,
+            camera._CameraReal__color_callback,
+            SimpleNamespace(data=jpeg.tobytes()),
+        ),
+        (
+            "lidar",
+            "lidar",
+            10,
+            lidar._LidarReal__scan_callback,
+            SimpleNamespace(ranges=list(np.full(720, 1.5))),
+        ),
+        ("accel", "imu", 63, physics._PhysicsReal__accel_callback, imu),
+        ("gyro", "imu", 200, physics._PhysicsReal__gyro_callback, imu),
+        (
+            "controller",
+            "controller",
+            50,
+            controller._ControllerReal__controller_callback,
+            SimpleNamespace(buttons=[0] * 11, axes=[0.0, 0.0, 1.0, 0.0, 0.0, 1.0]),
+        ),
+    ]
+
+
+def run(name: str, sources: List, seconds: float, isolated: bool) -> None:
+    # One single threaded worker per callback group, or one worker for them all
+    groups = sorted({group for _, group, _, _, _ in sources})
+    if isolated:
+        workers = {group: concurrent.futures.ThreadPoolExecutor(1) for group in groups}
+    else:
+        worker = concurrent.futures.ThreadPoolExecutor(1)
+        workers = {group: worker for group in groups}
+
+    delays: Dict[str, List[float]] = {source[0]: [] for source in sources}
+
+    def deliver(sensor: str, callback: Callable, message, due: float) -> None:
+        callback(message)
+        delays[sensor].append(time.monotonic() - due)
+
+    # Deliver every message of every sensor in time order
+    deliveries = sorted(
+        (i / rate, sensor, group, callback, message)
+        for sensor, group, rate, callback, message in sources
+        for i in range(int(seconds * rate))
+    )
+    start = time.monotonic()
+    for offset, sensor, group, callback, message in deliveries:
+        due = start + offset
+        time.sleep(max(due - time.monotonic(), 0))
+        workers[group].submit(deliver, sensor, callback, message, due)
+    for worker in set(workers.values()):
+        worker.shutdown(wait=True)
+
+    print(f"{name}:")
+    for sensor, times in delays.items():
+        times = np.array(times) * 1000
+        print(
+            f"    {sensor:<12}| p50 {np.percentile(times, 50):7.3f} ms | "
+            f"p95 {np.percentile(times, 95):7.3f} ms | max {times.max():7.3f} ms"
+        )
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 640
+    height = int(sys.argv[3]) if len(sys.argv) > 3 else 480
+
+    ros2.init()
+    try:
+        sources = make_sources(width, height)
+        run("serial (single threaded executor)", sources, seconds, False)
+        run("isolated (callback group per sensor)", sources, seconds, True)
+    finally:
+        ros2.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Compares finding a priority list of colors with one cv.inRange pass per color against
+labeling every color at once with ColorSegmenter's lookup tables.
+
+For 1 to 8 of the colors used by the labs, each method finds the pixel count,
+bounding box, and centroid of every color in a 640 x 480 image whose hue varies
+across its columns and whose saturation and value vary down its rows.  Both methods
+convert the image to HSV once per frame.
+
+    python3 bench_color_segmentation.py [num_frames]
+"""
+
+import sys
+import time
+from typing import Callable, List
+
+import cv2 as cv
+import numpy as np
+
+sys.path.insert(1, "../library")
+sys.path.insert(1, "../labs/final")
+from color_segmentation import ColorSegmenter
+import constants
+from group_6.vision import Color
+
+# The colors of labs/final/constants.py, then a red which wraps around from 179 to 0
+# and a white, for 8 in total
+COLORS: List[Color] = [
+    constants.BLUE,
+    constants.YELLOW,
+    constants.GREEN,
+    constants.ORANGE,
+    constants.PURPLE,
+    constants.RED,
+    ((170, 50, 50), (10, 255, 255)),
+    ((0, 0, 200), (179, 40, 255)),
+]
+
+
+def make_image(width: int = 640, height: int = 480) -> np.ndarray:
+    """
+    Returns a color image covering every hue, with saturation and value rising down
+    the rows.
+    """
+    hue = np.tile(np.linspace(0, 179, width), (height, 1))
+    saturation = np.tile(np.linspace(0, 255, height)[:, np.newaxis], (1, width))
+    value = 255 - saturation // 2
+    hsv = np.stack([hue, saturation, value], axis=2).astype(np.uint8)
+    return cv.cvtColor(hsv, cv.COLOR_HSV2BGR)
+
+
+def in_range_loop(image: np.ndarray, colors: List[Color]) -> None:
+    hsv_image = cv.cvtColor(image, cv.COLOR_BGR2HSV)
+    for hsv_lower, hsv_upper in colors:
+        if hsv_lower[0] <= hsv_upper[0]:
+            mask = cv.inRange(hsv_image, hsv_lower, hsv_upper)
+        else:
+            mask = cv.bitwise_or(
+                cv.inRange(hsv_image, hsv_lower, (255, hsv_upper[1], hsv_upper[2])),
+                cv.inRange(hsv_image, (0, hsv_lower[1], hsv_lower[2]), hsv_upper),
+            )
+        cv.countNonZero(mask)
+        cv.boundingRect(mask)
+        cv.moments(mask, True)
+
+
+def make_segmentation(colors: List[Color]) -> Callable[[np.ndarray], None]:
+    segmenter = ColorSegmenter(colors)
+
+    def segmentation(image: np.ndarray) -> None:
+        result = segmenter.segment(image)
+        result.get_counts()
+        for i in range(len(colors)):
+            result.get_bounding_box(i)
+            result.get_centroid(i)
+
+    return segmentation
+
+
+def time_frames(function: Callable[[np.ndarray], None], image, num_frames) -> float:
+    """
+    Returns the median milliseconds taken by function on image.
+    """
+    times = []
+    for _ in range(num_frames):
+        start = time.perf_counter()
+        function(image)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main() -> None:
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    image = make_image()
+
+    print(f"{'colors':>6} | {'inRange loop':>12} | {'segmenter':>9} | speedup")
+    for num_colors in range(1, len(COLORS) + 1):
+        colors = COLORS[:num_colors]
+        loop = time_frames(
+            lambda image: in_range_loop(image, colors), image, num_frames
+        )
+        segmenter = time_frames(make_segmentation(colors), image, num_frames)
+        print(
+            f"{num_colors:>6} | {loop:>9.3f} ms | {segmenter:>6.3f} ms | "
+            f"{loop / segmenter:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Compares finding the closest pixel in the full resolution depth image with finding it
+in the native resolution depth image sent by RacecarSim.
+
+RacecarSimServer stands in for RacecarSim and sends frames as soon as the previous
+one is finished.  Each frame times reading the depth image and running
+get_closest_pixel and get_pixel_average_distance on it.
+
+Run with RacecarSim closed, since the stand-in server binds the RacecarSim ports:
+    python3 bench_depth_native.py [num_frames]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(1, "../library")
+sys.path.insert(1, "../library/simulation")
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer
+import racecar_utils as rc_utils
+
+
+def run(name: str, num_frames: int, native: bool) -> None:
+    server = RacecarSimServer(tick_rate=0, max_frames=num_frames)
+    server.start()
+    times = []
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+
+        def update():
+            start = time.perf_counter()
+            if native:
+                depth_image, scale = rc.camera.get_depth_image_native()
+            else:
+                depth_image, scale = rc.camera.get_depth_image(), 1
+            closest_pixel = rc_utils.get_closest_pixel(depth_image, scale=scale)
+            rc_utils.get_pixel_average_distance(depth_image, closest_pixel, scale=scale)
+            times.append(time.perf_counter() - start)
+
+        rc.set_start_update(lambda: None, update)
+        rc.go()
+    finally:
+        server.stop()
+
+    # Skip the first few updates, which include one-time allocations
+    times = np.array(times[5:]) * 1000
+    print(
+        f"{name:>6} | mean {times.mean():.3f} ms | "
+        f"p95 {np.percentile(times, 95):.3f} ms"
+    )
+
+
+def main() -> None:
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    run("full", num_frames, False)
+    run("native", num_frames, True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Compares the stop-and-wait and windowed fragment protocols of RacecarSim.
+
+RacecarSimServer stands in for RacecarSim and serves 640x480 color images at several
+simulated loss rates.  Each configuration negotiates its protocol version through
+the normal handshake, then requests color images through the async port.
+
+Run with RacecarSim closed, since the stand-in server binds the RacecarSim ports:
+    python3 bench_fragment_protocol.py [num_frames]
+"""
+
+import sys
+import time
+
+sys.path.insert(1, "../library")
+sys.path.insert(1, "../library/simulation")
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer
+
+FRAME_BYTES = 640 * 480 * 4
+
+# (protocol version, drop rate)
+CONFIGURATIONS = [
+    (1, 0.0),
+    (3, 0.0),
+    (3, 0.001),
+    (3, 0.01),
+    (3, 0.05),
+]
+
+
+def run(version: int, drop_rate: float, num_frames: int) -> None:
+    server = RacecarSimServer(
+        max_version=version, drop_rate=drop_rate, auto_start=False
+    )
+    server.start()
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+        rc._RacecarSim__connect()
+
+        start = time.perf_counter()
+        for _ in range(num_frames):
+            rc.camera.get_color_image_async()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    print(
+        f"v{version} | "
+        f"{drop_rate * 100:>5.1f}% loss | "
+        f"{elapsed / num_frames * 1000:>7.2f} ms/frame | "
+        f"{FRAME_BYTES * num_frames / elapsed / 1e6:>7.1f} MB/s | "
+        f"{server.fragments_dropped:>5} dropped | "
+        f"{server.fragments_resent:>5} resent"
+    )
+
+
+def main() -> None:
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for version, drop_rate in CONFIGURATIONS:
+        run(version, drop_rate, num_frames)
+
+    # A single lost fragment stalls the stop-and-wait protocol indefinitely, so it is
+    # only measured without loss
+    print("v1 with any loss: stalls on the first dropped fragment")
+
+
+if __name__ == "__main__":
+    main()
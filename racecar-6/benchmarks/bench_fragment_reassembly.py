@@ -0,0 +1,137 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Measures the cost of reassembling a fragmented RacecarSim color image.
+
+A stand-in sender process serves 640x480 RGBA frames as 32 fragments using the
+stop-and-wait protocol of RacecarSim.  Each frame is then received twice: once with
+the original approach (bytes concatenation, np.frombuffer, and an allocating
+cv.cvtColor) and once through CameraSim, which receives directly into a persistent
+buffer and converts into a new output image.
+
+CameraSim never reuses the output image, since the program may keep each frame's
+image, so its steady-state allocation is that one 640x480 BGR image (0.92 MB) per
+frame; reassembly itself allocates nothing.  Allocations are measured with
+tracemalloc, which also traces numpy arrays.
+
+Run with RacecarSim closed, since the sender binds the RacecarSim port:
+    python3 bench_fragment_reassembly.py [num_frames]
+"""
+
+import multiprocessing
+import socket
+import sys
+import time
+import tracemalloc
+
+import cv2 as cv
+import numpy as np
+
+sys.path.insert(1, "../library")
+sys.path.insert(1, "../library/simulation")
+from racecar_core_sim import RacecarSim
+
+WIDTH = 640
+HEIGHT = 480
+NUM_FRAGMENTS = 32
+FRAME_BYTES = WIDTH * HEIGHT * 4
+FRAGMENT_BYTES = FRAME_BYTES // NUM_FRAGMENTS
+SIM_PORT = ("127.0.0.1", 5065)
+
+
+def serve_frames(ready) -> None:
+    """
+    Serves a color image as 32 fragments each time a request is received.
+    """
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.bind(SIM_PORT)
+    frame = memoryview(np.random.randint(0, 255, FRAME_BYTES, np.uint8).tobytes())
+    ready.set()
+
+    while True:
+        request, address = sender.recvfrom(8)
+        if request[0] == RacecarSim.Header.python_exit:
+            return
+        for i in range(NUM_FRAGMENTS):
+            start = i * FRAGMENT_BYTES
+            sender.sendto(frame[start : start + FRAGMENT_BYTES], address)
+            sender.recvfrom(8)
+
+
+def receive_concatenated(client: socket.socket) -> np.ndarray:
+    """
+    The original reassembly: one new bytes object per fragment and per concatenation.
+    """
+    client.sendto(bytes([RacecarSim.Header.camera_get_color_image]), SIM_PORT)
+    raw_bytes: bytes = bytes()
+    for i in range(NUM_FRAGMENTS):
+        data, _ = client.recvfrom(FRAGMENT_BYTES)
+        raw_bytes += data
+        client.sendto(bytes([RacecarSim.Header.python_send_next]), SIM_PORT)
+
+    color_image = np.frombuffer(raw_bytes, dtype=np.uint8)
+    color_image = np.reshape(color_image, (HEIGHT, WIDTH, 4), "C")
+    return cv.cvtColor(color_image, cv.COLOR_RGB2BGR)
+
+
+def measure(name: str, receive_frame, num_frames: int) -> None:
+    # Warm up so that persistent buffers are already allocated
+    for _ in range(3):
+        receive_frame()
+
+    # Time the frames without tracing, since tracemalloc slows down allocation
+    start = time.perf_counter()
+    for _ in range(num_frames):
+        receive_frame()
+    elapsed = time.perf_counter() - start
+
+    # The peak traced memory above the baseline is the transient allocation per frame
+    tracemalloc.start()
+    total_allocated = 0
+    for _ in range(num_frames):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        receive_frame()
+        _, peak = tracemalloc.get_traced_memory()
+        total_allocated += peak - current
+    tracemalloc.stop()
+
+    print(
+        f"{name:>14} | "
+        f"{total_allocated / num_frames / 1e6:>7.2f} MB allocated/frame | "
+        f"{elapsed / num_frames * 1000:>6.2f} ms/frame"
+    )
+
+
+def main() -> None:
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    ready = multiprocessing.Event()
+    sender = multiprocessing.Process(target=serve_frames, args=(ready,), daemon=True)
+    sender.start()
+    ready.wait()
+
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    measure("concatenation", lambda: receive_concatenated(client), num_frames)
+
+    # CameraSim receives every fragment in place, and allocates only the output image
+    rc = RacecarSim(True)
+    camera = rc.camera
+    measure(
+        "recv_into",
+        lambda: (
+            camera.get_color_image_no_copy(),
+            camera._CameraSim__update(),
+        ),
+        num_frames,
+    )
+    print(f"{'output image':>14} | {WIDTH * HEIGHT * 3 / 1e6:>7.2f} MB")
+
+    client.sendto(bytes([RacecarSim.Header.python_exit]), SIM_PORT)
+    sender.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Measures the end-to-end frame time of an unmodified lab program in simulation mode.
+
+RacecarSimServer stands in for RacecarSim and sends frames as soon as the previous
+one is finished, so the frame time is the time from sending unity_update until the
+program reports python_finished, including every sensor request made in between.
+
+Run with RacecarSim closed, since the stand-in server binds the RacecarSim ports:
+    python3 bench_lab_frame_time.py [lab] [num_frames] [max_version]
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+sys.path.insert(1, "../library")
+sys.path.insert(1, "../library/simulation")
+from racecar_sim_server import RacecarSimServer
+
+
+def main() -> None:
+    lab = sys.argv[1] if len(sys.argv) > 1 else "../labs/final/grand_prix.py"
+    num_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+    max_version = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    server = RacecarSimServer(
+        max_version=max_version, tick_rate=0, max_frames=num_frames
+    )
+    server.start()
+    try:
+        # Labs import the library relative to their own directory
+        program = subprocess.Popen(
+            [sys.executable, os.path.basename(lab), "-s", "-h", "-n"],
+            cwd=os.path.dirname(lab),
+            stdout=subprocess.DEVNULL,
+        )
+        server.wait()
+        program.wait()
+    finally:
+        server.stop()
+
+    # Skip start and the first few updates, which include one-time allocations
+    frame_times = np.array(server.frame_times[5:]) * 1000
+    p50, p95, p99 = np.percentile(frame_times, (50, 95, 99))
+    print(
+        f"{os.path.basename(lab)} (v{max_version}) | "
+        f"{len(frame_times)} frames | "
+        f"mean {frame_times.mean():.2f} ms | "
+        f"p50 {p50:.2f} ms | p95 {p95:.2f} ms | p99 {p99:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Compares frame times with and without prefetching the sensors read by update.
+
+RacecarSimServer stands in for RacecarSim (over UDP, without shared memory) and
+sends frames as soon as the previous one is finished.  Each update first runs some
+image processing which does not depend on this frame's sensors, then reads the color
+image, lidar samples, and angular velocity.  With prefetching, the sensors are
+received while the image processing runs.
+
+The saving depends on a free core: RacecarSimServer runs in this process, so on a
+single core the server, the prefetch thread, and the image processing take turns.
+
+Run with RacecarSim closed, since the stand-in server binds the RacecarSim ports:
+    python3 bench_prefetch.py [num_frames]
+"""
+
+import sys
+
+import cv2 as cv
+import numpy as np
+
+sys.path.insert(1, "../library")
+sys.path.insert(1, "../library/simulation")
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer
+
+
+def run(name: str, num_frames: int, prefetch: bool) -> None:
+    server = RacecarSimServer(max_version=3, tick_rate=0, max_frames=num_frames)
+    server.start()
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+        if prefetch:
+            rc.set_prefetch(camera=True, lidar=True, physics=True)
+
+        # Stands in for work on the previous frame's results, which (like most
+        # OpenCV and NumPy calls) releases the GIL while it runs
+        previous = np.zeros((480, 640, 3), np.uint8)
+
+        def update():
+            cv.GaussianBlur(previous, (31, 31), 0)
+            image = rc.camera.get_color_image_no_copy()
+            rc.lidar.get_samples()
+            rc.physics.get_angular_velocity()
+            np.copyto(previous, image)
+
+        rc.set_start_update(lambda: None, update)
+        rc.go()
+    finally:
+        server.stop()
+
+    # Skip start and the first few updates, which include one-time allocations
+    frame_times = np.array(server.frame_times[5:]) * 1000
+    timing = rc.get_prefetch_timing()
+    print(
+        f"{name:>11} | frame mean {frame_times.mean():.2f} ms | "
+        f"p95 {np.percentile(frame_times, 95):.2f} ms | "
+        f"fetch {timing.fetch_time * 1000:.2f} ms | "
+        f"saved {timing.time_saved * 1000:.2f} ms"
+    )
+
+
+def main() -> None:
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    run("on demand", num_frames, False)
+    run("prefetch", num_frames, True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Measures how quickly an unmodified lab program replays a log of sensor data.
+
+A log of the synthetic hallway served by RacecarSimServer is written to a temporary
+directory, then the lab is run with the -r flag, which replays every frame as fast
+as the program can run and prints its frame time statistics.
+
+    python3 bench_replay.py [lab] [num_frames]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2 as cv
+import numpy as np
+
+sys.path.insert(1, "../library")
+sys.path.insert(1, "../library/simulation")
+from racecar_sim_server import SyntheticSensors
+
+
+def write_log(path: str, num_frames: int) -> None:
+    """
+    Records num_frames frames of a car driving down the synthetic hallway.
+    """
+    sensors = SyntheticSensors()
+    color = np.lib.format.open_memmap(
+        os.path.join(path, "color.npy"), "w+", np.uint8, (num_frames, 480, 640, 3)
+    )
+    depth = np.empty((num_frames, 60, 80), np.float32)
+    lidar = np.empty((num_frames, 720), np.float32)
+    linear_acceleration = np.empty((num_frames, 3), np.float32)
+    angular_velocity = np.empty((num_frames, 3), np.float32)
+
+    for i in range(num_frames):
+        frame = sensors.read(1 / 60, 0.25, 0.1)
+        rgba = np.frombuffer(frame.color, np.uint8).reshape((480, 640, 4))
+        cv.cvtColor(rgba, cv.COLOR_RGBA2BGR, color[i])
+        depth[i] = frame.depth
+        lidar[i] = frame.lidar
+        linear_acceleration[i] = frame.linear_acceleration
+        angular_velocity[i] = frame.angular_velocity
+    color.flush()
+
+    np.save(os.path.join(path, "delta_time.npy"), np.full(num_frames, 1 / 60, "f4"))
+    np.save(os.path.join(path, "depth.npy"), depth)
+    np.save(os.path.join(path, "lidar.npy"), lidar)
+    np.save(os.path.join(path, "linear_acceleration.npy"), linear_acceleration)
+    np.save(os.path.join(path, "angular_velocity.npy"), angular_velocity)
+
+
+def main() -> None:
+    lab = os.path.abspath(
+        sys.argv[1] if len(sys.argv) > 1 else "../labs/final/grand_prix.py"
+    )
+    num_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+
+    with tempfile.TemporaryDirectory() as path:
+        write_log(path, num_frames)
+
+        # Labs import the library relative to their own directory
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, os.path.basename(lab), "-r", path, "-h"],
+            cwd=os.path.dirname(lab),
+            stdout=subprocess.PIPE,
+            check=True,
+            text=True,
+        )
+        for line in result.stdout.splitlines():
+            if line.startswith(">> Replayed"):
+                print(line)
+        print(
+            f"{os.path.basename(lab)} | {num_frames} frames "
+            f"({num_frames / 60:.1f} s of driving) | "
+            f"replayed in {time.perf_counter() - start:.2f} s including startup"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Measures the cost of sensor logging to the frame loop.
+
+RacecarSimServer stands in for RacecarSim at 60 frames per second, the program reads
+the color image and lidar scan each frame, and every frame is logged with
+SensorLogWriter.  The time spent logging on the control thread (which reads the
+sensor budget task's timings) is reported, along with how many frames the
+background writer had to drop.
+
+Run with RacecarSim closed, since the stand-in server binds the RacecarSim ports:
+    python3 bench_sensor_log.py [num_frames] [tick_rate]
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(1, "../library")
+sys.path.insert(1, "../library/simulation")
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer
+from sensor_log import SensorLogReader
+
+
+def main() -> None:
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    tick_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 60
+
+    with tempfile.TemporaryDirectory() as path:
+        server = RacecarSimServer(tick_rate=tick_rate, max_frames=num_frames)
+        server.start()
+        try:
+            rc = RacecarSim(True)
+            rc.set_protocol_negotiation()
+            writer = rc.start_logging(path)
+
+            def update() -> None:
+                rc.camera.get_color_image()
+                rc.lidar.get_samples()
+
+            rc.set_start_update(lambda: None, update)
+            rc.go()
+        finally:
+            server.stop()
+
+        [task] = [
+            task for task in rc.frame_budget.get_tasks() if task.name == "sensor_log"
+        ]
+        size = sum(
+            os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+        )
+        reader = SensorLogReader(path)
+        print(
+            f"log_frame | mean {task.total_time / max(task.runs, 1) * 1000:.3f} ms | "
+            f"max {task.max_time * 1000:.3f} ms"
+        )
+        print(
+            f"{writer.frames_written} frames written, "
+            f"{writer.frames_dropped} dropped, "
+            f"{size / max(reader.num_frames, 1) / 1024:.1f} KiB per frame"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Compares reading the color image, depth image, and lidar scan each frame over UDP and
+through the shared memory sensor ring.
+
+RacecarSimServer stands in for RacecarSim and sends frames as soon as the previous
+one is finished.  Over UDP, each frame reads the sensors either one request at a
+time or in a single snapshot; with shared memory, the server writes every frame to
+the ring and the sensors are read from it without any requests.
+
+Run with RacecarSim closed, since the stand-in server binds the RacecarSim ports:
+    python3 bench_shared_memory.py [num_frames]
+"""
+
+import sys
+
+import numpy as np
+
+sys.path.insert(1, "../library")
+sys.path.insert(1, "../library/simulation")
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer
+
+
+def run(name: str, version: int, num_frames: int, snapshot: bool) -> None:
+    server = RacecarSimServer(max_version=version, tick_rate=0, max_frames=num_frames)
+    server.start()
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+        rc.set_snapshot_mode(snapshot)
+
+        def update():
+            rc.camera.get_color_image_no_copy()
+            rc.camera.get_depth_image()
+            rc.lidar.get_samples()
+
+        rc.set_start_update(lambda: None, update)
+        rc.go()
+    finally:
+        server.stop()
+
+    # Skip start and the first few updates, which include one-time allocations
+    frame_times = np.array(server.frame_times[5:]) * 1000
+    print(
+        f"{name:>13} (v{version}) | "
+        f"mean {frame_times.mean():>5.2f} ms | "
+        f"p50 {np.percentile(frame_times, 50):>5.2f} ms | "
+        f"p95 {np.percentile(frame_times, 95):>5.2f} ms"
+    )
+
+
+def main() -> None:
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    run("udp", 3, num_frames, False)
+    run("udp snapshot", 3, num_frames, True)
+    run("shared memory", 4, num_frames, True)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,11 +33,14 @@ from states import CenterWallFollowing, SideWallFollowing
 rc = racecar_core.create_racecar()
 speed_limiter = RateLimiter(0.2)
 
+# Seconds between searches for AR markers
+AR_MARKER_PERIOD = 0.1
+
 # Add any global variables here
 
 current_state: State
 current_data: RobotData # read only data for passing to states
-# visible_tags: List[rc_utils.ARMarker] = []
+visible_tags: List[rc_utils.ARMarker] = []
 odometry = IMUOdometry()
 
 
@@ -56,6 +59,9 @@ def start():
 
     rc.set_update_slow_time(0.5)
 
+    # AR marker detection is too slow to run every frame
+    rc.schedule_periodic(update_ar_markers, AR_MARKER_PERIOD)
+
     # Print start message
     print(">> Final Challenge - Grand Prix")
 
@@ -73,14 +79,11 @@ def update():
 
     image = rc.camera.get_color_image()
 
-    odometry.update_odometry(
-        rc.physics.get_linear_acceleration(),
-        rc.physics.get_angular_velocity()
-    )
+    odometry.update_odometry(*rc.physics.get_imu())
 
     current_data = RobotData(
         image=image,
-        visible_tags=rc_utils.get_ar_markers(image),
+        visible_tags=visible_tags,
         lidar_scan=rc.lidar.get_samples()
     )
 
@@ -96,6 +99,16 @@ def update():
     rc.drive.set_speed_angle(speed, angle)
 
 
+def update_ar_markers() -> None:
+    """
+    Finds the AR markers in the most recent image, run every AR_MARKER_PERIOD seconds
+    """
+
+    global visible_tags
+
+    visible_tags = rc_utils.get_ar_markers(current_data.image)
+
+
 ########################################################################################
 # DO NOT MODIFY: Register start and update and begin execution
 ########################################################################################
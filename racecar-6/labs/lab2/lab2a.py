@@ -160,7 +160,7 @@ def update_contour():
     global screen_width
     global color_index
 
-    image = rc.camera.get_color_image()
+    image = rc.camera.get_color_image_copy()
 
     if image is None:
         contour_center = None
@@ -86,7 +86,7 @@ def update_contour():
     global contour_area
     global screen_width
 
-    image = rc.camera.get_color_image()
+    image = rc.camera.get_color_image_copy()
 
     if image is None:
         contour_center = None
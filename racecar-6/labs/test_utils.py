@@ -96,7 +96,7 @@ def update():
 
     # Find and display the largest red contour in the color image
     if rc.controller.was_pressed(rc.controller.Button.B):
-        image = rc.camera.get_color_image()
+        image = rc.camera.get_color_image_copy()
         contours = rc_utils.find_contours(image, RED[0], RED[1])
         largest_contour = rc_utils.get_largest_contour(contours)
 
@@ -171,7 +171,7 @@ def update():
 
     # Identify AR markers
     if rc.controller.was_pressed(rc.controller.Button.RB):
-        image = rc.camera.get_color_image()
+        image = rc.camera.get_color_image_copy()
         markers = rc_utils.get_ar_markers(image, COLORS)
         for i in range(len(markers)):
             print(f"AR Marker {i}:")
@@ -7,10 +7,13 @@ Defines the interface of the Camera module of the racecar_core library.
 """
 
 import abc
-import copy
+from typing import Any, Optional, Tuple
 import numpy as np
 from nptyping import NDArray
 
+import image_context
+import image_pool
+
 
 class Camera(abc.ABC):
     """
@@ -21,12 +24,26 @@ class Camera(abc.ABC):
     _WIDTH: int = 640
     _HEIGHT: int = 480
 
+    # The factors by which set_processing_scale may divide the width and height, which
+    # are the reductions supported by OpenCV's reduced JPEG decoding
+    _REDUCTIONS = (1, 2, 4, 8)
+
+    # The factor by which the width and height of the images are currently divided
+    _reduction: int = 1
+
     # Maximum range of the depth camera (in cm)
     _MAX_RANGE = 1200
 
+    # The sequence number of the current color frame, which each camera module
+    # advances with _start_color_frame once it captures a new frame
+    _color_frame: int = 0
+
+    # The context of the color image returned by get_color_image in the current frame
+    _color_context: Optional[image_context.ImageContext] = None
+
     def get_color_image(self) -> NDArray[(480, 640, 3), np.uint8]:
         """
-        Returns a deep copy of the current color image captured by the camera.
+        Returns a read-only view of the current color image captured by the camera.
 
         Returns:
             An array representing the pixels in the image, organized as follows
@@ -37,20 +54,65 @@ class Camera(abc.ABC):
         Note:
             Each color value ranges from 0 to 255.
 
-            This function returns a deep copy of the captured image. This means that
-            we can modify the returned image and it will not change the image returned
-            by future calls to get_color_image().
+            The returned image is not copied, but it is write-protected: modifying it
+            raises a ValueError instead of changing the images returned by other
+            calls to get_color_image().  Each frame's image is captured into new
+            memory, so an image kept from an earlier frame never changes.  To draw on
+            the image or otherwise modify it, use get_color_image_copy().
+
+            Every call in the same frame returns the same view, so color queries such
+            as rc_utils.find_contours() convert the frame to the hue-saturation-value
+            format once, and share the conversion between crops of the frame.
 
         Example::
 
-            # Initialize image with a deep copy of the most recent color image captured
-            # by the camera
+            # Initialize image with a read-only view of the most recent color image
+            # captured by the camera
             image = rc.camera.get_color_image()
 
             # Store the amount of blue in the pixel on row 3, column 5
             blue = image[3][5][0]
+
+            # The drawing functions of racecar_utils require a writable copy
+            image_copy = rc.camera.get_color_image_copy()
+            rc_utils.draw_circle(image_copy, (50, 50))
+        """
+        return self.__get_color_context(self.get_color_image_no_copy())
+
+    def get_color_image_copy(self) -> NDArray[(480, 640, 3), np.uint8]:
+        """
+        Returns a writable copy of the current color image captured by the camera.
+
+        Returns:
+            The same image as get_color_image(), which may be modified.
+
+        Note:
+            The copy is made into a buffer released by release_color_image_copy()
+            when one is available, so a program which releases each frame's copy
+            does not allocate a new one each frame.
+
+        Example::
+
+            # Black out the top half of the image
+            image = rc.camera.get_color_image_copy()
+            image[: rc.camera.get_height() // 2] = 0
+            rc.display.show_color_image(image)
+
+            # Let the next frame's copy reuse the buffer
+            rc.camera.release_color_image_copy(image)
+        """
+        return image_pool.get_default().acquire(self.get_color_image_no_copy())
+
+    def release_color_image_copy(self, image: NDArray[(480, 640, 3), np.uint8]) -> None:
         """
-        return copy.deepcopy(self.get_color_image_no_copy())
+        Hands back a copy returned by get_color_image_copy(), so that a later copy can
+        reuse its buffer.
+
+        Args:
+            image: The copy, which must not be used (nor any view of it, such as a
+                crop) after it is released.
+        """
+        image_pool.get_default().release(image)
 
     @abc.abstractmethod
     def get_color_image_no_copy(self) -> NDArray[(480, 640, 3), np.uint8]:
@@ -66,19 +128,23 @@ class Camera(abc.ABC):
         Warning:
             Do not modify the returned image. The returned image is a reference to the
             captured image, so any changes will also affect the images returned by any
-            future calls to get_color_image() or get_color_image_no_copy().
+            other calls to get_color_image() or get_color_image_no_copy() in the same
+            frame.  Use get_color_image(), which is equally efficient, to have such
+            changes raise an error instead.
 
         Note:
             Each color value ranges from 0 to 255.
 
-            Unlike get_color_image(), this function does not create a deep copy of the
-            captured image, and is therefore more efficient.
+            Like get_color_image(), this function does not copy the captured image,
+            but the returned image is not write-protected.  Each frame's image is
+            captured into new memory, so the returned image stays valid, and is not
+            changed by later frames, for as long as the program keeps it.
 
         Example::
 
             # Initialize image with a direct reference to the recent color image
             # captured by the camera
-            image = rc.camera.get_color_image()
+            image = rc.camera.get_color_image_no_copy()
 
             # Store the amount of blue in the pixel on row 3, column 5
             blue = image[3][5][0]
@@ -86,10 +152,9 @@ class Camera(abc.ABC):
             # We can safely call crop because it does not modify the source image
             cropped_image = rc_utils.crop(image, (0, 0), (10, 10))
 
-            # However, if we wish to draw on the image, we must first create a manual
-            # copy with copy.deepcopy()
-            image_copy = copy.deepcopy(image)
-            modified_image = rc_utils.draw_circle(image_copy, (50, 50))
+            # However, if we wish to draw on the image, we must first create a copy
+            image_copy = rc.camera.get_color_image_copy()
+            rc_utils.draw_circle(image_copy, (50, 50))
         """
         pass
 
@@ -140,6 +205,42 @@ class Camera(abc.ABC):
         """
         pass
 
+    def get_depth_image_native(self) -> Tuple[NDArray[(Any, Any), np.float32], int]:
+        """
+        Returns the current depth image at the resolution of the depth sensor.
+
+        Returns:
+            The depth image (in cm) before it is resized to the width and height of
+            the color image, and its scale: the number of color image pixels spanned
+            by each depth pixel along each axis.
+
+        Note:
+            In simulation, the depth sensor has a lower resolution than the color
+            image (80 x 60 pixels, a scale of 8), and get_depth_image() interpolates
+            it up to full resolution.  Processing the native image instead touches
+            1/64 of the pixels.  On the physical car, the depth image already has full
+            resolution and the scale is 1.
+
+            Pixel (row, col) of the native image covers pixels (row * scale, col *
+            scale) to ((row + 1) * scale - 1, (col + 1) * scale - 1) of the color
+            image.
+
+            Like the color image, each frame's depth image is captured into new
+            memory, so the returned image is not changed by later frames.
+
+        Warning:
+            Do not modify the returned image, which may be the image returned by
+            get_depth_image(), or the image it is resized from.
+
+        Example::
+
+            depth_image, scale = rc.camera.get_depth_image_native()
+
+            # Find the closest pixel, in color image coordinates
+            closest_pixel = rc_utils.get_closest_pixel(depth_image, scale=scale)
+        """
+        return self.get_depth_image(), 1
+
     @abc.abstractmethod
     def get_depth_image_async(self) -> NDArray[(480, 640), np.float32]:
         """
@@ -163,9 +264,121 @@ class Camera(abc.ABC):
         """
         pass
 
+    async def fetch_color_image(self) -> NDArray[(480, 640, 3), np.uint8]:
+        """
+        Returns a read-only view of the current color image, waiting without
+        blocking.
+
+        Returns:
+            The same image as get_color_image().
+
+        Note:
+            This function may only be awaited from a coroutine start or update
+            function.  In simulation, the image is requested without blocking, so that
+            other sensor requests can be made while it is received.
+
+        Example::
+
+            # Receive the color image and the lidar scan at the same time
+            async def update():
+                image, scan = await asyncio.gather(
+                    rc.camera.fetch_color_image(), rc.lidar.fetch_samples()
+                )
+        """
+        return self.__get_color_context(await self.fetch_color_image_no_copy())
+
+    async def fetch_color_image_no_copy(self) -> NDArray[(480, 640, 3), np.uint8]:
+        """
+        Returns a direct reference to the current color image, waiting without
+        blocking.
+
+        Returns:
+            The same image as get_color_image_no_copy().
+
+        Warning:
+            Do not modify the returned image (see get_color_image_no_copy()).
+
+        Example::
+
+            async def update():
+                image = await rc.camera.fetch_color_image_no_copy()
+        """
+        return self.get_color_image_no_copy()
+
+    async def fetch_depth_image(self) -> NDArray[(480, 640), np.float32]:
+        """
+        Returns the current depth image, waiting without blocking.
+
+        Returns:
+            The same image as get_depth_image().
+
+        Example::
+
+            async def update():
+                depth_image = await rc.camera.fetch_depth_image()
+        """
+        return self.get_depth_image()
+
+    async def fetch_depth_image_native(
+        self,
+    ) -> Tuple[NDArray[(Any, Any), np.float32], int]:
+        """
+        Returns the current depth image at the resolution of the depth sensor,
+        waiting without blocking.
+
+        Returns:
+            The same image and scale as get_depth_image_native().
+
+        Example::
+
+            async def update():
+                depth_image, scale = await rc.camera.fetch_depth_image_native()
+        """
+        return self.get_depth_image_native()
+
+    def set_processing_scale(self, scale: float = 1.0) -> None:
+        """
+        Sets the scale of the color and depth images relative to full resolution.
+
+        Args:
+            scale: The fraction of the full width and height at which images are
+                returned: 1, 0.5, 0.25, or 0.125.
+
+        Note:
+            Many pipelines, such as finding contours or AR markers, work just as well
+            at lower resolution, and every pixel operation on an image at a scale of
+            0.5 touches a quarter of the pixels.  The images are reduced before they
+            reach the program: the physical car decodes the camera's JPEG images at
+            the reduced size, and RacecarSim sends smaller images.
+
+            get_width() and get_height() return the reduced size, and the depth image
+            is reduced to match the color image, so pixel coordinates found in one
+            image can be used in the other.  Thresholds measured in pixels, such as a
+            minimum contour area, shrink with the image.
+
+        Example::
+
+            # Process 320 x 240 images instead of 640 x 480 images
+            rc.camera.set_processing_scale(0.5)
+        """
+        reduction = round(1 / scale) if scale > 0 else 0
+        assert (
+            reduction in self._REDUCTIONS and reduction * scale == 1
+        ), f"scale [{scale}] must be 1, 0.5, 0.25, or 0.125."
+        self._reduction = reduction
+        self._start_color_frame()
+
+    def get_processing_scale(self) -> float:
+        """
+        Returns the scale of the color and depth images relative to full resolution
+        (see set_processing_scale).
+        """
+        return 1 / self._reduction
+
     def get_width(self) -> int:
         """
-        Returns the pixel width of the color and depth images.
+        Returns the pixel width of the color and depth images, which is reduced by
+        set_processing_scale.
 
         Returns:
             The width (number of pixel columns) in the color and depth images.
@@ -177,11 +390,12 @@ class Camera(abc.ABC):
             # Access the top right pixel of the image
             top_right_pixel = image[0][rc.camera.get_width() - 1]
         """
-        return self._WIDTH
+        return self._WIDTH // self._reduction
 
     def get_height(self) -> int:
         """
-        Returns the pixel height of the color and depth images.
+        Returns the pixel height of the color and depth images, which is reduced by
+        set_processing_scale.
 
         Returns:
             The height (number of pixel rows) in the color and depth images.
@@ -193,7 +407,7 @@ class Camera(abc.ABC):
             # Access the top bottom left pixel of the image
             bottom_left_pixel = image[rc.camera.get_height() - 1][0]
         """
-        return self._HEIGHT
+        return self._HEIGHT // self._reduction
 
     def get_max_range(self) -> float:
         """
@@ -212,3 +426,28 @@ class Camera(abc.ABC):
                 center_distance = rc.camera.get_max_range()
         """
         return self._MAX_RANGE
+
+    def _start_color_frame(self) -> None:
+        """
+        Advances the color frame sequence number and forgets the context of the
+        previous frame, so that no color query mistakes the new frame's image for the
+        old one.  Called by each camera module once it captures a new frame.
+        """
+        self._color_frame += 1
+        self._color_context = None
+        image_context.clear_current()
+
+    def __get_color_context(
+        self, image: Optional[NDArray[(480, 640, 3), np.uint8]]
+    ) -> Optional[NDArray[(480, 640, 3), np.uint8]]:
+        """
+        Returns the read-only view of the current color image, creating the context
+        of the current frame if it has not been created yet.
+        """
+        if image is None:
+            return None
+        context = self._color_context
+        if context is None or context.frame != self._color_frame:
+            context = image_context.set_current(image, self._color_frame)
+            self._color_context = context
+        return context.image
@@ -0,0 +1,77 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Defines the interface of the Clock module of the racecar_core library
+"""
+
+import abc
+import time
+
+
+class Clock(abc.ABC):
+    """
+    Returns the time used to measure how much time has passed between frames.
+
+    In simulation and replay, the clock is driven by the delta time of each frame, so
+    it stands still during a frame and advances by exactly get_delta_time() between
+    frames, however long the program takes to run.  Programs timed with it behave the
+    same when a headless simulation or replay runs faster than real time, and produce
+    identical outputs when replayed.  On the real car, it is the monotonic clock.
+    """
+
+    @abc.abstractmethod
+    def now(self) -> float:
+        """
+        Returns the current time.
+
+        Returns:
+            The current time in seconds.  Only differences between times are
+            meaningful, since the starting time is arbitrary.
+
+        Example::
+
+            # Time how long the car has been turning
+            if angle != 0 and turn_start is None:
+                turn_start = rc.clock.now()
+            turn_time = rc.clock.now() - turn_start
+        """
+        pass
+
+
+class MonotonicClock(Clock):
+    """
+    A Clock which reads the operating system's monotonic clock.
+    """
+
+    def now(self) -> float:
+        return time.monotonic()
+
+
+# The clock of the most recently created racecar, which is read by code that does not
+# have access to the racecar (such as the controllers in group_6)
+_current: Clock = MonotonicClock()
+
+
+def get_current() -> Clock:
+    """
+    Returns the clock of the most recently created racecar, or the monotonic clock if
+    no racecar has been created.
+    """
+    return _current
+
+
+def set_current(clock: Clock) -> None:
+    """
+    Sets the clock returned by get_current and read by now.
+    """
+    global _current
+    _current = clock
+
+
+def now() -> float:
+    """
+    Returns the current time of the clock returned by get_current, in seconds.
+    """
+    return _current.now()
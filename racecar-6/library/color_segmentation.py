@@ -0,0 +1,232 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Labels the pixels of an image with a priority list of color ranges in one pass, using
+lookup tables compiled from the ranges.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2 as cv
+import numpy as np
+from nptyping import NDArray
+
+from group_6.vision import Color
+import racecar_utils as rc_utils
+
+
+class ColorSegmenter:
+    """
+    Labels each pixel of an image with the first of several color ranges which
+    contains it.
+
+    The ranges are compiled into a lookup table for each of the hue, saturation, and
+    value channels, whose entries hold one bit per range, so every range is checked
+    by the same few passes over the image instead of one inRange pass per range.
+
+    Those passes cost more than a single inRange pass, so the segmenter only pays off
+    for two or more ranges: for one range it takes about 1.4 ms on a 640 x 480 image,
+    against 1.0 ms for inRange (see benchmarks/bench_color_segmentation.py).
+
+    Args:
+        colors: Up to MAX_COLORS (hsv_lower, hsv_upper) ranges, in priority order.
+            As in rc_utils.find_contours, a range whose lower hue is greater than
+            its upper hue wraps around from 179 to 0.
+
+    Example::
+
+        BLUE = ((90, 50, 50), (120, 255, 255))
+        RED = ((170, 50, 50), (10, 255, 255))
+        segmenter = ColorSegmenter((BLUE, RED))
+
+        segmentation = segmenter.segment(rc.camera.get_color_image())
+
+        # Follow the first color of which at least 500 pixels were found
+        index = segmentation.get_first(500)
+        if index is not None:
+            center = segmentation.get_centroid(index)
+    """
+
+    # The number of ranges which fit in the bits of a lookup table entry
+    MAX_COLORS = 8
+
+    def __init__(self, colors: Sequence[Color]) -> None:
+        assert (
+            0 < len(colors) <= self.MAX_COLORS
+        ), f"colors ({len(colors)} ranges) must contain 1 to {self.MAX_COLORS} ranges."
+
+        self.colors: List[Color] = list(colors)
+
+        # The bits of the ranges containing each hue, saturation, and value
+        self.__channel_lut: NDArray[(1, 256, 3), np.uint8] = np.zeros(
+            (1, 256, 3), np.uint8
+        )
+        channel_values = np.arange(256)
+        for i, (hsv_lower, hsv_upper) in enumerate(colors):
+            for channel in range(3):
+                lower = channel_values >= hsv_lower[channel]
+                upper = channel_values <= hsv_upper[channel]
+                if channel == 0 and hsv_lower[0] > hsv_upper[0]:
+                    contained = lower | upper
+                else:
+                    contained = lower & upper
+                self.__channel_lut[0, contained, channel] |= 1 << i
+
+        # The label of each combination of bits: the lowest set bit, counting from 1
+        self.__label_lut: NDArray[(256,), np.uint8] = np.array(
+            [(bits & -bits).bit_length() for bits in range(256)], np.uint8
+        )
+
+    def segment(self, color_image: NDArray[(Any, Any, 3), np.uint8]) -> "Segmentation":
+        """
+        Labels the pixels of a color image.
+
+        Args:
+            color_image: The image to segment, with pixels represented in the bgr
+                (blue-green-red) format.
+
+        Returns:
+            The segmentation of the image.
+
+        Note:
+            The image is converted with rc_utils.get_hsv_image, so segmenting the
+            current camera image (or a crop of it) shares its conversion with other
+            color queries, while any other image is converted each call.
+        """
+        bits = cv.LUT(rc_utils.get_hsv_image(color_image), self.__channel_lut)
+        hue_bits, saturation_bits, value_bits = cv.split(bits)
+        members = cv.bitwise_and(cv.bitwise_and(hue_bits, saturation_bits), value_bits)
+        return Segmentation(self, members, cv.LUT(members, self.__label_lut))
+
+
+class Segmentation:
+    """
+    The labels found by a ColorSegmenter in an image, and statistics of each color.
+
+    The statistics of a color are computed when first queried, from the number of
+    its pixels in each row and each column, so a program which only needs those of
+    the first color found does not pay for the others.
+
+    Attributes:
+        colors: The ranges of the segmenter, in priority order.
+        labels: The label of each pixel: 0 if no range contains the pixel, and
+            otherwise one more than the index of the first range which does.
+    """
+
+    def __init__(
+        self,
+        segmenter: ColorSegmenter,
+        members: NDArray[(Any, Any), np.uint8],
+        labels: NDArray[(Any, Any), np.uint8],
+    ) -> None:
+        self.colors = segmenter.colors
+        self.labels = labels
+        self.__members = members
+        self.__counts: Optional[NDArray[(Any,), np.int64]] = None
+
+        # The number of pixels of each queried color in each row and in each column
+        self.__sums: Dict[int, Tuple[NDArray, NDArray]] = {}
+
+    def get_counts(self) -> NDArray[(Any,), np.int64]:
+        """
+        Returns the number of pixels labeled with each color, in priority order.
+        """
+        if self.__counts is None:
+            self.__counts = np.array(
+                [
+                    cv.countNonZero(self.__get_label_mask(i))
+                    for i in range(len(self.colors))
+                ],
+                np.int64,
+            )
+        return self.__counts
+
+    def get_first(self, min_count: int = 1) -> Optional[int]:
+        """
+        Returns the index of the first color labeling at least min_count pixels, or
+        None if no color labels that many.
+        """
+        indices = np.flatnonzero(self.get_counts() >= min_count)
+        return int(indices[0]) if len(indices) > 0 else None
+
+    def get_bounding_box(
+        self, index: int
+    ) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """
+        Returns the smallest rectangle containing the pixels labeled with a color.
+
+        Args:
+            index: The index of the color in colors.
+
+        Returns:
+            The (row, column) of the top left pixel and of the pixel one past the
+            bottom right corner, as taken by rc_utils.crop, or None if no pixels are
+            labeled with the color.
+        """
+        row_sums, column_sums = self.__get_sums(index)
+        rows = np.flatnonzero(row_sums)
+        if len(rows) == 0:
+            return None
+        columns = np.flatnonzero(column_sums)
+        return (
+            (int(rows[0]), int(columns[0])),
+            (int(rows[-1]) + 1, int(columns[-1]) + 1),
+        )
+
+    def get_centroid(self, index: int) -> Optional[Tuple[float, float]]:
+        """
+        Returns the (row, column) of the mean pixel labeled with a color, or None if
+        no pixels are labeled with the color.
+        """
+        row_sums, column_sums = self.__get_sums(index)
+        count = row_sums.sum()
+        if count == 0:
+            return None
+        return (
+            float(row_sums @ np.arange(len(row_sums))) / count,
+            float(column_sums @ np.arange(len(column_sums))) / count,
+        )
+
+    def get_mask(self, index: int) -> NDArray[(Any, Any), np.uint8]:
+        """
+        Returns a mask of the pixels within the range of a color, which are 255, as
+        cv.inRange would.
+
+        Note:
+            Unlike labels, the mask includes pixels which are also within the range
+            of an earlier color, so its contours match those of
+            rc_utils.find_contours.
+        """
+        return cv.compare(cv.bitwise_and(self.__members, 1 << index), 0, cv.CMP_NE)
+
+    def find_contours(self, index: int) -> List[NDArray]:
+        """
+        Returns the contours of the pixels within the range of a color, as
+        rc_utils.find_contours would.
+        """
+        return cv.findContours(
+            self.get_mask(index), cv.RETR_LIST, cv.CHAIN_APPROX_SIMPLE
+        )[0]
+
+    def __get_label_mask(self, index: int) -> NDArray[(Any, Any), np.uint8]:
+        """
+        Returns a mask of the pixels labeled with a color, which are 255.
+        """
+        return cv.compare(self.labels, index + 1, cv.CMP_EQ)
+
+    def __get_sums(self, index: int) -> Tuple[NDArray, NDArray]:
+        """
+        Returns the number of pixels labeled with a color in each row and in each
+        column.
+        """
+        sums = self.__sums.get(index)
+        if sums is None:
+            mask = self.__get_label_mask(index)
+            sums = tuple(
+                cv.reduce(mask, axis, cv.REDUCE_SUM, dtype=cv.CV_32S).ravel() // 255
+                for axis in (1, 0)
+            )
+            self.__sums[index] = sums
+        return sums
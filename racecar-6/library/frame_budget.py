@@ -0,0 +1,307 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tracks the time spent in each frame, and sheds optional work once a frame runs long.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from nptyping import NDArray
+
+from loop_timing import LoopTiming
+
+
+class BudgetTask:
+    """
+    A function registered with a FrameBudget, which is called through the task.
+
+    Critical tasks always run.  Optional tasks are skipped once the frame has used
+    up its threshold, or, if they are deferred, run later in a frame with time to
+    spare (only the most recent deferred call is kept, since an older one would be
+    stale).
+
+    Calling the task returns the function's result, or None if it was skipped or
+    deferred.
+
+    Attributes:
+        name: The name used to report the task.
+        critical: True if the task always runs.
+        defer: True if a call which does not fit in its frame is run in a later one.
+        runs: The number of calls which ran (including deferred calls).
+        skipped: The number of calls which were skipped, including deferred calls
+            superseded by a newer call before they could run.
+        deferred: The number of calls which were deferred.
+        total_time: The seconds taken by every run.
+        max_time: The seconds taken by the longest run.
+    """
+
+    def __init__(
+        self,
+        budget: "FrameBudget",
+        name: str,
+        function: Callable,
+        critical: bool,
+        defer: bool,
+    ) -> None:
+        self.name = name
+        self.critical = critical
+        self.defer = defer
+        self.runs = 0
+        self.skipped = 0
+        self.deferred = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+        self.__budget = budget
+        self.__function = function
+
+        # The arguments of the deferred call waiting to run, if any
+        self.__pending: Optional[Tuple[tuple, Dict[str, Any]]] = None
+
+    def __call__(self, *args, **kwargs) -> Any:
+        if self.critical or self.__budget.has_time():
+            # A newer call supersedes the deferred one, which would now be stale
+            if self.__pending is not None:
+                self.__pending = None
+                self.__budget._remove_pending(self)
+                self.skipped += 1
+            return self.__run(args, kwargs)
+
+        if self.defer:
+            if self.__pending is not None:
+                self.skipped += 1
+            else:
+                self.__budget._add_pending(self)
+            self.__pending = (args, kwargs)
+            self.deferred += 1
+        else:
+            self.skipped += 1
+        return None
+
+    def __run(self, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return self.__function(*args, **kwargs)
+        finally:
+            run_time = time.perf_counter() - start
+            self.runs += 1
+            self.total_time += run_time
+            self.max_time = max(self.max_time, run_time)
+
+    def __run_pending(self) -> None:
+        args, kwargs = self.__pending
+        self.__pending = None
+        self.__run(args, kwargs)
+
+    def __str__(self) -> str:
+        mean = self.total_time / self.runs if self.runs > 0 else 0.0
+        kind = "critical" if self.critical else "deferred" if self.defer else "optional"
+        return (
+            f"{self.name} ({kind}): {self.runs} runs, {self.skipped} skipped, "
+            f"{self.deferred} deferred, mean {mean * 1000:.2f} ms, "
+            f"max {self.max_time * 1000:.2f} ms"
+        )
+
+
+class FrameBudget:
+    """
+    Times each frame against a deadline, and sheds optional work once the frame has
+    used up a threshold of it.
+
+    Work which must happen every frame, such as setting the drive command or logging
+    the sensors, is registered as critical, and work which can be dropped or delayed,
+    such as AR marker detection or drawing to the display, is registered as optional.
+    The racecar marks the start and end of each frame, and runs deferred calls after
+    update when the frame has time to spare.
+
+    The frame times are kept by a LoopTiming, which also keeps the times of the
+    phases of each frame when the racecar measures them (see end_frame).
+
+    Args:
+        frame_time: The seconds each frame may take.
+        threshold: The fraction of frame_time after which optional tasks are shed.
+        enabled: If False, optional tasks always run and frames are only timed, such
+            as when a replay must give the same results however fast it runs.
+        history: The number of recent frames whose times are kept for percentiles.
+        phases: The names of the phases whose times are passed to end_frame.
+        extras: The names of the other durations passed to end_frame.
+
+    Attributes:
+        timing: The times of the recent frames, and of their phases.
+
+    Example::
+
+        # Register AR marker detection as optional, and the display as deferred
+        find_markers = rc.frame_budget.register("markers", rc_utils.get_ar_markers)
+        show_image = rc.frame_budget.register(
+            "display", rc.display.show_color_image, defer=True
+        )
+
+        def update():
+            image = rc.camera.get_color_image()
+            rc.drive.set_speed_angle(*follow_line(image))
+
+            # Skipped (None) if the frame has already used 75% of its time
+            markers = find_markers(image)
+            show_image(image)
+
+        # Prints the frame time percentiles and the skip counts of each task
+        print(rc.frame_budget.summary())
+    """
+
+    def __init__(
+        self,
+        frame_time: float = 1 / 60,
+        threshold: float = 0.75,
+        enabled: bool = True,
+        history: int = 600,
+        phases: Sequence[str] = (),
+        extras: Sequence[str] = (),
+    ) -> None:
+        self.threshold = threshold
+        self.enabled = enabled
+        self.timing = LoopTiming(phases, frame_time, history, extras)
+
+        self.__tasks: List[BudgetTask] = []
+        self.__pending: List[BudgetTask] = []
+        self.__frame_start: Optional[float] = None
+        self.__last_frame_start: Optional[float] = None
+
+    @property
+    def frame_time(self) -> float:
+        """
+        The seconds each frame may take.
+        """
+        return self.timing.deadline
+
+    @frame_time.setter
+    def frame_time(self, frame_time: float) -> None:
+        self.timing.deadline = frame_time
+
+    @property
+    def num_frames(self) -> int:
+        """
+        The number of frames timed.
+        """
+        return self.timing.num_frames
+
+    @property
+    def deadline_misses(self) -> int:
+        """
+        The number of frames which took longer than frame_time.
+        """
+        return self.timing.deadline_misses
+
+    def register(
+        self, name: str, function: Callable, critical: bool = False, defer: bool = False
+    ) -> BudgetTask:
+        """
+        Registers a function as a task, which is then called in its place.
+
+        Args:
+            name: The name used to report the task.
+            function: The function to call.
+            critical: If True, the task always runs.
+            defer: If True, an optional call which does not fit in its frame is run
+                in a later frame with time to spare, instead of being skipped.
+
+        Returns:
+            The task, which is called with the arguments of the function.
+        """
+        task = BudgetTask(self, name, function, critical, defer)
+        self.__tasks.append(task)
+        return task
+
+    def get_tasks(self) -> List[BudgetTask]:
+        """
+        Returns every registered task, in the order they were registered.
+        """
+        return list(self.__tasks)
+
+    def begin_frame(self) -> None:
+        """
+        Marks the start of a frame.
+        """
+        self.__last_frame_start = self.__frame_start or self.__last_frame_start
+        self.__frame_start = time.perf_counter()
+
+    def end_frame(
+        self, phase_times: Sequence[float] = (), extra_times: Sequence[float] = ()
+    ) -> None:
+        """
+        Marks the end of a frame, and records its time in timing.
+
+        Args:
+            phase_times: The seconds taken by each of the phases, if any.
+            extra_times: The other durations of the frame, if any.
+        """
+        if self.__frame_start is None:
+            return
+        frame_time = time.perf_counter() - self.__frame_start
+        period = (
+            self.__frame_start - self.__last_frame_start
+            if self.__last_frame_start is not None
+            else frame_time
+        )
+        self.__last_frame_start = self.__frame_start
+        self.__frame_start = None
+        self.timing.add_frame(phase_times, frame_time, period, extra_times)
+
+    def get_elapsed(self) -> float:
+        """
+        Returns the seconds since the start of the current frame, or 0 outside of a
+        frame.
+        """
+        if self.__frame_start is None:
+            return 0.0
+        return time.perf_counter() - self.__frame_start
+
+    def has_time(self) -> bool:
+        """
+        Returns whether the current frame has time left for optional tasks.
+        """
+        return not self.enabled or self.get_elapsed() < self.threshold * self.frame_time
+
+    def run_deferred(self) -> None:
+        """
+        Runs deferred calls, oldest first, while the current frame has time to spare.
+        """
+        while self.__pending and self.has_time():
+            self.__pending.pop(0)._BudgetTask__run_pending()
+
+    def _add_pending(self, task: BudgetTask) -> None:
+        """
+        Queues a task whose deferred call is waiting to run.
+        """
+        self.__pending.append(task)
+
+    def _remove_pending(self, task: BudgetTask) -> None:
+        """
+        Removes a task whose deferred call was superseded before it could run.
+        """
+        self.__pending.remove(task)
+
+    def get_frame_time_percentiles(
+        self, percents: Sequence[float] = (50, 95, 99)
+    ) -> NDArray[np.float64]:
+        """
+        Returns percentiles of the times of the most recent frames, in seconds.
+        """
+        return self.timing.get_percentiles(LoopTiming.FRAME, percents)
+
+    def summary(self) -> str:
+        """
+        Returns the frame time percentiles, and a line for each task.
+        """
+        p50, p95, p99 = self.get_frame_time_percentiles() * 1000
+        lines = [
+            f">> Frame budget over {self.num_frames} frames: p50 {p50:.2f} ms | "
+            f"p95 {p95:.2f} ms | p99 {p99:.2f} ms | "
+            f"{self.deadline_misses} over {self.frame_time * 1000:.2f} ms"
+        ]
+        lines += [f"    {task}" for task in self.__tasks]
+        return "\n".join(lines)
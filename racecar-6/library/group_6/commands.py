@@ -9,9 +9,10 @@ only one mechanism with the scheduler.
 """
 
 import abc
-import time
 from typing import Callable, Optional
 
+import clock
+
 
 class Command(abc.ABC):
 
@@ -80,7 +81,7 @@ class WaitCommand(Command):
         self.dt = delta_time
 
     def initialize(self) -> None:
-        self.start_time = time.perf_counter()
+        self.start_time = clock.now()
 
     def execute(self) -> None:
         pass
@@ -89,7 +90,7 @@ class WaitCommand(Command):
         pass
 
     def is_finished(self) -> bool:
-        return time.perf_counter() > self.start_time + self.dt
+        return clock.now() > self.start_time + self.dt
 
 
 class Sequence(Command):
@@ -2,9 +2,10 @@
 Group 6's library of control code includes utilities we use in controlling our robot
 """
 
-import time
 from typing import Optional, NamedTuple
 
+import clock
+
 class PIDConstants(NamedTuple):
     """
     PID Constants
@@ -25,7 +26,7 @@ class PIDConstants(NamedTuple):
 
 class PIDController:
     """
-    A PID implementation with variable time intervals, using system time
+    A PID implementation with variable time intervals, using the racecar's clock
     """
 
     def __init__(
@@ -37,7 +38,9 @@ class PIDController:
     ) -> None:
         self.constants = constants
 
-        self.prev_time = time.perf_counter()
+        # Timing starts at the first calculation, since controllers are often created
+        # before the racecar (and its clock) is
+        self.prev_time: Optional[float] = None
         self.prev_error = 0
         self.setpoint = setpoint
         self.sum = 0
@@ -59,11 +62,16 @@ class PIDController:
 
         error = self.setpoint - position
 
-        current_time = time.perf_counter()
-        delta_time = current_time - self.prev_time
+        current_time = clock.now()
+        delta_time = 0 if self.prev_time is None else current_time - self.prev_time
         self.prev_time = current_time
 
-        derivative = (error - self.prev_error) / delta_time
+        # The clock stands still within a frame in simulation and replay, so a second
+        # calculation in the same frame has no time interval to differentiate over
+        if delta_time > 0:
+            derivative = (error - self.prev_error) / delta_time
+        else:
+            derivative = 0
         self.sum += delta_time * error
 
         self.prev_error = error
@@ -89,7 +97,7 @@ class RateLimiter:
 
     value: float
     rate: float
-    prev_time: float
+    prev_time: Optional[float]
 
     def __init__(self, rate: float, value: float = 0) -> None:
         """
@@ -99,15 +107,15 @@ class RateLimiter:
 
         self.rate = rate
         self.value = value
-        self.prev_time = time.perf_counter()
+        self.prev_time = None
 
     def update(self, new_value: float) -> float:
         """
         Constrains the input within the allowed rate
         """
 
-        current_time = time.perf_counter()
-        delta_time = current_time - self.prev_time
+        current_time = clock.now()
+        delta_time = 0 if self.prev_time is None else current_time - self.prev_time
         self.value += clamp(new_value - self.value, -self.rate * delta_time, self.rate * delta_time)
         self.prev_time = current_time
         return self.value
@@ -118,7 +126,7 @@ class RateLimiter:
         """
 
         self.value = starting_value
-        self.prev_time = time.perf_counter()
+        self.prev_time = clock.now()
 
 
 class Debouncer:
@@ -129,17 +137,18 @@ class Debouncer:
     def __init__(self, baseline: bool, debounce_time: float, starting_value: bool = False) -> None:
         self.baseline = baseline
         self.debounce_time = debounce_time
-        self.start_time = time.perf_counter()
+        self.start_time: Optional[float] = None
 
     def update(self, value: bool) -> bool:
         """
         Updates debouncer
         """
 
-        if value == self.baseline:
-            self.start_time = time.perf_counter()
+        current_time = clock.now()
+        if value == self.baseline or self.start_time is None:
+            self.start_time = current_time
 
-        if time.perf_counter() - self.start_time >= self.debounce_time:
+        if current_time - self.start_time >= self.debounce_time:
             return value
 
         return self.baseline
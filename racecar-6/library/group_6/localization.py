@@ -14,15 +14,16 @@ Abstract: This article presents two algorithms that extract information from las
 Keywords: Feature extraction; Robot mapping
 """
 
-import time
 import math
 
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 from collections import namedtuple
 
 import numpy as np
 from nptyping import NDArray
 
+import clock
+
 K_1 = np.array((-3, -3, 5, -3, -3))
 K_2 = np.array((-1, -2, -3, 5, -3, -2, -1))
 
@@ -47,26 +48,32 @@ class IMUOdometry:
         self.angular_velocity = np.array((0.0, 0.0, 0.0))
         self.angular_position = np.array((0.0, 0.0, 0.0))
 
-        self.prev_time = time.perf_counter()
+        self.prev_time = None
 
-        self.moving_avg = [np.array((0, 0, 0)) for _ in range(moving_avg_len)]
+        # The last moving_avg_len linear accelerations, written round-robin.  Readings
+        # are copied in, since the IMU may reuse its arrays for the next frame
+        self.moving_avg = np.zeros((moving_avg_len, 3))
+        self.moving_avg_index = 0
 
-    def update_odometry(self, linear_acceleration: NDArray, angular_velocity: NDArray) -> None:
+    def update_odometry(self, linear_acceleration: NDArray, angular_velocity: NDArray, timestamp: Optional[float] = None) -> None:
         """
         Updates odometry based on imu data
+
+        timestamp is the time of the reading in seconds (such as the one returned by
+        rc.physics.get_imu()), or None to use the racecar's clock
         """
 
-        current_time = time.perf_counter()
-        delta_time = current_time - self.prev_time
+        current_time = clock.now() if timestamp is None else timestamp
+        delta_time = 0.0 if self.prev_time is None else current_time - self.prev_time
         self.prev_time = current_time
 
-        self.angular_velocity = angular_velocity
-        self.angular_position += angular_velocity * delta_time
+        self.angular_velocity[:] = angular_velocity
+        self.angular_position += self.angular_velocity * delta_time
 
-        self.moving_avg.pop(0)
-        self.moving_avg.append(linear_acceleration)
+        self.moving_avg[self.moving_avg_index] = linear_acceleration
+        self.moving_avg_index = (self.moving_avg_index + 1) % len(self.moving_avg)
 
-        self.acceleration = sum(self.moving_avg) / len(self.moving_avg)
+        self.acceleration = self.moving_avg.mean(axis=0)
         self.velocity += self.acceleration * delta_time
         self.position += self.velocity * delta_time
 
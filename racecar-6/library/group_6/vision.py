@@ -66,10 +66,12 @@ def get_contour(
         contour_center = rc_utils.get_contour_center(contour)
         contour_area = rc_utils.get_contour_area(contour)
 
-        rc_utils.draw_contour(image, contour)
+        # Annotate the caller's image, unless it is read-only and would need a copy
+        if image.flags.writeable:
+            rc_utils.draw_contour(image, contour)
 
-        if contour_center:
-            rc_utils.draw_circle(image, contour_center)
+            if contour_center:
+                rc_utils.draw_circle(image, contour_center)
 
         return ContourData(contour, color, contour_center, contour_area, image.shape)  # type: ignore
 
@@ -0,0 +1,135 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Keeps the images derived from the current camera frame, so that each is computed at
+most once per frame however many crops and color queries use it.
+"""
+
+from typing import Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+from nptyping import NDArray
+
+import image_pool
+
+
+class ImageContext:
+    """
+    A color image captured by the camera, and the images derived from it.
+
+    Derived images are computed for the whole frame the first time they are needed,
+    and a crop of the frame receives the matching view into them.  A crop is only
+    recognized if it is read-only, since a writable image may since have been
+    modified, and if it views the frame's own pixels: it must share the frame's
+    underlying array, not merely its address, which a later frame may reuse.
+
+    Args:
+        image: The color image, which must not change while the context is current.
+        frame: The sequence number of the camera frame which captured the image.
+
+    Attributes:
+        image: A read-only view of the color image.
+        frame: The sequence number of the camera frame which captured the image.
+        num_conversions: The number of times the frame has been converted.
+    """
+
+    def __init__(self, image: NDArray[(480, 640, 3), np.uint8], frame: int) -> None:
+        self.image = image_pool.read_only(image)
+        self.frame = frame
+        self.num_conversions = 0
+        self.__owner = _get_owner(self.image)
+        self.__hsv_image: Optional[NDArray[(480, 640, 3), np.uint8]] = None
+
+    def get_hsv_image(self) -> NDArray[(480, 640, 3), np.uint8]:
+        """
+        Returns a read-only view of the frame in the hue-saturation-value format.
+        """
+        if self.__hsv_image is None:
+            self.__hsv_image = image_pool.read_only(
+                cv.cvtColor(self.image, cv.COLOR_BGR2HSV)
+            )
+            self.num_conversions += 1
+        return self.__hsv_image
+
+    def get_hsv_view(self, image: NDArray) -> Optional[NDArray]:
+        """
+        Returns the part of get_hsv_image() matching image, or None if image is not a
+        read-only view of a region of the frame.
+        """
+        region = self.get_region(image)
+        if region is None:
+            return None
+        rows, columns = region
+        return self.get_hsv_image()[rows, columns]
+
+    def get_region(self, image: NDArray) -> Optional[Tuple[slice, slice]]:
+        """
+        Returns the rows and columns of the frame which image views, or None if image
+        is not a read-only view of a region of the frame.
+        """
+        frame = self.image
+        if (
+            image.flags.writeable
+            or image.dtype != frame.dtype
+            or image.ndim != frame.ndim
+            or image.shape[2:] != frame.shape[2:]
+            or image.strides != frame.strides
+            or _get_owner(image) is not self.__owner
+        ):
+            return None
+
+        # Locate the first pixel of image within the frame
+        offset = image.ctypes.data - frame.ctypes.data
+        if offset < 0:
+            return None
+        row, offset = divmod(offset, frame.strides[0])
+        column, offset = divmod(offset, frame.strides[1])
+        if (
+            offset != 0
+            or row + image.shape[0] > frame.shape[0]
+            or column + image.shape[1] > frame.shape[1]
+        ):
+            return None
+        return slice(row, row + image.shape[0]), slice(column, column + image.shape[1])
+
+
+def _get_owner(image: NDArray) -> object:
+    """
+    Returns the object which owns the memory viewed by image.
+    """
+    while isinstance(image.base, np.ndarray):
+        image = image.base
+    return image if image.base is None else image.base
+
+
+# The context of the frame most recently returned by rc.camera.get_color_image(), or
+# None once the camera has captured a newer frame
+_current: Optional[ImageContext] = None
+
+
+def set_current(image: NDArray[(480, 640, 3), np.uint8], frame: int) -> ImageContext:
+    """
+    Creates the context of a new camera frame, which replaces the current context.
+    """
+    global _current
+    _current = ImageContext(image, frame)
+    return _current
+
+
+def clear_current() -> None:
+    """
+    Forgets the current context, which each camera module does once it captures a
+    new frame.
+    """
+    global _current
+    _current = None
+
+
+def get_current() -> Optional[ImageContext]:
+    """
+    Returns the context of the current camera frame, or None if there is none.
+    """
+    return _current
@@ -0,0 +1,88 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Reuses the buffers of writable image copies which the program has released, so that
+copying an image each frame does not allocate.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+from nptyping import NDArray
+
+
+class ImagePool:
+    """
+    Copies images into buffers which the program hands back once it is done with them.
+
+    A buffer is only reused after it is passed to release(), so a copy is never
+    overwritten while the program still uses it.  Copies which are never released
+    are simply garbage collected, as if the images were copied with copy.deepcopy().
+
+    Args:
+        max_buffers: The number of released buffers kept for each image shape and
+            type.
+
+    Attributes:
+        num_copies: The number of images copied.
+        num_allocations: The number of copies which needed a new buffer.
+    """
+
+    def __init__(self, max_buffers: int = 4) -> None:
+        self.__max_buffers = max_buffers
+        self.__free: Dict[Tuple[Tuple[int, ...], np.dtype], List[NDArray]] = {}
+        self.num_copies = 0
+        self.num_allocations = 0
+
+    def acquire(self, image: NDArray) -> NDArray:
+        """
+        Returns a writable copy of an image, in a released buffer when one is free.
+        """
+        self.num_copies += 1
+        buffers = self.__free.get((image.shape, image.dtype))
+        if buffers:
+            buffer = buffers.pop()
+            np.copyto(buffer, image)
+            return buffer
+
+        self.num_allocations += 1
+        return np.array(image, copy=True)
+
+    def release(self, buffer: NDArray) -> None:
+        """
+        Hands a copy returned by acquire back to the pool, to be reused by a later
+        copy.  Neither the copy nor any view of it may be used afterwards.
+        """
+        assert (
+            buffer.base is None and buffer.flags.writeable
+        ), "buffer must be a copy returned by acquire, not a view of one."
+        buffers = self.__free.setdefault((buffer.shape, buffer.dtype), [])
+        if len(buffers) < self.__max_buffers and not any(
+            free is buffer for free in buffers
+        ):
+            buffers.append(buffer)
+
+
+# The pool used by the camera modules
+_default = ImagePool()
+
+
+def get_default() -> ImagePool:
+    """
+    Returns the pool used by the camera modules.
+    """
+    return _default
+
+
+def read_only(image: NDArray) -> NDArray:
+    """
+    Returns a read-only view of an image, or None if image is None.  The image itself
+    stays writable.
+    """
+    if image is None:
+        return None
+    view = image.view()
+    view.flags.writeable = False
+    return view
@@ -67,6 +67,25 @@ class Lidar(abc.ABC):
         """
         pass
 
+    async def fetch_samples(self) -> NDArray[720, np.float32]:
+        """
+        Returns the current LIDAR scan, waiting without blocking.
+
+        Returns:
+            The same scan as get_samples().
+
+        Note:
+            This function may only be awaited from a coroutine start or update
+            function.  In simulation, the scan is requested without blocking, so that
+            other sensor requests can be made while it is received.
+
+        Example::
+
+            async def update():
+                scan = await rc.lidar.fetch_samples()
+        """
+        return self.get_samples()
+
     def get_num_samples(self) -> int:
         """
         Returns the number of samples in a full LIDAR scan.
@@ -0,0 +1,100 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Rolling timing statistics of each phase of a control loop.
+"""
+
+from typing import Dict, Sequence
+
+import numpy as np
+from nptyping import NDArray
+
+
+class LoopTiming:
+    """
+    Keeps the durations of each phase of the most recent frames of a control loop,
+    along with each frame's total time and its period (the time since the previous
+    frame began), and counts the frames which missed their deadline.  Other
+    durations measured once per frame, such as the age of the sensor data each frame
+    began with, may be kept alongside the phases as extras.
+
+    Percentiles are computed when queried, so recording a frame only costs a row
+    write; they cover the most recent history frames.
+
+    Args:
+        phases: The names of the phases of each frame, in order.
+        deadline: The seconds in which each frame should finish.
+        history: The number of recent frames kept for percentiles.
+        extras: The names of the other durations recorded with each frame, in order.
+    """
+
+    # The columns recorded for every frame after its phases
+    FRAME = "frame"
+    PERIOD = "period"
+
+    def __init__(
+        self,
+        phases: Sequence[str],
+        deadline: float,
+        history: int = 600,
+        extras: Sequence[str] = (),
+    ) -> None:
+        self.deadline = deadline
+        self.__num_phases = len(phases)
+        self.__columns = list(phases) + list(extras) + [self.FRAME, self.PERIOD]
+        self.__indices: Dict[str, int] = {
+            name: i for i, name in enumerate(self.__columns)
+        }
+        self.__times: NDArray[np.float64] = np.zeros((history, len(self.__columns)))
+        self.num_frames = 0
+        self.deadline_misses = 0
+
+    def add_frame(
+        self,
+        phase_times: Sequence[float],
+        frame_time: float,
+        period: float,
+        extra_times: Sequence[float] = (),
+    ) -> None:
+        """
+        Records the seconds taken by each phase of a frame, the whole frame, and the
+        time since the previous frame began, along with the frame's extras.
+        """
+        row = self.__times[self.num_frames % len(self.__times)]
+        row[: self.__num_phases] = phase_times
+        row[self.__num_phases : -2] = extra_times
+        row[-2] = frame_time
+        row[-1] = period
+        self.num_frames += 1
+        if frame_time > self.deadline:
+            self.deadline_misses += 1
+
+    def get_percentiles(
+        self, phase: str, percents: Sequence[float] = (50, 95, 99)
+    ) -> NDArray[np.float64]:
+        """
+        Returns percentiles of the seconds taken by a phase (or of an extra, or by
+        whole frames with FRAME, or between frames with PERIOD) over the recent
+        frames.
+        """
+        count = min(self.num_frames, len(self.__times))
+        if count == 0:
+            return np.zeros(len(percents))
+        return np.percentile(self.__times[:count, self.__indices[phase]], percents)
+
+    def summary(self) -> str:
+        """
+        Returns a table of the p50, p95, and p99 of each phase and extra, in
+        milliseconds.
+        """
+        lines = [
+            f">> Loop timing over {self.num_frames} frames: "
+            f"{self.deadline_misses} over the {self.deadline * 1000:.2f} ms deadline",
+            f"    {'phase':<16}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}",
+        ]
+        for name in self.__columns:
+            p50, p95, p99 = self.get_percentiles(name) * 1000
+            lines.append(f"    {name:<16}{p50:>9.3f}{p95:>9.3f}{p99:>9.3f}")
+        return "\n".join(lines)
@@ -0,0 +1,201 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Runs functions at fixed periods alongside update, used by the racecars to implement
+schedule_periodic and update_slow.
+"""
+
+import math
+import time
+from typing import Callable, List, Optional
+
+
+class PeriodicTask:
+    """
+    A function which is run every period seconds, and the timing of its runs.
+
+    Timing statistics are in seconds of wall time, and count every run so far.
+
+    Attributes:
+        function: The function which is run.
+        period: The seconds between runs.
+        phase: The seconds after it was scheduled at which the task first runs.
+        budget: The seconds a run may take before it counts as an overrun.
+        runs: The number of completed runs.
+        total_time: The seconds taken by every run.
+        max_time: The seconds taken by the longest run.
+        last_time: The seconds taken by the most recent run.
+        overruns: The number of runs which took longer than the budget.
+        skipped: The number of runs which were skipped because a frame lasted more
+            than a period, so the task could not keep up with its rate.
+    """
+
+    def __init__(
+        self,
+        function: Callable[[], None],
+        period: float,
+        phase: float,
+        budget: float,
+        next_time: float,
+    ) -> None:
+        self.function = function
+        self.period = period
+        self.phase = phase
+        self.budget = budget
+        self.runs = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+        self.overruns = 0
+        self.skipped = 0
+
+        # The scheduler time at which the task is next due
+        self._next_time = next_time
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        """
+        Stops running the task.
+        """
+        self._cancelled = True
+
+    def get_mean_time(self) -> float:
+        """
+        Returns the mean seconds taken by each run, or 0 if the task has not run.
+        """
+        return self.total_time / self.runs if self.runs > 0 else 0.0
+
+    def record(self, run_time: float) -> None:
+        """
+        Records the seconds taken by a run of the task.
+        """
+        self.runs += 1
+        self.total_time += run_time
+        self.max_time = max(self.max_time, run_time)
+        self.last_time = run_time
+        if run_time > self.budget:
+            self.overruns += 1
+
+    def __str__(self) -> str:
+        name = getattr(self.function, "__name__", repr(self.function))
+        return (
+            f"{name}: every {self.period * 1000:.0f} ms, {self.runs} runs, "
+            f"mean {self.get_mean_time() * 1000:.2f} ms, "
+            f"max {self.max_time * 1000:.2f} ms, {self.overruns} overruns, "
+            f"{self.skipped} skipped"
+        )
+
+
+class PeriodicScheduler:
+    """
+    Decides which periodic tasks are due each frame.
+
+    The scheduler keeps its own time, which advances by each frame's delta time, so
+    tasks are timed in the same seconds as get_delta_time().  A task is due in the
+    frame whose end is closest to its next run time, and then every period seconds
+    after that; if a frame lasts more than a period, the task runs once at the end of
+    the frame, and the runs it missed are counted as skipped rather than run back to
+    back.
+    """
+
+    # The phase of each task scheduled without one is offset by this many seconds
+    # (one frame at 60 frames per second) from the previous task, so that tasks
+    # scheduled together do not run in the same frame.  Tasks due when they are
+    # scheduled and tasks due a frame later both run in the first frame, so the
+    # offsets start from one step.
+    __PHASE_STEP = 1 / 60
+
+    def __init__(self) -> None:
+        self.__tasks: List[PeriodicTask] = []
+        self.__time = 0.0
+        self.__previous_delta_time = math.inf
+
+    def __bool__(self) -> bool:
+        return len(self.__tasks) > 0
+
+    def add(
+        self,
+        function: Callable[[], None],
+        period: float,
+        phase: Optional[float] = None,
+        budget: Optional[float] = None,
+    ) -> PeriodicTask:
+        """
+        Schedules a function, replacing the task of that function if it is already
+        scheduled.
+
+        Args:
+            function: The function to run, which takes no parameters.
+            period: The seconds between runs.
+            phase: The seconds from now at which the task first runs, or None to
+                stagger it from the tasks already scheduled.
+            budget: The seconds a run may take before it counts as an overrun, or
+                None to use the period.
+
+        Returns:
+            The new task.
+        """
+        assert period > 0, f"period [{period}] must be greater than 0."
+        self.__tasks = [task for task in self.__tasks if task.function != function]
+        if phase is None:
+            phase = ((len(self.__tasks) + 1) * self.__PHASE_STEP) % period
+        task = PeriodicTask(
+            function,
+            period,
+            phase,
+            period if budget is None else budget,
+            self.__time + phase,
+        )
+        self.__tasks.append(task)
+        return task
+
+    def get_tasks(self) -> List[PeriodicTask]:
+        """
+        Returns every scheduled task, in the order they were scheduled.
+        """
+        return list(self.__tasks)
+
+    def advance(self, delta_time: float) -> List[PeriodicTask]:
+        """
+        Advances the scheduler by a frame, and returns the tasks due in that frame.
+        """
+        self.__time += delta_time
+        if any(task._cancelled for task in self.__tasks):
+            self.__tasks = [task for task in self.__tasks if not task._cancelled]
+
+        # Round to the nearest frame, so that a period which is a whole number of
+        # frames does not drift by a frame because of rounding in the delta times.
+        # The next frame is taken to last no longer than the shorter of this frame
+        # and the previous one, so that a single long frame does not also count the
+        # runs due during the next frame as skipped.
+        now = self.__time + min(delta_time, self.__previous_delta_time) / 2
+        if delta_time > 0:
+            self.__previous_delta_time = delta_time
+        due = []
+        for task in self.__tasks:
+            if task._next_time <= now:
+                missed = math.floor((now - task._next_time) / task.period)
+                task.skipped += missed
+                task._next_time += (missed + 1) * task.period
+                due.append(task)
+        return due
+
+    def run(
+        self,
+        delta_time: float,
+        call: Callable[[Callable[[], None]], None] = lambda function: function(),
+    ) -> None:
+        """
+        Advances the scheduler by a frame, and runs the tasks due in that frame.
+
+        Args:
+            delta_time: The seconds since the previous frame.
+            call: Calls a task's function, such as a racecar's helper which runs
+                coroutine functions to completion.
+        """
+        for task in self.advance(delta_time):
+            start = time.perf_counter()
+            call(task.function)
+            task.record(time.perf_counter() - start)
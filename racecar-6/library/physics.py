@@ -7,13 +7,21 @@ Defines the interface of the Physics module of the racecar_core library
 """
 
 import abc
+from typing import Tuple
 import numpy as np
 from nptyping import NDArray
 
+import clock
+
 
 class Physics(abc.ABC):
     """
     Returns the linear acceleration and angular velocity measured by the IMU.
+
+    Note:
+        In RacecarSim, the vectors returned during a frame are read-only, so copy a
+        vector to modify it.  Each frame's measurements are stored in a new array,
+        so a vector kept from an earlier frame never changes.
     """
 
     @abc.abstractmethod
@@ -68,3 +76,64 @@ class Physics(abc.ABC):
             yaw = ang_vel[1]
         """
         pass
+
+    def get_imu(self) -> Tuple[NDArray[3, np.float32], NDArray[3, np.float32], float]:
+        """
+        Returns the linear acceleration and angular velocity together with the time
+        at which they were measured.
+
+        Returns:
+            The same vectors as get_linear_acceleration() and get_angular_velocity(),
+            and a timestamp in seconds.
+
+        Note:
+            The timestamp is read from the racecar's clock (see Clock.now), so in
+            RacecarSim it is simulation time, which is unaffected by delays in the
+            Python program, and on the real car it is the monotonic clock when the
+            vectors were read.  In RacecarSim, both vectors are received in a single
+            request.
+
+        Example::
+
+            accel, ang_vel, timestamp = rc.physics.get_imu()
+
+            # Integrate the yaw rate over the time since the previous frame
+            yaw += ang_vel[1] * (timestamp - prev_timestamp)
+            prev_timestamp = timestamp
+        """
+        return (
+            self.get_linear_acceleration(),
+            self.get_angular_velocity(),
+            clock.now(),
+        )
+
+    async def fetch_linear_acceleration(self) -> NDArray[3, np.float32]:
+        """
+        Returns the car's linear acceleration, waiting without blocking.
+
+        Returns:
+            The same vector as get_linear_acceleration().
+
+        Example::
+
+            async def update():
+                accel, ang_vel = await asyncio.gather(
+                    rc.physics.fetch_linear_acceleration(),
+                    rc.physics.fetch_angular_velocity(),
+                )
+        """
+        return self.get_linear_acceleration()
+
+    async def fetch_angular_velocity(self) -> NDArray[3, np.float32]:
+        """
+        Returns the car's angular velocity, waiting without blocking.
+
+        Returns:
+            The same vector as get_angular_velocity().
+
+        Example::
+
+            async def update():
+                ang_vel = await rc.physics.fetch_angular_velocity()
+        """
+        return self.get_angular_velocity()
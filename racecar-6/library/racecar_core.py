@@ -11,12 +11,15 @@ import sys
 from typing import Callable, Optional
 
 import camera
+import clock
 import controller
 import display
 import drive
 import lidar
 import physics
 
+from frame_budget import FrameBudget
+from periodic_scheduler import PeriodicTask
 import racecar_utils as rc_utils
 
 
@@ -33,6 +36,8 @@ class Racecar(abc.ABC):
         self.drive: drive.Drive
         self.lidar: lidar.Lidar
         self.physics: physics.Physics
+        self.clock: clock.Clock
+        self.frame_budget: FrameBudget
 
     @abc.abstractmethod
     def go(self) -> None:
@@ -65,6 +70,11 @@ class Racecar(abc.ABC):
         Note:
             The provided functions should not take any parameters.
 
+            The provided functions may also be coroutine functions (async def), which
+            can await the fetch functions of the sensor modules, such as
+            rc.camera.fetch_color_image().  In simulation, sensor requests awaited
+            together with asyncio.gather() are in flight at the same time.
+
         Example::
 
             # Create a racecar object
@@ -117,6 +127,48 @@ class Racecar(abc.ABC):
         """
         pass
 
+    @abc.abstractmethod
+    def schedule_periodic(
+        self,
+        function: Callable[[], None],
+        period: float,
+        phase: Optional[float] = None,
+        budget: Optional[float] = None,
+    ) -> PeriodicTask:
+        """
+        Schedules a function to be called every period seconds in user program mode.
+
+        Args:
+            function: The function to call, which takes no parameters.
+            period: The time in seconds between calls.
+            phase: The time in seconds after it is scheduled at which the function is
+                first called, or None to offset it by a frame from each function
+                already scheduled, so that heavy functions do not run in the same
+                frame.
+            budget: The time in seconds a call may take before it counts as an
+                overrun, or None to use the period.
+
+        Returns:
+            The scheduled task, which records how long each call took, and can be
+            cancelled.
+
+        Note:
+            Scheduled functions are called after update, in the frames closest to
+            their scheduled times.  Scheduling a function which is already scheduled
+            replaces its previous schedule.
+
+            update_slow is itself scheduled this way, every update_slow time.
+
+        Example::
+
+            # Looks for AR markers 5 times per second instead of every frame
+            markers_task = rc.schedule_periodic(find_markers, 0.2)
+
+            # Prints how long find_markers takes and how often it overran
+            print(markers_task)
+        """
+        pass
+
 
 def create_racecar(isSimulation: Optional[bool] = None) -> Racecar:
     """
@@ -127,13 +179,32 @@ def create_racecar(isSimulation: Optional[bool] = None) -> Racecar:
             if None, decide based on the command line arguments
 
     Returns:
-        A RacecarSim object (for use with the Unity simulation) or a RacecarReal object
-        (for use on the physical car).
+        A RacecarSim object (for use with the Unity simulation), a RacecarReal object
+        (for use on the physical car), or a RacecarReplay object (for replaying a log
+        of sensor data).
 
     Note:
         If isSimulation is None, this function will return a RacecarSim if the program
         was executed with the "-s" flag and a RacecarReal otherwise.
 
+        If the program was executed with the "-r <log>" flag, a RacecarReplay is
+        returned instead, which replays the log as fast as the program can run.  The
+        log may be one recorded with the "-l" flag, whose frames are exported to a
+        "replay" subdirectory of the log the first time it is replayed (see
+        replay_log.ReplayLog).
+
+        If the program was executed with the "-l <dir>" flag, the sensor data of every
+        frame is logged to that directory (see sensor_log.SensorLogWriter).
+
+        If the program was executed with the "-n" flag in simulation, the newest
+        protocol version which RacecarSim supports is negotiated, which newer
+        RacecarSim builds require for snapshots and shared memory (see
+        RacecarSim.set_protocol_negotiation).
+
+        If the program was executed with the "-t <camera|lidar>" flag on the real car,
+        each frame begins when that sensor sends a new sample instead of on a fixed
+        timer (see RacecarReal.set_update_trigger).
+
         If the program was executed with the "-d" flag, a display window is created.
 
         If the program was executed with the "-h" flag, it is run in headless mode,
@@ -142,6 +213,23 @@ def create_racecar(isSimulation: Optional[bool] = None) -> Racecar:
     library_path: str = __file__.replace("racecar_core.py", "")
     isHeadless: bool = "-h" in sys.argv
     initializeDisplay: bool = "-d" in sys.argv
+    negotiateVersion: bool = "-n" in sys.argv
+    replayLog: Optional[str] = None
+    if "-r" in sys.argv:
+        index = sys.argv.index("-r") + 1
+        assert index < len(sys.argv), "The -r flag must be followed by a log path."
+        replayLog = sys.argv[index]
+    sensorLog: Optional[str] = None
+    if "-l" in sys.argv:
+        index = sys.argv.index("-l") + 1
+        assert index < len(sys.argv), "The -l flag must be followed by a directory."
+        sensorLog = sys.argv[index]
+    updateTrigger: Optional[str] = None
+    if "-t" in sys.argv:
+        index = sys.argv.index("-t") + 1
+        assert index < len(sys.argv), "The -t flag must be followed by a sensor."
+        updateTrigger = sys.argv[index]
+        assert updateTrigger in ("camera", "lidar"), "-t must be camera or lidar."
 
     # If isSimulation was not specified, set it to True if the user ran the program with
     # the -s flag and false otherwise
@@ -149,16 +237,28 @@ def create_racecar(isSimulation: Optional[bool] = None) -> Racecar:
         isSimulation = "-s" in sys.argv
 
     racecar: Racecar
-    if isSimulation:
+    if replayLog is not None:
+        sys.path.insert(1, library_path + "replay")
+        from racecar_core_replay import RacecarReplay
+
+        racecar = RacecarReplay(replayLog, isHeadless)
+    elif isSimulation:
         sys.path.insert(1, library_path + "simulation")
         from racecar_core_sim import RacecarSim
 
         racecar = RacecarSim(isHeadless)
+        racecar.set_protocol_negotiation(negotiateVersion)
     else:
         sys.path.insert(1, library_path + "real")
         from racecar_core_real import RacecarReal
 
         racecar = RacecarReal(isHeadless)
+        if updateTrigger is not None:
+            racecar.set_update_trigger(RacecarReal.UpdateTrigger[updateTrigger.upper()])
+
+    # A replay is not logged again, since it already has a log
+    if sensorLog is not None and replayLog is None:
+        racecar.start_logging(sensorLog)
 
     if initializeDisplay:
         racecar.display.create_window()
@@ -167,6 +267,10 @@ def create_racecar(isSimulation: Optional[bool] = None) -> Racecar:
         ">> Racecar created with the following options:"
         + f"\n    Simulation (-s): [{isSimulation}]"
         + f"\n    Headless (-h): [{isHeadless}]"
+        + f"\n    Protocol negotiation (-n): [{negotiateVersion}]"
+        + f"\n    Replay log (-r): [{replayLog}]"
+        + f"\n    Log (-l): [{sensorLog}]"
+        + f"\n    Update trigger (-t): [{updateTrigger}]"
         + f"\n    Initialize with display (-d): [{initializeDisplay}]",
         rc_utils.TerminalColor.pink,
     )
@@ -12,6 +12,8 @@ from typing import *
 from nptyping import NDArray
 from enum import Enum, IntEnum
 
+import image_context
+
 
 ########################################################################################
 # General
@@ -334,6 +336,45 @@ class ColorBGR(Enum):
     brown = (0, 63, 127)
 
 
+def get_hsv_image(
+    color_image: NDArray[(Any, Any, 3), np.uint8],
+) -> NDArray[(Any, Any, 3), np.uint8]:
+    """
+    Converts a color image to the hue-saturation-value format.
+
+    Args:
+        color_image: The color image to convert, with pixels represented in the bgr
+            (blue-green-red) format.
+
+    Returns:
+        The image with pixels represented in the hsv (hue-saturation-value) format.
+
+    Note:
+        If color_image is the image returned by rc.camera.get_color_image() this
+        frame, or a crop of it, the whole frame is converted the first time it is
+        needed, and a read-only view into that conversion is returned.  Any number
+        of color queries on the frame and its crops therefore cost one conversion.
+
+        Any other image, such as a copy which was drawn on, is converted each call.
+
+    Example::
+
+        image = rc.camera.get_color_image()
+
+        # Both halves are views into the same conversion of the whole image
+        left_hsv = rc_utils.get_hsv_image(
+            rc_utils.crop(image, (0, 0), (image.shape[0], image.shape[1] // 2))
+        )
+        hsv = rc_utils.get_hsv_image(image)
+    """
+    context = image_context.get_current()
+    if context is not None:
+        hsv_image = context.get_hsv_view(color_image)
+        if hsv_image is not None:
+            return hsv_image
+    return cv.cvtColor(color_image, cv.COLOR_BGR2HSV)
+
+
 def find_contours(
     color_image: NDArray[(Any, Any, 3), np.uint8],
     hsv_lower: Tuple[int, int, int],
@@ -388,8 +429,8 @@ def find_contours(
     ), f"The value channel of hsv_lower ({hsv_lower}) must be less than that of of hsv_upper ({hsv_upper})."
 
     # Convert the image from a blue-green-red pixel representation to a
-    # hue-saturation-value representation
-    hsv_image = cv.cvtColor(color_image, cv.COLOR_BGR2HSV)
+    # hue-saturation-value representation, shared with other queries on the frame
+    hsv_image = get_hsv_image(color_image)
 
     # Create a mask containing the pixels in the image with hsv values between
     # hsv_lower and hsv_upper.
@@ -460,9 +501,14 @@ def draw_contour(
         color: The color to draw the contour, specified as
             blue-green-red channels each ranging from 0 to 255 inclusive.
 
+    Note:
+        The image is drawn on directly, so it must be writable: draw on
+        rc.camera.get_color_image_copy() rather than the read-only image returned by
+        rc.camera.get_color_image().
+
     Example::
 
-        image = rc.camera.get_color_image()
+        image = rc.camera.get_color_image_copy()
 
         # Extract the largest blue contour
         BLUE_HSV_MIN = (90, 50, 50)
@@ -479,6 +525,11 @@ def draw_contour(
             0 <= channel <= 255
         ), f"Each channel in color ({color}) must be in the range 0 to 255 inclusive."
 
+    assert color_image.flags.writeable, (
+        "color_image is read-only; draw on a writable copy from "
+        "rc.camera.get_color_image_copy() instead."
+    )
+
     cv.drawContours(color_image, [contour], 0, color, 3)
 
 
@@ -498,9 +549,14 @@ def draw_circle(
             blue-green-red channels each ranging from 0 to 255 inclusive.
         radius: The radius of the circle in pixels.
 
+    Note:
+        The image is drawn on directly, so it must be writable: draw on
+        rc.camera.get_color_image_copy() rather than the read-only image returned by
+        rc.camera.get_color_image().
+
     Example::
 
-        image = rc.camera.get_color_image()
+        image = rc.camera.get_color_image_copy()
 
         # Extract the largest blue contour
         BLUE_HSV_MIN = (90, 50, 50)
@@ -526,6 +582,11 @@ def draw_circle(
     ), f"center[1] ({center[1]}) must be a pixel column index in color_image."
     assert radius > 0, f"radius ({radius}) must be a positive integer."
 
+    assert color_image.flags.writeable, (
+        "color_image is read-only; draw on a writable copy from "
+        "rc.camera.get_color_image_copy() instead."
+    )
+
     # cv.circle expects the center in (column, row) format
     cv.circle(color_image, (center[1], center[0]), radius, color, -1)
 
@@ -642,6 +703,7 @@ def get_pixel_average_distance(
     depth_image: NDArray[(Any, Any), np.float32],
     pix_coord: Tuple[int, int],
     kernel_size: int = 5,
+    scale: int = 1,
 ) -> float:
     """
     Finds the distance of a pixel averaged with its neighbors in a depth image.
@@ -650,6 +712,9 @@ def get_pixel_average_distance(
         depth_image: The depth image to process.
         pix_coord: The (row, column) of the pixel to measure.
         kernel_size: The size of the area to average around the pixel.
+        scale: The scale of a native resolution depth image, as returned by
+            rc.camera.get_depth_image_native(), in which case pix_coord and
+            kernel_size are given in full resolution pixels.
 
     Returns:
         The distance in cm of the object at the provided pixel.
@@ -668,7 +733,17 @@ def get_pixel_average_distance(
 
         # Find the distance of the object (in cm) at the pixel (100, 20) of depth_image
         average_distance = rc_utils.get_average_distance(depth_image, 100, 20)
+
+        # Find the same distance from the native resolution depth image
+        depth_image, scale = rc.camera.get_depth_image_native()
+        average_distance = rc_utils.get_pixel_average_distance(
+            depth_image, (100, 20), scale=scale
+        )
     """
+    if scale > 1:
+        pix_coord = (pix_coord[0] // scale, pix_coord[1] // scale)
+        kernel_size = _scale_kernel_size(kernel_size, scale)
+
     (pix_row, pix_col) = pix_coord
     assert (
         0 <= pix_row < depth_image.shape[0]
@@ -711,7 +786,7 @@ def get_pixel_average_distance(
 
 
 def get_closest_pixel(
-    depth_image: NDArray[(Any, Any), np.float32], kernel_size: int = 5
+    depth_image: NDArray[(Any, Any), np.float32], kernel_size: int = 5, scale: int = 1
 ) -> Tuple[int, int]:
     """
     Finds the closest pixel in a depth image.
@@ -719,9 +794,13 @@ def get_closest_pixel(
     Args:
         depth_image: The depth image to process.
         kernel_size: The size of the area to average around each pixel.
+        scale: The scale of a native resolution depth image, as returned by
+            rc.camera.get_depth_image_native(), in which case kernel_size is given in
+            full resolution pixels.
 
     Returns:
-        The (row, column) of the pixel which is closest to the car.
+        The (row, column) of the pixel which is closest to the car, in full
+        resolution pixels.
 
     Warning:
         kernel_size be positive and odd.
@@ -744,23 +823,40 @@ def get_closest_pixel(
 
         # Find the closest pixel
         closest_pixel = rc_utils.get_closest_pixel(depth_image)
+
+        # Find the closest pixel from the native resolution depth image, which is
+        # much faster in simulation
+        depth_image, scale = rc.camera.get_depth_image_native()
+        closest_pixel = rc_utils.get_closest_pixel(depth_image, scale=scale)
     """
     assert (
         kernel_size > 0 and kernel_size % 2 == 1
     ), f"kernel_size ({kernel_size}) must positive and odd."
+    if scale > 1:
+        kernel_size = _scale_kernel_size(kernel_size, scale)
 
     # Shift 0.0 values to 10,000 so they are not considered for the closest pixel
     depth_image = (depth_image - 0.01) % 10000
 
     # Apply a Gaussian blur to to reduce noise
+    blurred_image = depth_image
     if kernel_size > 1:
         blurred_image = cv.GaussianBlur(depth_image, (kernel_size, kernel_size), 0)
 
     # Find the pixel location of the minimum depth
     (_, _, minLoc, _) = cv.minMaxLoc(blurred_image)
 
-    # minLoc is formatted as (column, row), so we flip the order
-    return (minLoc[1], minLoc[0])
+    # minLoc is formatted as (column, row), so we flip the order, and a native
+    # resolution pixel is mapped to the center of the pixels it covers
+    return (minLoc[1] * scale + scale // 2, minLoc[0] * scale + scale // 2)
+
+
+def _scale_kernel_size(kernel_size: int, scale: int) -> int:
+    """
+    Converts a kernel size in full resolution pixels to the nearest odd size in
+    native resolution depth pixels.
+    """
+    return (kernel_size // scale) // 2 * 2 + 1
 
 
 def colormap_depth_image(
@@ -1180,20 +1276,25 @@ def draw_ar_markers(
         color: The color used to outline each AR marker, represented in the BGR format.
 
     Warning:
-        This modifies the provided image. If you accessed the image with
-        rc.camera.get_color_image_no_copy(), you must manually create a copy of the
-        image first with copy.deepcopy().
+        This modifies the provided image, which must be writable: draw on
+        rc.camera.get_color_image_copy() rather than the image returned by
+        rc.camera.get_color_image() or rc.camera.get_color_image_no_copy().
 
     Example::
 
-        # Detect the AR markers in the current color image
-        image = rc.camera.get_color_image()
+        # Detect the AR markers in a copy of the current color image
+        image = rc.camera.get_color_image_copy()
         markers = rc_utils.get_ar_markers(image)
 
         # Draw the detected markers an the image and display it
         rc_utils.draw_ar_markers(image, markers)
         rc.display.show_color_image(color_image)
     """
+    assert color_image.flags.writeable, (
+        "color_image is read-only; draw on a writable copy from "
+        "rc.camera.get_color_image_copy() instead."
+    )
+
     ids = np.zeros((len(markers), 1), np.int32)
     corners = []
     for i in range(len(markers)):
@@ -9,12 +9,16 @@ Contains the Camera module of the racecar_core library
 from camera import Camera
 
 # General
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
 import cv2 as cv
 import numpy as np
 from nptyping import NDArray
 
 # ROS2
 import rclpy as ros2
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
 from rclpy.qos import (
     QoSDurabilityPolicy,
     QoSHistoryPolicy,
@@ -25,11 +29,44 @@ from sensor_msgs.msg import Image
 from cv_bridge import CvBridge, CvBridgeError
 
 
+class _ColorFrame:
+    """
+    A compressed color image received from the camera, which is decoded the first
+    time it is read (and again if it is read at a different processing scale).
+    """
+
+    __slots__ = ("number", "jpeg", "time", "image", "reduction", "counted")
+
+    def __init__(
+        self, number: int, jpeg: NDArray[np.uint8], arrival_time: float
+    ) -> None:
+        self.number = number
+        self.jpeg = jpeg
+        self.time = arrival_time
+
+        # The decoded image and the reduction it was decoded at, or None if the frame
+        # has not been decoded
+        self.image: Optional[NDArray[(480, 640, 3), np.uint8]] = None
+        self.reduction: Optional[int] = None
+
+        # Whether the frame has been counted as decoded or dropped
+        self.counted = False
+
+
 class CameraReal(Camera):
     # The ROS topic from which we read camera data
     __COLOR_TOPIC = "/camera/color"
     __DEPTH_TOPIC = "/camera/depth"
 
+    # The imdecode flags which decode a JPEG image with its width and height divided
+    # by each reduction, which skip most of the decoding work for the lost pixels
+    __DECODE_FLAGS = {
+        1: cv.IMREAD_COLOR,
+        2: cv.IMREAD_REDUCED_COLOR_2,
+        4: cv.IMREAD_REDUCED_COLOR_4,
+        8: cv.IMREAD_REDUCED_COLOR_8,
+    }
+
     def __init__(self):
         self.__bridge = CvBridge()
 
@@ -43,51 +80,186 @@ class CameraReal(Camera):
         )
         qos_profile.durability = QoSDurabilityPolicy.RMW_QOS_POLICY_DURABILITY_VOLATILE
 
+        # The color and depth images are decoded in separate callback groups, so
+        # the multithreaded executor never queues one sensor's callbacks (or the
+        # lidar's, IMU's, or controller's) behind the other's decoding
+        self.__color_group = MutuallyExclusiveCallbackGroup()
+        self.__depth_group = MutuallyExclusiveCallbackGroup()
+
         # subscribe to the color image topic, which will call
         # __color_callback every time the camera publishes data
         self.__color_image_sub = self.node.create_subscription(
-            Image, self.__COLOR_TOPIC, self.__color_callback, qos_profile
+            Image,
+            self.__COLOR_TOPIC,
+            self.__color_callback,
+            qos_profile,
+            callback_group=self.__color_group,
         )
-        self.__color_image = None
-        self.__color_image_new = None
+
+        # The current and newest color frames, which hold the JPEG bytes until a
+        # get_color_image function decodes them, so frames which are replaced before
+        # anyone reads them are never decoded.  The color lock guards the frames and
+        # counters, which the callback, update, and the getters change from different
+        # threads, and is never held while decoding; the decode lock ensures each
+        # frame is decoded once.
+        self.__color_frame: Optional[_ColorFrame] = None
+        self.__color_frame_new: Optional[_ColorFrame] = None
+        self.__color_lock = threading.Lock()
+        self.__decode_lock = threading.Lock()
+
+        # The number of color frames received from the camera, decoded, and dropped
+        # (replaced before they were decoded, or unable to be decoded)
+        self.frames_received = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+
+        # The monotonic time at which the current color image arrived, and a function
+        # called whenever a color image arrives (set by RacecarReal when new color
+        # images trigger update)
+        self.__color_time: float = 0
+        self.__color_listener: Optional[Callable[[], None]] = None
 
         # subscribe to the depth image topic, which will call
         # __depth_callback every time the camera publishes data
         self.__depth_image_sub = self.node.create_subscription(
-            Image, self.__DEPTH_TOPIC, self.__depth_callback, qos_profile
+            Image,
+            self.__DEPTH_TOPIC,
+            self.__depth_callback,
+            qos_profile,
+            callback_group=self.__depth_group,
         )
         self.__depth_image = None
         self.__depth_image_new = None
 
+        # The current depth image resized to the processing scale, once it is read
+        self.__depth_image_reduced = None
+
     def __color_callback(self, data):
-        try:
-            np_arr = np.frombuffer(data.data, np.uint8) # decode jpeg image type
-            cv_color_image = cv.imdecode(np_arr, cv.IMREAD_COLOR)
-        except CvBridgeError as e:
-            print(e)
+        """
+        Stores a compressed color image message, which may be any object whose data
+        attribute holds the JPEG bytes, to be decoded when it is first read.
+        """
+        arrival_time = time.monotonic()
+        jpeg = np.frombuffer(data.data, np.uint8)
+        with self.__color_lock:
+            frame = _ColorFrame(self.frames_received, jpeg, arrival_time)
+            self.frames_received += 1
+
+            # A newest frame which update never made current is now unreachable
+            replaced = self.__color_frame_new
+            if replaced is not None and replaced is not self.__color_frame:
+                self.__drop_if_unread(replaced)
+            self.__color_frame_new = frame
 
-        self.__color_image_new = cv_color_image
+        listener = self.__color_listener
+        if listener is not None:
+            listener()
 
     def __depth_callback(self, data):
         try:
             cv_depth_image = self.__bridge.imgmsg_to_cv2(data, desired_encoding="16UC1")
         except CvBridgeError as e:
             print(e)
+            return
 
         self.__depth_image_new = cv_depth_image
 
     def __update(self):
         self.__depth_image = self.__depth_image_new
-        self.__color_image = self.__color_image_new
+        self.__depth_image_reduced = None
+        with self.__color_lock:
+            replaced = self.__color_frame
+            frame = self.__color_frame_new
+            if frame is not replaced:
+                if replaced is not None:
+                    self.__drop_if_unread(replaced)
+                self.__color_frame = frame
+                self.__color_time = frame.time
+                self._start_color_frame()
+
+    def __get_fetched(
+        self,
+    ) -> Tuple[
+        Optional[NDArray[(480, 640, 3), np.uint8]], Optional[NDArray[(480, 640), Any]]
+    ]:
+        """
+        Returns the current color image if it has already been decoded at the
+        processing scale (otherwise None, so that it is not decoded just to be
+        logged), and the current depth image as received.
+        """
+        frame = self.__color_frame
+        color_image = None
+        if frame is not None and frame.reduction == self._reduction:
+            color_image = frame.image
+        return color_image, self.__depth_image
+
+    def __drop_if_unread(self, frame: _ColorFrame) -> None:
+        """
+        Counts a frame which can no longer be read as dropped if it was never decoded.
+        Must be called with the color lock held.
+        """
+        if not frame.counted:
+            frame.counted = True
+            self.frames_dropped += 1
+
+    def __decode(
+        self, frame: Optional[_ColorFrame]
+    ) -> Optional[NDArray[(480, 640, 3), np.uint8]]:
+        """
+        Returns the decoded image of a frame at the processing scale, decoding it if
+        this is the first time it has been read at that scale.
+        """
+        if frame is None:
+            return None
+        with self.__decode_lock:
+            reduction = self._reduction
+            if frame.reduction != reduction:
+                # Count the frame now, so it is not counted as dropped if it is
+                # replaced while it is decoded
+                with self.__color_lock:
+                    first_decode = not frame.counted
+                    frame.counted = True
+                frame.image = cv.imdecode(frame.jpeg, self.__DECODE_FLAGS[reduction])
+                frame.reduction = reduction
+                if first_decode:
+                    with self.__color_lock:
+                        if frame.image is None:
+                            self.frames_dropped += 1
+                        else:
+                            self.frames_decoded += 1
+                if frame.image is None:
+                    print(">> Unable to decode a color image from the camera")
+            return frame.image
+
+    def __reduce_depth_image(
+        self, depth_image: Optional[NDArray[(480, 640), np.float32]]
+    ) -> Optional[NDArray[(480, 640), np.float32]]:
+        """
+        Returns a depth image resized to the processing scale.
+        """
+        if depth_image is None or self._reduction == 1:
+            return depth_image
+        # Nearest neighbor, so that pixels with no data are not averaged into their
+        # neighbors' distances
+        return cv.resize(
+            depth_image,
+            (self.get_width(), self.get_height()),
+            interpolation=cv.INTER_NEAREST,
+        )
 
     def get_color_image_no_copy(self) -> NDArray[(480, 640, 3), np.uint8]:
-        return self.__color_image
+        return self.__decode(self.__color_frame)
 
     def get_depth_image(self) -> NDArray[(480, 640), np.float32]:
-        return self.__depth_image
+        # Resize the current depth image at most once per frame (or per scale)
+        depth_image = self.__depth_image_reduced
+        if depth_image is None or depth_image.shape[1] != self.get_width():
+            depth_image = self.__reduce_depth_image(self.__depth_image)
+            self.__depth_image_reduced = depth_image
+        return depth_image
 
     def get_color_image_async(self) -> NDArray[(480, 640, 3), np.uint8]:
-        return self.__color_image_new
+        return self.__decode(self.__color_frame_new)
 
     def get_depth_image_async(self) -> NDArray[(480, 640), np.float32]:
-        return self.__depth_image_new
+        return self.__reduce_depth_image(self.__depth_image_new)
@@ -14,6 +14,7 @@ from typing import Tuple
 
 # ROS2
 import rclpy as ros2
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
 from sensor_msgs.msg import Joy
 
 
@@ -81,10 +82,18 @@ class ControllerReal(Controller):
         # ROS node
         self.node = ros2.create_node("controller")
 
+        # Controller messages are handled in their own callback group, so the
+        # multithreaded executor never queues button presses behind camera decoding
+        self.__callback_group = MutuallyExclusiveCallbackGroup()
+
         # subscribe to the controller topic, which will call
         # __controller_callback every time the controller state changes
         self.__subscriber = self.node.create_subscription(
-            Joy, self.__TOPIC, self.__controller_callback, 1
+            Joy,
+            self.__TOPIC,
+            self.__controller_callback,
+            1,
+            callback_group=self.__callback_group,
         )
 
     def is_down(self, button: Controller.Button) -> bool:
@@ -39,6 +39,9 @@ class DriveReal(Drive):
         self.__message = AckermannDriveStamped()
         self.__max_speed = 0.25
 
+        # The speed and angle most recently set, which are recorded by sensor logs
+        self.__speed_angle = (0.0, 0.0)
+
     def set_speed_angle(self, speed: float, angle: float) -> None:
         assert (
             -1.0 <= speed <= 1.0
@@ -47,6 +50,7 @@ class DriveReal(Drive):
             -1.0 <= angle <= 1.0
         ), f"angle [{angle}] must be between -1.0 and 1.0 inclusive."
 
+        self.__speed_angle = (speed, angle)
         self.__message.drive.speed = speed * self.__max_speed
 
         angle = -angle
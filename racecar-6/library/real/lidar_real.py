@@ -9,11 +9,14 @@ Contains the Lidar module of the racecar_core library
 from lidar import Lidar
 
 # General
+import time
+from typing import Callable, Optional
 import numpy as np
 from nptyping import NDArray
 
 # ROS2
 import rclpy as ros2
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
 from rclpy.qos import qos_profile_sensor_data
 from sensor_msgs.msg import LaserScan
 from cv_bridge import CvBridge, CvBridgeError
@@ -28,22 +31,44 @@ class LidarReal(Lidar):
         # ROS node
         self.node = ros2.create_node("scan_sub")
 
+        # Scans are handled in their own callback group, so the multithreaded
+        # executor never queues them behind camera decoding
+        self.__callback_group = MutuallyExclusiveCallbackGroup()
+
         # subscribe to the scan topic, which will call
         # __scan_callback every time the lidar sends data
         self.__scan_sub = self.node.create_subscription(
-            LaserScan, self.__SCAN_TOPIC, self.__scan_callback, qos_profile_sensor_data
+            LaserScan,
+            self.__SCAN_TOPIC,
+            self.__scan_callback,
+            qos_profile_sensor_data,
+            callback_group=self.__callback_group,
         )
 
         self.__samples = np.empty(0)
         self.__samples_new = np.empty(0)
 
+        # The monotonic time at which the current and newest samples arrived, and a
+        # function called whenever samples arrive (set by RacecarReal when new
+        # samples trigger update)
+        self.__samples_time: float = 0
+        self.__samples_time_new: float = 0
+        self.__samples_listener: Optional[Callable[[], None]] = None
+
     # LIDAR Scan returns value in meters, multiplying by 100 to be processed in cm
     # LIDAR Scan reversed, flipping order of data entry to correct for CW spin
     def __scan_callback(self, data):
+        arrival_time = time.monotonic()
         self.__samples_new = np.flip(np.multiply(np.array(data.ranges), 100))
-        
+        self.__samples_time_new = arrival_time
+
+        listener = self.__samples_listener
+        if listener is not None:
+            listener()
+
     def __update(self):
         self.__samples = self.__samples_new
+        self.__samples_time = self.__samples_time_new
 
     def get_samples(self) -> NDArray[720, np.float32]:
         return self.__samples
@@ -15,6 +15,7 @@ from nptyping import NDArray
 
 # ROS2
 import rclpy as ros2
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
 from rclpy.qos import (
     QoSDurabilityPolicy,
     QoSHistoryPolicy,
@@ -42,15 +43,27 @@ class PhysicsReal(Physics):
         )
         qos_profile.durability = QoSDurabilityPolicy.RMW_QOS_POLICY_DURABILITY_VOLATILE
 
+        # IMU samples are handled in their own callback group, so the multithreaded
+        # executor never queues them behind camera decoding
+        self.__callback_group = MutuallyExclusiveCallbackGroup()
+
         # subscribe to the accel topic, which will call
         # __accel_callback every time the camera publishes data
         self.__accel_sub = self.node.create_subscription(
-            Imu, self.__ACCEL_TOPIC, self.__accel_callback, qos_profile
+            Imu,
+            self.__ACCEL_TOPIC,
+            self.__accel_callback,
+            qos_profile,
+            callback_group=self.__callback_group,
         )
         # subscribe to the gyro topic, which will call
         # __gyro_callback every time the camera publishes data
         self.__gyro_sub = self.node.create_subscription(
-            Imu, self.__GYRO_TOPIC, self.__gyro_callback, qos_profile
+            Imu,
+            self.__GYRO_TOPIC,
+            self.__gyro_callback,
+            qos_profile,
+            callback_group=self.__callback_group,
         )
 
         self.__acceleration = np.array([0, 0, 0])
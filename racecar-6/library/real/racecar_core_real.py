@@ -7,12 +7,16 @@ Contains the Racecar class, the top level of the racecar_core library
 """
 
 # General
-from datetime import datetime
+import asyncio
+from enum import IntEnum
+import inspect
 import threading
-from typing import Callable, Optional
+import time
+from typing import Callable, List, Optional, Tuple
 
 # ROS2
 import rclpy as ros2
+from rclpy.executors import MultiThreadedExecutor
 
 # racecar_core modules
 import camera_real
@@ -22,20 +26,51 @@ import drive_real
 import lidar_real
 import physics_real
 
+import clock
+from frame_budget import FrameBudget
+from loop_timing import LoopTiming
+from periodic_scheduler import PeriodicScheduler, PeriodicTask
 from racecar_core import Racecar
+import racecar_utils as rc_utils
+from sensor_log import SensorLogWriter
 
 
 class RacecarReal(Racecar):
+    class UpdateTrigger(IntEnum):
+        """
+        What begins each frame of the run thread.
+        """
+
+        FIXED_RATE = 0  # The fixed frame rate timer
+        CAMERA = 1  # A new color image from the camera
+        LIDAR = 2  # A new scan from the lidar
+
     # Default number of seconds to wait between calls to update_slow
     __DEFAULT_UPDATE_SLOW_TIME = 1
 
     # Number of frames per second
     __FRAME_RATE = 60
 
+    # Number of executor threads, one for each callback group: the rate timer, camera
+    # color and depth, lidar, IMU, and controller
+    __EXECUTOR_THREADS = 6
+
+    # The phases of each frame of the run thread, which are timed separately
+    __LOOP_PHASES = ("update", "log", "modules", "periodic")
+
+    # The age of each sensor's data when update began, recorded with each frame
+    __LOOP_LATENCIES = ("camera_latency", "lidar_latency")
+
+    # Default number of seconds to wait for the trigger sensor before falling back to
+    # the fixed frame rate
+    __DEFAULT_TRIGGER_TIMEOUT = 0.1
+
     def __init__(self, isHeadless: bool = False):
-        # initialize ROS 2
+        # initialize ROS 2.  Each sensor module handles its messages in its own
+        # callback group, and the multithreaded executor runs the groups in parallel,
+        # so decoding a camera image does not delay lidar, IMU, or controller messages
         ros2.init()
-        self.__executor = ros2.get_global_executor()
+        self.__executor = MultiThreadedExecutor(self.__EXECUTOR_THREADS)
         self.__rate_node = ros2.create_node("rate_node")
 
         # Modules
@@ -45,6 +80,8 @@ class RacecarReal(Racecar):
         self.drive = drive_real.DriveReal()
         self.lidar = lidar_real.LidarReal()
         self.physics = physics_real.PhysicsReal()
+        self.clock = clock.MonotonicClock()
+        clock.set_current(self.clock)
 
         # Add all nodes to the executor
         rate_added = self.__executor.add_node(self.__rate_node)
@@ -66,18 +103,52 @@ class RacecarReal(Racecar):
         self.__user_update = None
         self.__user_update_slow = None
 
+        # Event loops for coroutine user functions, one per calling thread
+        self.__event_loops = threading.local()
+
         # True if the main thread should be running
         self.__running = False
 
+        # The sensor log written before the modules are updated each frame, if
+        # logging was started
+        self.__sensor_log: Optional[SensorLogWriter] = None
+
+        # The time of each frame and of its phases against its deadline, and the
+        # optional work shed once a frame runs long.  Logging is critical, so an
+        # overrun frame is never silently left out of the log, and is registered so
+        # that its time is reported alongside the optional tasks.
+        self.frame_budget = FrameBudget(
+            1 / self.__FRAME_RATE,
+            phases=self.__LOOP_PHASES,
+            extras=self.__LOOP_LATENCIES,
+        )
+        self.__log_task = self.frame_budget.register(
+            "sensor_log", SensorLogWriter.log_frame, critical=True
+        )
+
         # Variables relating to the run thread
         self.__run_thread = None
         self.__cur_update = self.__default_update
-        self.__cur_update_slow = None
-        self.__cur_frame_time = datetime.now()
-        self.__last_frame_time = datetime.now()
-        self.__cur_update_counter = 0
-        self.__max_update_counter = 1
-        self.set_update_slow_time(self.__DEFAULT_UPDATE_SLOW_TIME)
+        self.__cur_frame_time = time.monotonic()
+        self.__last_frame_time = self.__cur_frame_time
+        self.__loop_timing_summary: bool = False
+
+        # The sensor whose samples begin each frame, which sets the trigger event
+        # from the executor thread, and the frames which began with a new sample or
+        # after a timeout
+        self.__update_trigger = self.UpdateTrigger.FIXED_RATE
+        self.__trigger_timeout = self.__DEFAULT_TRIGGER_TIMEOUT
+        self.__trigger_event = threading.Event()
+        self.__triggered_frames = 0
+        self.__timed_out_frames = 0
+
+        # Functions run after update at fixed periods in user program mode, including
+        # update_slow and the loop timing summary, which are scheduled every
+        # update_slow_time seconds
+        self.__scheduler = PeriodicScheduler()
+        self.__cur_scheduler: Optional[PeriodicScheduler] = None
+        self.__update_slow_time = self.__DEFAULT_UPDATE_SLOW_TIME
+        self.__update_slow_tasks: List[PeriodicTask] = []
 
         # Start run_thread in default drive mode
         self.__handle_back()
@@ -102,6 +173,8 @@ class RacecarReal(Racecar):
                 self.__executor.spin_once()
             except KeyboardInterrupt:
                 break
+        self.stop_logging()
+        self.__executor.shutdown()
         ros2.shutdown()
 
     def set_start_update(
@@ -113,12 +186,123 @@ class RacecarReal(Racecar):
         self.__user_start = start
         self.__user_update = update
         self.__user_update_slow = update_slow
+        self.__schedule_update_slow()
 
     def get_delta_time(self) -> float:
-        return (self.__cur_frame_time - self.__last_frame_time).total_seconds()
+        return self.__cur_frame_time - self.__last_frame_time
 
     def set_update_slow_time(self, time: float = 1.0) -> None:
-        self.__max_update_counter = max(1, round(time * self.__FRAME_RATE))
+        self.__update_slow_time = time
+        self.__schedule_update_slow()
+
+    def schedule_periodic(
+        self,
+        function: Callable[[], None],
+        period: float,
+        phase: Optional[float] = None,
+        budget: Optional[float] = None,
+    ) -> PeriodicTask:
+        return self.__scheduler.add(function, period, phase, budget)
+
+    def get_loop_timing(self) -> LoopTiming:
+        """
+        Returns the timing of the run thread's frames, whose phases are update (with
+        deferred frame budget tasks), log, modules, and periodic (update_slow and
+        the other periodic functions), with the camera_latency and lidar_latency
+        extras (see set_update_trigger).
+
+        Example::
+
+            # The 99th percentile of the time taken by update, in seconds
+            p99 = rc.get_loop_timing().get_percentiles("update", [99])[0]
+        """
+        return self.frame_budget.timing
+
+    def set_update_trigger(
+        self,
+        trigger: "RacecarReal.UpdateTrigger",
+        timeout: float = __DEFAULT_TRIGGER_TIMEOUT,
+    ) -> None:
+        """
+        Sets what begins each frame: the fixed frame rate timer, or the arrival of a
+        new sample from the camera or lidar.
+
+        With a sensor trigger, each frame waits for the sensor's next sample and then
+        updates the sensor modules right away, so update sees the sample as soon as
+        it arrives instead of up to a frame later.  If no sample arrives within
+        timeout seconds, frames fall back to the fixed frame rate until one does.
+
+        The age of each sensor's data when update begins is recorded by the loop
+        timing (see get_loop_timing) as camera_latency and lidar_latency, in every
+        mode, so the modes can be compared.
+
+        Args:
+            trigger: What begins each frame.
+            timeout: The seconds to wait for a sample before falling back to the
+                fixed frame rate.
+
+        Example::
+
+            # Run update whenever the lidar sends a scan
+            rc.set_update_trigger(rc.UpdateTrigger.LIDAR)
+
+            # The 95th percentile of the age of the scan when update begins
+            p95 = rc.get_loop_timing().get_percentiles("lidar_latency", [95])[0]
+        """
+        assert timeout > 0, f"timeout [{timeout}] must be greater than 0."
+        self.__trigger_timeout = timeout
+        self.__update_trigger = trigger
+        listener = self.__trigger_event.set
+        self.camera._CameraReal__color_listener = (
+            listener if trigger == self.UpdateTrigger.CAMERA else None
+        )
+        self.lidar._LidarReal__samples_listener = (
+            listener if trigger == self.UpdateTrigger.LIDAR else None
+        )
+
+    def get_update_trigger_counts(self) -> Tuple[int, int]:
+        """
+        Returns the number of frames which began with a new sample from the trigger
+        sensor, and the number which began after waiting for it timed out.
+        """
+        return self.__triggered_frames, self.__timed_out_frames
+
+    def set_loop_timing_summary(self, enabled: bool = True) -> None:
+        """
+        Enables or disables printing the loop timing (see get_loop_timing) every
+        update_slow_time seconds in user program mode, alongside update_slow.
+        """
+        self.__loop_timing_summary = enabled
+        self.__schedule_update_slow()
+
+    def start_logging(self, path: str, chunk_frames: int = 600) -> SensorLogWriter:
+        """
+        Begins recording the sensor data of every frame to a log (see SensorLogWriter).
+
+        Args:
+            path: The directory in which to write the log.
+            chunk_frames: The number of frames in each chunk file of the log.
+
+        Returns:
+            The log writer, whose frames_written and frames_dropped counters report
+            whether the disk is keeping up.
+        """
+        self.stop_logging()
+        self.__sensor_log = SensorLogWriter(path, chunk_frames)
+        return self.__sensor_log
+
+    def stop_logging(self) -> None:
+        """
+        Finishes writing the sensor log, if logging was started.
+        """
+        sensor_log, self.__sensor_log = self.__sensor_log, None
+        if sensor_log is not None:
+            sensor_log.close()
+            rc_utils.print_colored(
+                f">> Logged {sensor_log.frames_written} frames to [{sensor_log.path}] "
+                f"({sensor_log.frames_dropped} dropped).",
+                rc_utils.TerminalColor.green,
+            )
 
     def __handle_start(self):
         """
@@ -132,9 +316,9 @@ class RacecarReal(Racecar):
             )
         else:
             print(">> Entering user program mode")
-            self.__user_start()
+            self.__call_user_function(self.__user_start)
             self.__cur_update = self.__user_update
-            self.__cur_update_slow = self.__user_update_slow
+            self.__cur_scheduler = self.__scheduler
 
     def __handle_back(self):
         """
@@ -143,7 +327,7 @@ class RacecarReal(Racecar):
         print(">> Entering default drive mode")
         self.__default_start()
         self.__cur_update = self.__default_update
-        self.__cur_update_slow = None
+        self.__cur_scheduler = None
 
     def __handle_exit(self):
         """
@@ -157,26 +341,147 @@ class RacecarReal(Racecar):
         Calls the current update and update_modules once per frame.
         """
         rate = self.__rate_node.create_rate(self.__FRAME_RATE)
+        timed_out = False
         while True:
+            # Read the trigger once, so a frame never updates the sensors twice or not
+            # at all when it changes
+            trigger = self.__update_trigger
+            frame_start = time.monotonic()
             self.__last_frame_time = self.__cur_frame_time
-            self.__cur_frame_time = datetime.now()
-            self.__cur_update()
-            self.__update_modules()
+            self.__cur_frame_time = frame_start
+            latencies = (
+                self.__get_latency(self.camera._CameraReal__color_time, frame_start),
+                self.__get_latency(self.lidar._LidarReal__samples_time, frame_start),
+            )
+            self.frame_budget.begin_frame()
+            self.__call_user_function(self.__cur_update)
+            self.frame_budget.run_deferred()
+            update_end = time.monotonic()
+
+            # Log the sensor data which update saw, before the modules move on to the
+            # data received during this frame
+            sensor_log = self.__sensor_log
+            if sensor_log is not None:
+                # The other sensors are already in memory, but the color image is
+                # only logged if update decoded it
+                color, depth = self.camera._CameraReal__get_fetched()
+                self.__log_task(
+                    sensor_log,
+                    self.clock.now(),
+                    self.get_delta_time(),
+                    color,
+                    depth,
+                    self.lidar.get_samples(),
+                    (
+                        *self.physics.get_linear_acceleration(),
+                        *self.physics.get_angular_velocity(),
+                    ),
+                    SensorLogWriter.read_controller(self.controller),
+                    self.drive._DriveReal__speed_angle,
+                )
+            log_end = time.monotonic()
+            if trigger == self.UpdateTrigger.FIXED_RATE:
+                self.__update_modules()
+            else:
+                # The sensors are updated once the next sample has arrived
+                self.drive._DriveReal__update()
+            modules_end = time.monotonic()
+
+            # Call update_slow and the other periodic functions which are due
+            scheduler = self.__cur_scheduler
+            if scheduler is not None:
+                scheduler.run(self.get_delta_time(), self.__call_user_function)
+            frame_end = time.monotonic()
+
+            # rate.sleep() silently slips when the frame overran, so record it first
+            self.frame_budget.end_frame(
+                (
+                    update_end - frame_start,
+                    log_end - update_end,
+                    modules_end - log_end,
+                    frame_end - modules_end,
+                ),
+                latencies,
+            )
 
-            # Use a counter to decide when we need to call update_slow
-            if self.__cur_update_slow is not None:
-                self.__cur_update_counter -= 1
-                if self.__cur_update_counter <= 0:
-                    self.__cur_update_slow()
-                    self.__cur_update_counter = self.__max_update_counter
+            if trigger == self.UpdateTrigger.FIXED_RATE:
+                rate.sleep()
+                timed_out = False
+                continue
+
+            # Wait for the trigger sensor's next sample (which may have arrived during
+            # this frame), falling back to the fixed frame rate once it times out
+            wait_time = 1 / self.__FRAME_RATE if timed_out else self.__trigger_timeout
+            remaining = frame_start + wait_time - time.monotonic()
+            timed_out = not self.__trigger_event.wait(max(remaining, 0))
+            self.__trigger_event.clear()
+            if timed_out:
+                self.__timed_out_frames += 1
+            else:
+                self.__triggered_frames += 1
+            self.__update_sensors()
+
+    def __schedule_update_slow(self) -> None:
+        """
+        Schedules update_slow and the loop timing summary every update_slow_time
+        seconds, starting with the next update.
+        """
+        for task in self.__update_slow_tasks:
+            task.cancel()
+        functions = [self.__user_update_slow]
+        if self.__loop_timing_summary:
+            functions.append(self.__print_loop_timing)
+        self.__update_slow_tasks = [
+            self.__scheduler.add(function, self.__update_slow_time, 0)
+            for function in functions
+            if function is not None
+        ]
+
+    def __print_loop_timing(self) -> None:
+        print(self.frame_budget.timing.summary())
+        print(
+            f"    camera: {self.camera.frames_received} frames received, "
+            f"{self.camera.frames_decoded} decoded, "
+            f"{self.camera.frames_dropped} dropped"
+        )
+        if self.__update_trigger != self.UpdateTrigger.FIXED_RATE:
+            print(
+                f"    {self.__update_trigger.name.lower()} trigger: "
+                f"{self.__triggered_frames} frames triggered, "
+                f"{self.__timed_out_frames} timed out"
+            )
 
-            rate.sleep()
+    @staticmethod
+    def __get_latency(sample_time: float, frame_start: float) -> float:
+        """
+        Returns the age of a sensor's current sample at the start of a frame, or 0 if
+        the sensor has not sent a sample.
+        """
+        return frame_start - sample_time if sample_time > 0 else 0.0
+
+    def __call_user_function(self, function: Callable[[], None]) -> None:
+        """
+        Calls a user function, running it to completion if it is a coroutine function.
+        """
+        result = function()
+        if inspect.isawaitable(result):
+            loop = getattr(self.__event_loops, "loop", None)
+            if loop is None:
+                loop = asyncio.new_event_loop()
+                self.__event_loops.loop = loop
+            loop.run_until_complete(result)
 
     def __update_modules(self):
         """
         Calls the update function on each module.
         """
         self.drive._DriveReal__update()
+        self.__update_sensors()
+
+    def __update_sensors(self):
+        """
+        Calls the update function on each module which receives data.
+        """
         self.controller._ControllerReal__update()
         self.camera._CameraReal__update()
         self.physics._PhysicsReal__update()
@@ -0,0 +1,86 @@
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+import cv2 as cv
+from nptyping import NDArray
+
+from camera import Camera
+
+
+class CameraReplay(Camera):
+    def __init__(self, racecar) -> None:
+        self.__racecar = racecar
+        log = racecar._RacecarReplay__log
+        self.__color: Optional[NDArray] = log.get("color")
+        self.__depth: Optional[NDArray] = log.get("depth")
+
+        # Images are views into the log, except images whose size differs from the
+        # processing scale, which are resized into a new image the first time they
+        # are read in a frame, so images kept from earlier frames never change
+        self.__color_image: Optional[NDArray[(480, 640, 3), np.uint8]] = None
+        self.__depth_image: Optional[NDArray[(480, 640), np.float32]] = None
+        self.__buffers: Dict[str, NDArray] = {}
+
+    def get_color_image_no_copy(self) -> NDArray[(480, 640, 3), np.uint8]:
+        if self.__color_image is None:
+            if self.__color is None:
+                self.__color_image = self.__get_buffer("color", (3,), np.uint8)
+            else:
+                self.__color_image = self.__resize(
+                    self.__color[self.__racecar._RacecarReplay__frame]
+                )
+        return self.__color_image
+
+    def get_color_image_async(self) -> NDArray[(480, 640, 3), np.uint8]:
+        return self.get_color_image()
+
+    def get_depth_image(self) -> NDArray[(480, 640), np.float32]:
+        if self.__depth_image is None:
+            if self.__depth is None:
+                self.__depth_image = self.__get_buffer("depth", (), np.float32)
+            else:
+                self.__depth_image = self.__resize(
+                    self.__depth[self.__racecar._RacecarReplay__frame]
+                )
+        return self.__depth_image
+
+    def get_depth_image_native(self) -> Tuple[NDArray[(Any, Any), np.float32], int]:
+        if self.__depth is None:
+            return self.get_depth_image(), 1
+        depth_image = self.__depth[self.__racecar._RacecarReplay__frame]
+        if depth_image.shape[1] > self.get_width():
+            # The logged depth image is larger than the processing scale
+            return self.get_depth_image(), 1
+        return depth_image, self.get_width() // depth_image.shape[1]
+
+    def get_depth_image_async(self) -> NDArray[(480, 640), np.float32]:
+        return self.get_depth_image().copy()
+
+    def __update(self) -> None:
+        self._start_color_frame()
+        self.__color_image = None
+        self.__depth_image = None
+
+    def __get_buffer(self, name: str, channels: Tuple[int, ...], dtype) -> NDArray:
+        """
+        Returns the blank color or depth buffer at the processing scale, which is
+        replaced when the processing scale changes.
+        """
+        shape = (self.get_height(), self.get_width()) + channels
+        buffer = self.__buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.zeros(shape, dtype)
+            self.__buffers[name] = buffer
+        return buffer
+
+    def __resize(self, image: NDArray) -> NDArray:
+        """
+        Returns a logged color or depth image at the processing scale, which is resized
+        if its size differs.
+        """
+        if image.shape[:2] == (self.get_height(), self.get_width()):
+            return image
+        return cv.resize(
+            image,
+            (self.get_width(), self.get_height()),
+            interpolation=cv.INTER_AREA,
+        )
@@ -0,0 +1,16 @@
+import numpy as np
+
+from clock import Clock
+
+
+class ClockReplay(Clock):
+    def __init__(self, racecar) -> None:
+        self.__racecar = racecar
+
+        # The replayed simulation time at the end of each frame
+        self.__times = np.cumsum(
+            racecar._RacecarReplay__log.get("delta_time"), dtype=np.float64
+        )
+
+    def now(self) -> float:
+        return float(self.__times[self.__racecar._RacecarReplay__frame])
@@ -0,0 +1,38 @@
+from typing import Tuple
+
+from controller import Controller
+
+
+class ControllerReplay(Controller):
+    def __init__(self, racecar) -> None:
+        self.__racecar = racecar
+        log = racecar._RacecarReplay__log
+        self.__buttons = log.get("controller_buttons")
+        self.__axes = log.get("controller_axes")
+
+    def is_down(self, button: Controller.Button) -> bool:
+        return self.__get_button(0, button)
+
+    def was_pressed(self, button: Controller.Button) -> bool:
+        return self.__get_button(1, button)
+
+    def was_released(self, button: Controller.Button) -> bool:
+        return self.__get_button(2, button)
+
+    def get_trigger(self, trigger: Controller.Trigger) -> float:
+        if self.__axes is None:
+            return 0.0
+        return float(self.__axes[self.__racecar._RacecarReplay__frame, trigger.value])
+
+    def get_joystick(self, joystick: Controller.Joystick) -> Tuple[float, float]:
+        if self.__axes is None:
+            return (0.0, 0.0)
+        index = 2 + 2 * joystick.value
+        x, y = self.__axes[self.__racecar._RacecarReplay__frame, index : index + 2]
+        return (float(x), float(y))
+
+    def __get_button(self, column: int, button: Controller.Button) -> bool:
+        if self.__buttons is None:
+            return False
+        mask = int(self.__buttons[self.__racecar._RacecarReplay__frame, column])
+        return bool(mask >> button.value & 1)
@@ -0,0 +1,54 @@
+import numpy as np
+from nptyping import NDArray
+
+from drive import Drive
+
+
+class DriveReplay(Drive):
+    def __init__(self, racecar) -> None:
+        self.__racecar = racecar
+
+        # The speed and angle in effect at the end of each frame of the log
+        num_frames = racecar._RacecarReplay__log.num_frames
+        self.__outputs = np.zeros((num_frames, 2), np.float32)
+        self.__max_speed = 0.25
+
+    def set_speed_angle(self, speed: float, angle: float) -> None:
+        assert (
+            -1.0 <= speed <= 1.0
+        ), f"speed [{speed}] must be between -1.0 and 1.0 inclusive."
+        assert (
+            -1.0 <= angle <= 1.0
+        ), f"angle [{angle}] must be between -1.0 and 1.0 inclusive."
+
+        self.__outputs[self.__racecar._RacecarReplay__frame] = (speed, angle)
+
+    def set_max_speed(self, max_speed: float = 0.25) -> None:
+        assert (
+            0.0 <= max_speed <= 1.0
+        ), f"max_speed [{max_speed}] must be between 0.0 and 1.0 inclusive."
+
+        self.__max_speed = max_speed
+
+    def get_outputs(self) -> NDArray:
+        """
+        Returns the speed and angle in effect at the end of each frame of the log, as
+        an N x 2 array.
+
+        Note:
+            Speeds are recorded as passed to set_speed_angle, before being scaled by
+            the max speed.
+        """
+        return self.__outputs
+
+    def get_max_speed(self) -> float:
+        """
+        Returns the max speed most recently set by the program.
+        """
+        return self.__max_speed
+
+    def __update(self) -> None:
+        # The car keeps its speed and angle until they are next set
+        frame = self.__racecar._RacecarReplay__frame
+        if frame + 1 < len(self.__outputs):
+            self.__outputs[frame + 1] = self.__outputs[frame]
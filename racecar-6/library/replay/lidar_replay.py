@@ -0,0 +1,29 @@
+import numpy as np
+from typing import Optional
+from nptyping import NDArray
+
+from lidar import Lidar
+
+
+class LidarReplay(Lidar):
+    def __init__(self, racecar) -> None:
+        self.__racecar = racecar
+        self.__samples = racecar._RacecarReplay__log.get("lidar")
+        self.__blank_samples = np.zeros(self._NUM_SAMPLES, np.float32)
+
+        # A view into the log, taken the first time the samples are read in a frame
+        self.__ranges: Optional[NDArray[720, np.float32]] = None
+
+    def get_samples(self) -> NDArray[720, np.float32]:
+        if self.__ranges is None:
+            if self.__samples is None:
+                self.__ranges = self.__blank_samples
+            else:
+                self.__ranges = self.__samples[self.__racecar._RacecarReplay__frame]
+        return self.__ranges
+
+    def get_samples_async(self) -> NDArray[720, np.float32]:
+        return self.get_samples().copy()
+
+    def __update(self) -> None:
+        self.__ranges = None
@@ -0,0 +1,31 @@
+from typing import Tuple
+import numpy as np
+from nptyping import NDArray
+
+from physics import Physics
+
+
+class PhysicsReplay(Physics):
+    def __init__(self, racecar) -> None:
+        self.__racecar = racecar
+        log = racecar._RacecarReplay__log
+        self.__linear_acceleration = log.get("linear_acceleration")
+        self.__angular_velocity = log.get("angular_velocity")
+
+    def get_linear_acceleration(self) -> NDArray[3, np.float32]:
+        return self.__get_vector(self.__linear_acceleration)
+
+    def get_angular_velocity(self) -> NDArray[3, np.float32]:
+        return self.__get_vector(self.__angular_velocity)
+
+    def get_imu(self) -> Tuple[NDArray[3, np.float32], NDArray[3, np.float32], float]:
+        return (
+            self.get_linear_acceleration(),
+            self.get_angular_velocity(),
+            self.__racecar.clock.now(),
+        )
+
+    def __get_vector(self, stream) -> NDArray[3, np.float32]:
+        if stream is None:
+            return np.zeros(3, np.float32)
+        return np.array(stream[self.__racecar._RacecarReplay__frame])
@@ -0,0 +1,212 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Replays a log of sensor data through the racecar_core interfaces.
+"""
+
+import asyncio
+import inspect
+import os
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+import camera_replay
+import clock_replay
+import controller_replay
+import display_replay
+import drive_replay
+import lidar_replay
+import physics_replay
+from replay_log import ReplayLog
+
+import clock
+from frame_budget import FrameBudget
+from periodic_scheduler import PeriodicScheduler, PeriodicTask
+from racecar_core import Racecar
+import racecar_utils as rc_utils
+
+
+class RacecarReplay(Racecar):
+    """
+    Runs a program against a log of recorded sensor data (see ReplayLog).
+
+    Each frame of the log is served to one call of start or update, and the speed and
+    angle set during each frame are recorded, so that the perception and state logic
+    of a program can be regression tested without a car or RacecarSim.
+
+    Args:
+        path: The log directory (or .npz file) to replay.
+        isHeadless: If True, the display module is disabled.
+        realtime: If True, each frame is delayed until its recorded delta time has
+            elapsed; if False, frames are replayed as fast as the program can run.
+    """
+
+    # The file, in the log directory, to which the replayed drive outputs are saved
+    __DRIVE_OUTPUT_FILE = "drive_replay.npy"
+
+    def __init__(
+        self, path: str, isHeadless: bool = False, realtime: bool = False
+    ) -> None:
+        self.__log = ReplayLog(path)
+        self.__realtime = realtime
+
+        self.camera = camera_replay.CameraReplay(self)
+        self.controller = controller_replay.ControllerReplay(self)
+        self.display = display_replay.DisplayReplay(isHeadless)
+        self.drive = drive_replay.DriveReplay(self)
+        self.lidar = lidar_replay.LidarReplay(self)
+        self.physics = physics_replay.PhysicsReplay(self)
+        self.clock = clock_replay.ClockReplay(self)
+        clock.set_current(self.clock)
+
+        self.__start: Callable[[], None]
+        self.__update: Callable[[], None]
+        self.__update_slow: Optional[Callable[[], None]] = None
+        self.__update_slow_time: float = 1
+
+        # Functions run after update at fixed periods, including update_slow, which
+        # is scheduled every update_slow_time seconds
+        self.__scheduler = PeriodicScheduler()
+        self.__update_slow_task: Optional[PeriodicTask] = None
+
+        # The index of the log frame being served
+        self.__frame: int = 0
+
+        # The seconds taken by start and each call to update
+        self.__frame_times = np.zeros(self.__log.num_frames)
+
+        # Optional work is only shed when replaying in real time, so that a replay as
+        # fast as possible gives the same results however fast the machine is
+        self.frame_budget = FrameBudget(enabled=realtime)
+
+        # Created on demand if a user function is a coroutine function
+        self.__event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def go(self) -> None:
+        rc_utils.print_colored(
+            f">> Replaying {self.__log.num_frames} frames from [{self.__log.path}]...",
+            rc_utils.TerminalColor.green,
+        )
+
+        replay_start = time.perf_counter()
+        next_frame = replay_start
+        for frame in range(self.__log.num_frames):
+            self.__frame = frame
+            if self.__realtime:
+                next_frame += self.get_delta_time()
+                time.sleep(max(0, next_frame - time.perf_counter()))
+
+            frame_start = time.perf_counter()
+            self.frame_budget.begin_frame()
+            if frame == 0:
+                self.set_update_slow_time()
+                self.__call_user_function(self.__start)
+            else:
+                self.__handle_update()
+            self.frame_budget.end_frame()
+            self.__frame_times[frame] = time.perf_counter() - frame_start
+            self.__end_frame()
+
+        self.__report(time.perf_counter() - replay_start)
+
+    def set_start_update(
+        self,
+        start: Callable[[], None],
+        update: Callable[[], None],
+        update_slow: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.__start = start
+        self.__update = update
+        self.__update_slow = update_slow
+        self.__schedule_update_slow()
+
+    def get_delta_time(self) -> float:
+        return float(self.__log.get("delta_time")[self.__frame])
+
+    def set_update_slow_time(self, update_slow_time: float = 1.0) -> None:
+        self.__update_slow_time = update_slow_time
+        self.__schedule_update_slow()
+
+    def schedule_periodic(
+        self,
+        function: Callable[[], None],
+        period: float,
+        phase: Optional[float] = None,
+        budget: Optional[float] = None,
+    ) -> PeriodicTask:
+        return self.__scheduler.add(function, period, phase, budget)
+
+    def get_frame_times(self) -> np.ndarray:
+        """
+        Returns the seconds taken by start and by each call to update (including
+        update_slow), one entry per frame of the log.
+        """
+        return self.__frame_times
+
+    def __handle_update(self) -> None:
+        self.__call_user_function(self.__update)
+        self.__scheduler.run(self.get_delta_time(), self.__call_user_function)
+        self.frame_budget.run_deferred()
+
+    def __schedule_update_slow(self) -> None:
+        """
+        Schedules update_slow every update_slow_time seconds, starting with the next
+        update.
+        """
+        if self.__update_slow_task is not None:
+            self.__update_slow_task.cancel()
+            self.__update_slow_task = None
+        if self.__update_slow is not None:
+            self.__update_slow_task = self.__scheduler.add(
+                self.__update_slow, self.__update_slow_time, 0
+            )
+
+    def __call_user_function(self, function: Callable) -> None:
+        # Coroutine user functions are run to completion on a private event loop
+        result = function()
+        if inspect.isawaitable(result):
+            if self.__event_loop is None:
+                self.__event_loop = asyncio.new_event_loop()
+            self.__event_loop.run_until_complete(result)
+
+    def __end_frame(self) -> None:
+        self.camera._CameraReplay__update()
+        self.drive._DriveReplay__update()
+        self.lidar._LidarReplay__update()
+
+    def __report(self, replay_time: float) -> None:
+        """
+        Prints the frame time statistics, and saves and compares the drive outputs.
+        """
+        # Skip start, which usually includes one-time setup
+        frame_times = self.__frame_times[1:] * 1000
+        if len(frame_times) > 0:
+            p50, p95, p99 = np.percentile(frame_times, (50, 95, 99))
+            print(
+                f">> Replayed {self.__log.num_frames} frames in {replay_time:.2f} s: "
+                f"mean {frame_times.mean():.2f} ms | p50 {p50:.2f} ms | "
+                f"p95 {p95:.2f} ms | p99 {p99:.2f} ms | max {frame_times.max():.2f} ms"
+            )
+
+        outputs = self.drive.get_outputs()
+        if os.path.isdir(self.__log.path):
+            output_path = os.path.join(self.__log.path, self.__DRIVE_OUTPUT_FILE)
+            np.save(output_path, outputs)
+            print(f">> Saved the replayed drive outputs to [{output_path}].")
+
+        recorded = self.__log.get("drive")
+        if recorded is not None:
+            difference = np.abs(outputs - recorded[: len(outputs)])
+            frame = int(np.argmax(difference.max(axis=1)))
+            text = (
+                f">> Largest difference from the recorded drive outputs: "
+                f"{difference[frame].max():.4f} (frame {frame})"
+            )
+            if difference[frame].max() > 0:
+                rc_utils.print_warning(text)
+            else:
+                print(text)
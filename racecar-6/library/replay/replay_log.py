@@ -0,0 +1,126 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Loads the sensor streams replayed by RacecarReplay.
+"""
+
+import os
+import shutil
+from typing import Dict, Optional
+
+import numpy as np
+
+from sensor_log import SensorLogReader
+
+
+class ReplayLog:
+    """
+    A recording of every sensor read by a racecar, one entry per frame.
+
+    A log is a directory containing one .npy file per stream, which are memory-mapped
+    so that each frame is read straight from the page cache without being decoded or
+    copied.  Streams which were not recorded are left out, and their sensors return
+    zeros during replay.
+
+    Streams (N is the number of frames, the first of which is passed to start):
+        delta_time: N float32 seconds elapsed before each frame.
+        color: N x 480 x 640 x 3 uint8 BGR images, as returned by get_color_image.
+        depth: N x height x width float32 depth images (in cm), at full or reduced
+            resolution.
+        lidar: N x 720 float32 lidar samples (in cm).
+        linear_acceleration: N x 3 float32 (in m/s^2).
+        angular_velocity: N x 3 float32 (in rad/s).
+        controller_buttons: N x 3 uint32 bitmasks of the buttons which are down,
+            were pressed, and were released, indexed by Controller.Button.
+        controller_axes: N x 6 float32 values of the left and right triggers, then
+            the (x, y) values of the left and right joysticks.
+        drive: N x 2 float32 speed and angle set during each frame, used to compare
+            the replayed program's outputs against the recorded ones.
+
+    Note:
+        A .npz file with the same arrays may also be replayed, but it is loaded into
+        memory in full, since .npz files cannot be memory-mapped.
+
+        A log recorded with the -l flag (see SensorLogWriter) may also be replayed.
+        Its frames are compressed, so the first replay exports them to the streams
+        above in a "replay" subdirectory of the log (see
+        SensorLogReader.export_replay), which later replays reuse.
+    """
+
+    STREAMS = (
+        "delta_time",
+        "color",
+        "depth",
+        "lidar",
+        "linear_acceleration",
+        "angular_velocity",
+        "controller_buttons",
+        "controller_axes",
+        "drive",
+    )
+
+    # The delta time of each frame if it was not recorded
+    __DEFAULT_DELTA_TIME = 1 / 60
+
+    # The subdirectory of a SensorLogWriter log to which its frames are exported
+    __EXPORT_DIRECTORY = "replay"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.__streams: Dict[str, np.ndarray] = {}
+
+        if os.path.isdir(path):
+            stream_path = self.__export_sensor_log(path)
+            for name in self.STREAMS:
+                file = os.path.join(stream_path, f"{name}.npy")
+                if os.path.isfile(file):
+                    # Hand out plain arrays rather than np.memmap, since arithmetic on
+                    # memmap slices also returns memmap objects
+                    self.__streams[name] = np.load(file, mmap_mode="r").view(np.ndarray)
+        else:
+            with np.load(path) as archive:
+                for name in self.STREAMS:
+                    if name in archive:
+                        self.__streams[name] = archive[name]
+
+        lengths = [len(stream) for stream in self.__streams.values()]
+        assert lengths, f"[{path}] does not contain any sensor streams."
+        self.num_frames: int = min(lengths)
+
+        if "delta_time" not in self.__streams:
+            self.__streams["delta_time"] = np.full(
+                self.num_frames, self.__DEFAULT_DELTA_TIME, np.float32
+            )
+
+    @classmethod
+    def __export_sensor_log(cls, path: str) -> str:
+        """
+        Returns the directory holding the streams of a log directory, which is the
+        log itself unless it was written by SensorLogWriter, in which case its
+        frames are exported first (unless they already were since it was written).
+        """
+        index = os.path.join(path, "index.bin")
+        if not os.path.isfile(index):
+            return path
+
+        export_path = os.path.join(path, cls.__EXPORT_DIRECTORY)
+        delta_time = os.path.join(export_path, "delta_time.npy")
+        if not os.path.isfile(delta_time) or os.path.getmtime(
+            delta_time
+        ) < os.path.getmtime(index):
+            # Export next to the previous export and then replace it, so that an
+            # interrupted export is never mistaken for a complete one
+            partial_path = export_path + ".partial"
+            shutil.rmtree(partial_path, ignore_errors=True)
+            SensorLogReader(path).export_replay(partial_path)
+            shutil.rmtree(export_path, ignore_errors=True)
+            os.replace(partial_path, export_path)
+        return export_path
+
+    def get(self, name: str) -> Optional[np.ndarray]:
+        """
+        Returns a stream, or None if it was not recorded.
+        """
+        return self.__streams.get(name)
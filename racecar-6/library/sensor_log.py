@@ -0,0 +1,415 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Records the sensor data seen by a racecar program each frame, without slowing down
+the frame loop.
+"""
+
+import os
+import queue
+import struct
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+from nptyping import NDArray
+
+import racecar_utils as rc_utils
+
+
+class SensorLogWriter:
+    """
+    Writes each frame's sensor data to a chunked log on a background thread.
+
+    log_frame is called on the control thread once per frame with the sensor data
+    which the racecar's modules already fetched that frame, and only stores it in a
+    free slot of a fixed pool: it reads no sensors and copies no arrays, since the
+    modules never overwrite an array they have handed out.  The writer thread
+    compresses each frame (JPEG color images, zlib depth images and lidar scans) and
+    appends it to the current chunk file.  If every slot is still waiting to be
+    written, because the disk cannot keep up, the frame is dropped and counted rather
+    than blocking the control thread.
+
+    Log layout:
+        chunk_NNNNN.bin: the frames of one chunk, as consecutive records.
+        index.bin: one fixed-size entry per frame: timestamp (d), chunk number (I),
+            offset in the chunk (Q), and record size (I), in timestamp order, so
+            that frames can be found by binary search (see SensorLogReader).
+
+    Each record begins with the timestamp (d), delta time (f), and a bitmask of the
+    sections it contains (B), which leaves out the sensors that were not fetched in
+    the frame.  Each section is then prefixed with its size (I):
+        COLOR: a JPEG encoded BGR image.
+        DEPTH: the width and height (HH), then zlib compressed float32 values.
+        LIDAR: zlib compressed float32 samples.
+        PHYSICS: linear acceleration and angular velocity (ffffff).
+        CONTROLLER: bitmasks of the buttons which are down, were pressed, and were
+            released (III), then the trigger and joystick values (ffffff).
+        DRIVE: the speed and angle most recently set (ff).
+
+    Args:
+        path: The directory in which to write the log, which is created if needed
+            (any log already in it is overwritten).
+        chunk_frames: The number of frames in each chunk file.
+        pool_size: The number of frames which may wait to be written at once.
+        jpeg_quality: The JPEG quality (0 to 100) of the color images.
+    """
+
+    COLOR = 1
+    DEPTH = 2
+    LIDAR = 4
+    PHYSICS = 8
+    CONTROLLER = 16
+    DRIVE = 32
+
+    RECORD_HEADER_FORMAT = "<dfB"
+    INDEX_FORMAT = "<dIQI"
+    CONTROLLER_FORMAT = "<IIIffffff"
+
+    def __init__(
+        self,
+        path: str,
+        chunk_frames: int = 600,
+        pool_size: int = 8,
+        jpeg_quality: int = 90,
+    ) -> None:
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.__chunk_frames = chunk_frames
+        self.__jpeg_parameters = [cv.IMWRITE_JPEG_QUALITY, jpeg_quality]
+
+        # Frame statistics
+        self.frames_logged = 0
+        self.frames_written = 0
+        self.frames_dropped = 0
+
+        # Each slot holds one frame's sensor data until the writer thread has encoded
+        # it, which bounds how many frames may be queued at once
+        self.__free_slots: queue.Queue = queue.Queue()
+        for _ in range(pool_size):
+            self.__free_slots.put({})
+        self.__pending: queue.Queue = queue.Queue()
+
+        self.__chunk: Optional[Any] = None
+        self.__chunk_number = -1
+        self.__chunk_offset = 0
+        self.__index = open(os.path.join(path, "index.bin"), "wb")
+
+        self.__thread = threading.Thread(target=self.__write_frames, daemon=True)
+        self.__thread.start()
+
+    def log_frame(
+        self,
+        timestamp: float,
+        delta_time: float,
+        color: Optional[NDArray[(Any, Any, 3), np.uint8]] = None,
+        depth: Optional[NDArray[(Any, Any), Any]] = None,
+        lidar: Optional[NDArray[720, np.float32]] = None,
+        physics: Optional[Tuple[float, ...]] = None,
+        controller: Optional[Tuple] = None,
+        drive: Optional[Tuple[float, float]] = None,
+    ) -> bool:
+        """
+        Queues one frame of sensor data to be written.
+
+        Args:
+            timestamp: The time of the frame in seconds, read from rc.clock.
+            delta_time: The seconds elapsed in the previous frame.
+            color: The color image, if it was fetched this frame.
+            depth: The depth image (at any resolution), if it was fetched.
+            lidar: The lidar samples, if they were fetched.
+            physics: The linear acceleration and angular velocity (six values), if
+                they were fetched.
+            controller: The controller state (see CONTROLLER_FORMAT), if it was
+                fetched.
+            drive: The speed and angle most recently set, if known.
+
+        Returns:
+            True if the frame was queued, or False if it was dropped.
+
+        Note:
+            The arrays are written later on the writer thread, so they must not be
+            modified once they are logged.
+        """
+        self.frames_logged += 1
+        try:
+            slot: Dict[str, Any] = self.__free_slots.get_nowait()
+        except queue.Empty:
+            self.frames_dropped += 1
+            return False
+
+        slot["timestamp"] = timestamp
+        slot["delta_time"] = delta_time
+        slot["color"] = color
+        slot["depth"] = depth
+        slot["lidar"] = lidar
+        slot["physics"] = physics
+        slot["controller"] = controller
+        slot["drive"] = drive
+
+        self.__pending.put(slot)
+        return True
+
+    @staticmethod
+    def read_controller(controller) -> Tuple:
+        """
+        Returns the state of a controller module in the layout of CONTROLLER_FORMAT,
+        read through its getters.
+        """
+        down = pressed = released = 0
+        for button in controller.Button:
+            down |= controller.is_down(button) << button
+            pressed |= controller.was_pressed(button) << button
+            released |= controller.was_released(button) << button
+        return (
+            down,
+            pressed,
+            released,
+            controller.get_trigger(controller.Trigger.LEFT),
+            controller.get_trigger(controller.Trigger.RIGHT),
+            *controller.get_joystick(controller.Joystick.LEFT),
+            *controller.get_joystick(controller.Joystick.RIGHT),
+        )
+
+    def close(self) -> None:
+        """
+        Writes every queued frame, then closes the log.
+        """
+        self.__pending.put(None)
+        self.__thread.join()
+        if self.__chunk is not None:
+            self.__chunk.close()
+        self.__index.close()
+
+    def __write_frames(self) -> None:
+        while True:
+            slot = self.__pending.get()
+            if slot is None:
+                return
+
+            timestamp = slot["timestamp"]
+            try:
+                record = self.__encode(slot)
+            finally:
+                # Release the slot's references to the sensor data
+                slot.clear()
+                self.__free_slots.put(slot)
+
+            if self.frames_written % self.__chunk_frames == 0:
+                self.__next_chunk()
+            self.__chunk.write(record)
+            self.__index.write(
+                struct.pack(
+                    self.INDEX_FORMAT,
+                    timestamp,
+                    self.__chunk_number,
+                    self.__chunk_offset,
+                    len(record),
+                )
+            )
+            self.__chunk_offset += len(record)
+            self.frames_written += 1
+
+    def __next_chunk(self) -> None:
+        if self.__chunk is not None:
+            self.__chunk.close()
+            self.__index.flush()
+        self.__chunk_number += 1
+        self.__chunk_offset = 0
+        self.__chunk = open(
+            os.path.join(self.path, f"chunk_{self.__chunk_number:05d}.bin"), "wb"
+        )
+
+    def __encode(self, slot: Dict[str, Any]) -> bytes:
+        sections: List[bytes] = []
+        mask = 0
+
+        if slot["color"] is not None and slot["color"].size > 0:
+            success, jpeg = cv.imencode(".jpg", slot["color"], self.__jpeg_parameters)
+            if success:
+                mask |= self.COLOR
+                sections.append(jpeg.tobytes())
+        if slot["depth"] is not None and slot["depth"].size > 0:
+            # Depth and lidar are stored as float32 whatever their source type
+            mask |= self.DEPTH
+            height, width = slot["depth"].shape
+            depth = np.ascontiguousarray(slot["depth"], np.float32)
+            sections.append(struct.pack("<HH", width, height) + zlib.compress(depth, 1))
+        if slot["lidar"] is not None and slot["lidar"].size > 0:
+            mask |= self.LIDAR
+            lidar = np.ascontiguousarray(slot["lidar"], np.float32)
+            sections.append(zlib.compress(lidar, 1))
+        if slot["physics"] is not None:
+            mask |= self.PHYSICS
+            sections.append(struct.pack("<ffffff", *slot["physics"]))
+        if slot["controller"] is not None:
+            mask |= self.CONTROLLER
+            sections.append(struct.pack(self.CONTROLLER_FORMAT, *slot["controller"]))
+        if slot["drive"] is not None:
+            mask |= self.DRIVE
+            sections.append(struct.pack("<ff", *slot["drive"]))
+
+        parts = [
+            struct.pack(
+                self.RECORD_HEADER_FORMAT, slot["timestamp"], slot["delta_time"], mask
+            )
+        ]
+        for section in sections:
+            parts.append(struct.pack("<I", len(section)))
+            parts.append(section)
+        return b"".join(parts)
+
+
+class SensorLogReader:
+    """
+    Reads a log written by SensorLogWriter.
+
+    Args:
+        path: The log directory.
+    """
+
+    __INDEX_DTYPE = np.dtype(
+        [("timestamp", "<f8"), ("chunk", "<u4"), ("offset", "<u8"), ("size", "<u4")]
+    )
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.__index = np.fromfile(os.path.join(path, "index.bin"), self.__INDEX_DTYPE)
+        self.num_frames: int = len(self.__index)
+        self.__chunks: Dict[int, Any] = {}
+
+    def get_timestamps(self) -> NDArray:
+        """
+        Returns the timestamp of every frame in the log.
+        """
+        return self.__index["timestamp"]
+
+    def find(self, timestamp: float) -> int:
+        """
+        Returns the index of the first frame at or after a timestamp.
+        """
+        return int(np.searchsorted(self.__index["timestamp"], timestamp))
+
+    def read(self, frame: int) -> Dict[str, Any]:
+        """
+        Decodes one frame of the log.
+
+        Returns:
+            A dictionary containing the timestamp and delta_time of the frame, and
+            each recorded stream (see ReplayLog): color, depth, lidar,
+            linear_acceleration, angular_velocity, controller_buttons,
+            controller_axes, and drive.
+        """
+        entry = self.__index[frame]
+        chunk = self.__chunks.get(entry["chunk"])
+        if chunk is None:
+            chunk = open(
+                os.path.join(self.path, f"chunk_{entry['chunk']:05d}.bin"), "rb"
+            )
+            self.__chunks[entry["chunk"]] = chunk
+        chunk.seek(int(entry["offset"]))
+        record = memoryview(chunk.read(int(entry["size"])))
+
+        timestamp, delta_time, mask = struct.unpack_from(
+            SensorLogWriter.RECORD_HEADER_FORMAT, record
+        )
+        result: Dict[str, Any] = {"timestamp": timestamp, "delta_time": delta_time}
+        offset = struct.calcsize(SensorLogWriter.RECORD_HEADER_FORMAT)
+
+        sections: Dict[int, memoryview] = {}
+        for section in (
+            SensorLogWriter.COLOR,
+            SensorLogWriter.DEPTH,
+            SensorLogWriter.LIDAR,
+            SensorLogWriter.PHYSICS,
+            SensorLogWriter.CONTROLLER,
+            SensorLogWriter.DRIVE,
+        ):
+            if mask & section:
+                [size] = struct.unpack_from("<I", record, offset)
+                offset += 4
+                sections[section] = record[offset : offset + size]
+                offset += size
+
+        if SensorLogWriter.COLOR in sections:
+            jpeg = np.frombuffer(sections[SensorLogWriter.COLOR], np.uint8)
+            result["color"] = cv.imdecode(jpeg, cv.IMREAD_COLOR)
+        if SensorLogWriter.DEPTH in sections:
+            width, height = struct.unpack_from("<HH", sections[SensorLogWriter.DEPTH])
+            values = zlib.decompress(sections[SensorLogWriter.DEPTH][4:])
+            result["depth"] = np.frombuffer(values, np.float32).reshape(height, width)
+        if SensorLogWriter.LIDAR in sections:
+            values = zlib.decompress(sections[SensorLogWriter.LIDAR])
+            result["lidar"] = np.frombuffer(values, np.float32)
+        if SensorLogWriter.PHYSICS in sections:
+            physics = struct.unpack("<ffffff", sections[SensorLogWriter.PHYSICS])
+            result["linear_acceleration"] = np.array(physics[:3], np.float32)
+            result["angular_velocity"] = np.array(physics[3:], np.float32)
+        if SensorLogWriter.CONTROLLER in sections:
+            controller = struct.unpack(
+                SensorLogWriter.CONTROLLER_FORMAT, sections[SensorLogWriter.CONTROLLER]
+            )
+            result["controller_buttons"] = np.array(controller[:3], np.uint32)
+            result["controller_axes"] = np.array(controller[3:], np.float32)
+        if SensorLogWriter.DRIVE in sections:
+            result["drive"] = np.array(
+                struct.unpack("<ff", sections[SensorLogWriter.DRIVE]), np.float32
+            )
+        return result
+
+    def export_replay(
+        self, path: str, start: int = 0, end: Optional[int] = None
+    ) -> None:
+        """
+        Decodes a range of frames into a log directory which RacecarReplay can
+        memory-map (see ReplayLog).
+
+        Args:
+            path: The directory to write, which is created if needed.
+            start: The index of the first frame to export.
+            end: The index after the last frame to export, or None to export every
+                frame after start.
+
+        Note:
+            Each stream holds every frame at the size of its first recorded frame,
+            so color and depth images recorded at another size (such as after
+            set_processing_scale) are resized to it.  Frames in which a sensor was
+            not recorded are left as zeros.
+        """
+        end = self.num_frames if end is None else min(end, self.num_frames)
+        os.makedirs(path, exist_ok=True)
+
+        streams: Dict[str, np.ndarray] = {}
+        for frame in range(start, end):
+            data = self.read(frame)
+            data["delta_time"] = np.float32(data["delta_time"])
+            del data["timestamp"]
+            for name, value in data.items():
+                stream = streams.get(name)
+                if stream is None:
+                    # Streams are written straight to disk, since a long log of color
+                    # images may not fit in memory
+                    stream = np.lib.format.open_memmap(
+                        os.path.join(path, f"{name}.npy"),
+                        "w+",
+                        np.asarray(value).dtype,
+                        (end - start,) + np.shape(value),
+                    )
+                    streams[name] = stream
+                elif np.shape(value) != stream.shape[1:]:
+                    height, width = stream.shape[1:3]
+                    value = cv.resize(
+                        value, (width, height), interpolation=cv.INTER_AREA
+                    )
+                stream[frame - start] = value
+
+        for stream in streams.values():
+            stream.flush()
+        rc_utils.print_colored(
+            f">> Exported {end - start} frames to [{path}].",
+            rc_utils.TerminalColor.green,
+        )
@@ -0,0 +1,379 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+An asyncio transport for the RacecarSim protocol, used when the user program's start
+or update function is a coroutine.
+"""
+
+import asyncio
+import collections
+import math
+import select
+import struct
+import time
+from typing import Deque, List, Optional
+
+
+class _Reply:
+    """
+    A request awaiting its reply, which is a single datagram.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.future: asyncio.Future = loop.create_future()
+
+    def receive(self, data: bytes) -> bool:
+        """
+        Handles a datagram from RacecarSim, returning True once the reply is complete.
+        """
+        self.complete(data)
+        return True
+
+    def is_command(self, data: bytes) -> bool:
+        """
+        Returns whether a datagram which arrived while awaiting this reply is instead
+        a command from RacecarSim.  Single datagram replies cannot be told apart
+        from commands, so every datagram is taken as the reply.
+        """
+        return False
+
+    def timeout(self) -> None:
+        """
+        Handles a period without any datagrams from RacecarSim.
+        """
+        pass
+
+    def complete(self, result) -> None:
+        # The awaiting task may have been cancelled
+        if not self.future.done():
+            self.future.set_result(result)
+
+    def fail(self, exception: Exception) -> None:
+        if not self.future.done():
+            self.future.set_exception(exception)
+
+
+class _FragmentedReply(_Reply):
+    """
+    A reply sent as fragments which are each acknowledged with python_send_next.
+    """
+
+    def __init__(self, loop, transport, buffer: memoryview, num_fragments: int):
+        _Reply.__init__(self, loop)
+        self.__transport = transport
+        self.__buffer = buffer
+        self.__num_fragments = num_fragments
+        self.__num_received = 0
+        self.__received_bytes = 0
+
+    def receive(self, data: bytes) -> bool:
+        self.__buffer[self.__received_bytes : self.__received_bytes + len(data)] = data
+        self.__received_bytes += len(data)
+        self.__num_received += 1
+        self.__transport.send_header(self.__transport.Header.python_send_next)
+
+        if self.__num_received == self.__num_fragments:
+            self.complete(self.__received_bytes)
+            return True
+        return False
+
+
+class _WindowedReply(_Reply):
+    """
+    A reply sent as fragments through a sliding window, which are acknowledged
+    cumulatively with python_fragment_ack, listing each missing fragment once until
+    a timeout (see RacecarSim.__receive_windowed).
+    """
+
+    def __init__(
+        self,
+        loop,
+        transport,
+        buffer: memoryview,
+        num_fragments: int,
+        transfer_id: int,
+    ):
+        _Reply.__init__(self, loop)
+        self.__transport = transport
+        self.__buffer = buffer
+        self.__num_fragments = num_fragments
+        self.__transfer_id = transfer_id
+        self.__fragment_size = math.ceil(len(buffer) / num_fragments)
+        self.__received = bytearray(num_fragments)
+        self.__requested = bytearray(num_fragments)
+        self.__received_bytes = 0
+        self.__next_expected = 0
+        self.__highest = -1
+        self.__unacknowledged = 0
+
+    def is_command(self, data: bytes) -> bool:
+        # Every fragment begins with the unity_fragment header, so anything else (such
+        # as an error or exit command) is not part of the transfer
+        return (
+            len(data) < struct.calcsize(self.__transport.FRAGMENT_HEADER_FORMAT)
+            or data[0] != self.__transport.Header.unity_fragment
+        )
+
+    def receive(self, data: bytes) -> bool:
+        header_format = self.__transport.FRAGMENT_HEADER_FORMAT
+        header_size = struct.calcsize(header_format)
+        _, transfer_id, sequence = struct.unpack_from(header_format, data)
+        if (
+            transfer_id != self.__transfer_id
+            or sequence >= self.__num_fragments
+            or self.__received[sequence]
+        ):
+            # Ignore stale and duplicate fragments
+            return False
+
+        start = sequence * self.__fragment_size
+        num_bytes = len(data) - header_size
+        self.__buffer[start : start + num_bytes] = memoryview(data)[header_size:]
+        self.__received[sequence] = 1
+        self.__received_bytes += num_bytes
+
+        in_order = sequence == self.__highest + 1
+        self.__highest = max(self.__highest, sequence)
+        while (
+            self.__next_expected < self.__num_fragments
+            and self.__received[self.__next_expected]
+        ):
+            self.__next_expected += 1
+
+        self.__unacknowledged += 1
+        done = self.__next_expected == self.__num_fragments
+        if (
+            not in_order
+            or self.__unacknowledged >= self.__transport.FRAGMENT_WINDOW // 2
+            or done
+        ):
+            self.__acknowledge(self.__highest + 1)
+
+        if done:
+            self.__transport.finish_transfer(
+                self.__transfer_id, len(self.__buffer), self.__num_fragments
+            )
+            self.complete(self.__received_bytes)
+        return done
+
+    def timeout(self) -> None:
+        self.__requested[:] = bytes(self.__num_fragments)
+        self.__acknowledge(self.__num_fragments)
+
+    def __acknowledge(self, end: int) -> None:
+        end = min(end, self.__next_expected + self.__transport.FRAGMENT_WINDOW)
+        missing: List[int] = [
+            i
+            for i in range(self.__next_expected, end)
+            if not self.__received[i] | self.__requested[i]
+        ]
+        for i in missing:
+            self.__requested[i] = 1
+        self.__transport.send(
+            struct.pack(
+                f"<BBH{len(missing)}H",
+                self.__transport.Header.python_fragment_ack.value,
+                self.__transfer_id,
+                self.__next_expected,
+                *missing,
+            )
+        )
+        self.__unacknowledged = 0
+
+
+class AsyncTransport(asyncio.DatagramProtocol):
+    """
+    Sends requests to RacecarSim and hands each reply to the request awaiting it.
+
+    RacecarSim answers requests in the order in which they were sent, so replies are
+    matched to requests first-in first-out.  From protocol version 3, RacecarSim
+    queues requests which arrive during a fragmented transfer, so requests are sent
+    as soon as they are made and several may be in flight at once.  With older
+    versions, each request is sent only once the previous one has been answered.
+
+    Datagrams which arrive while no request is outstanding are commands from
+    RacecarSim (such as unity_update), and are queued for receive_command, as are
+    datagrams which are not fragments but arrive during a windowed transfer.
+    Fragments which arrive after their transfer is complete are skipped, rather than
+    taken as a command or as the reply to a later request.
+
+    The transport shares RacecarSim's socket, and only reaches it through the
+    protected members RacecarSim keeps for this purpose (_get_socket,
+    _get_unity_address, _is_pipelined, _is_stale_fragment, _next_transfer_id,
+    _finish_transfer, and _FRAGMENT_TIMEOUT).
+
+    Note:
+        Running the event loop costs each frame more than it saves when RacecarSim
+        runs on the same machine: reading every sensor takes a mean of about 2.1 ms
+        a frame through the transport, against 1.3 ms through the synchronous API
+        (see benchmarks/bench_async_transport.py).  The transport is kept for
+        slower links, where the replies to requests in flight at once overlap:
+        with 1 ms of latency on each datagram, the same frame takes 21 ms against
+        29 ms synchronously, and 64 ms with protocol versions before 3.
+    """
+
+    def __init__(self, racecar) -> None:
+        self.__racecar = racecar
+        self.__loop = asyncio.get_running_loop()
+        self.__transport: Optional[asyncio.DatagramTransport] = None
+        self.__replies: Deque[_Reply] = collections.deque()
+        self.__last_reply: Optional[_Reply] = None
+        self.__commands: asyncio.Queue = asyncio.Queue()
+        self.__timer: Optional[asyncio.TimerHandle] = None
+
+        self.Header = racecar.Header
+        self.FRAGMENT_HEADER_FORMAT = racecar._FRAGMENT_HEADER_FORMAT
+        self.FRAGMENT_WINDOW = racecar._FRAGMENT_WINDOW
+        self.__fragment_timeout = racecar._FRAGMENT_TIMEOUT
+        self.__pipelined = racecar._is_pipelined()
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.__transport = transport
+
+    def datagram_received(self, data: bytes, address) -> None:
+        if not self.__replies:
+            if not self.__racecar._is_stale_fragment(data):
+                self.__commands.put_nowait(data)
+            return
+
+        self.__receive_reply(data)
+        self.__restart_timer()
+
+    def error_received(self, exception: Exception) -> None:
+        # RacecarSim is no longer listening, so no outstanding request will complete
+        while self.__replies:
+            self.__replies.popleft().fail(exception)
+
+    def send(self, data: bytes) -> None:
+        stats = self.__racecar.get_protocol_stats()
+        if stats is not None:
+            stats.sent(data, False)
+        self.__transport.sendto(data, self.__racecar._get_unity_address())
+
+    def send_header(self, header) -> None:
+        self.send(struct.pack("B", header.value))
+
+    async def receive_command(self) -> bytes:
+        """
+        Waits for the next command from RacecarSim.
+        """
+        return await self.__commands.get()
+
+    def finish_transfer(
+        self, transfer_id: int, num_bytes: int, num_fragments: int
+    ) -> None:
+        """
+        Records that a windowed transfer is complete (see RacecarSim._finish_transfer).
+        """
+        self.__racecar._finish_transfer(transfer_id, num_bytes, num_fragments)
+
+    async def request(self, data: bytes) -> bytes:
+        """
+        Sends a request and returns its reply, which is a single datagram.
+        """
+        return await self.__request(data, _Reply(self.__loop))
+
+    async def request_fragmented(
+        self, header, buffer: memoryview, num_fragments: int, payload: bytes = b""
+    ) -> int:
+        """
+        Sends a request which is answered with a fragmented message, and receives the
+        message into buffer.
+
+        Args:
+            header: The header of the request.
+            buffer: The buffer to receive the message into, which must be its exact
+                size.
+            num_fragments: The number of fragments in which the message is sent.
+            payload: The bytes which follow the header in the request.
+
+        Returns:
+            The number of bytes received.
+        """
+        data = struct.pack("B", header.value) + payload
+        if self.__pipelined:
+            transfer_id = self.__racecar._next_transfer_id()
+            data += struct.pack("B", transfer_id)
+            reply = _WindowedReply(
+                self.__loop, self, buffer, num_fragments, transfer_id
+            )
+        else:
+            reply = _FragmentedReply(self.__loop, self, buffer, num_fragments)
+        return await self.__request(data, reply)
+
+    def has_outstanding_requests(self) -> bool:
+        return bool(self.__replies) or (
+            self.__last_reply is not None and not self.__last_reply.future.done()
+        )
+
+    def drain(self) -> None:
+        """
+        Synchronously receives the replies to every outstanding request, so that the
+        synchronous API can be used between awaits.
+        """
+        sock = self.__racecar._get_socket()
+        while self.has_outstanding_requests():
+            if not self.__replies:
+                # A request is waiting for the previous one to complete, which only
+                # happens once the event loop runs again
+                return
+            ready = select.select([sock], [], [], self.__fragment_timeout)
+            if ready[0]:
+                data, address = sock.recvfrom(65507)
+                self.__receive_reply(data)
+            else:
+                self.__replies[0].timeout()
+
+    async def __request(self, data: bytes, reply: _Reply):
+        previous = self.__last_reply
+        self.__last_reply = reply
+        if not self.__pipelined and previous is not None:
+            await asyncio.wait([previous.future])
+
+        self.__replies.append(reply)
+        if len(self.__replies) == 1:
+            self.__restart_timer()
+        start = time.perf_counter()
+        self.send(data)
+        result = await reply.future
+
+        stats = self.__racecar.get_protocol_stats()
+        if stats is not None:
+            # Fragmented replies return the number of bytes received into the buffer
+            bytes_in = result if isinstance(result, int) else len(result)
+            stats.add_request(data[0], time.perf_counter() - start, bytes_in)
+        return result
+
+    def __receive_reply(self, data: bytes) -> None:
+        """
+        Hands a datagram to the oldest outstanding reply, unless it is a fragment
+        which arrived after its transfer was complete, or a command.
+        """
+        reply = self.__replies[0]
+        if self.__racecar._is_stale_fragment(data):
+            return
+        if reply.is_command(data):
+            self.__commands.put_nowait(data)
+            return
+        if reply.receive(data):
+            self.__replies.popleft()
+
+    def __restart_timer(self) -> None:
+        """
+        Times out the oldest outstanding reply if no datagram arrives in time.
+        """
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        if self.__replies:
+            self.__timer = self.__loop.call_later(
+                self.__fragment_timeout, self.__handle_timeout
+            )
+
+    def __handle_timeout(self) -> None:
+        self.__timer = None
+        if self.__replies:
+            self.__replies[0].timeout()
+            self.__restart_timer()
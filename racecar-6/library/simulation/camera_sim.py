@@ -1,4 +1,8 @@
+import asyncio
+import math
 import sys
+import struct
+from typing import Any, Optional, Tuple
 import numpy as np
 import cv2 as cv
 from nptyping import NDArray
@@ -13,67 +17,313 @@ class CameraSim(Camera):
         self.__is_color_image_current: bool = False
         self.__depth_image: NDArray[(480, 640), np.float32] = None
         self.__is_depth_image_current: bool = False
+        self.__depth_image_native: NDArray[(60, 80), np.float32] = None
+        self.__is_depth_image_native_current: bool = False
 
         self._MAX_DEPTH_WIDTH: int = self._WIDTH // 8
         self._MAX_DEPTH_HEIGHT: int = self._HEIGHT // 8
 
+        # Persistent buffers so that raw data is received directly into them.  Each
+        # frame's images are then converted into new output images, never into ones
+        # returned during an earlier frame, which the user may still hold.
+        self.__color_buffer = memoryview(bytearray(self._WIDTH * self._HEIGHT * 4))
+        # Depth images are kept at the native resolution sent by RacecarSim, and are
+        # only upscaled to full resolution if get_depth_image is called.
+        self.__depth_buffer = memoryview(
+            bytearray(self._MAX_DEPTH_WIDTH * self._MAX_DEPTH_HEIGHT * 4)
+        )
+
+        # Requests made through the asyncio transport this frame, which are shared by
+        # every coroutine awaiting the same image.  Color images fetched this way are
+        # received into their own buffer, since synchronous requests may be made
+        # while they are in flight.
+        self.__color_image_fetch: Optional[asyncio.Future] = None
+        self.__depth_image_fetch: Optional[asyncio.Future] = None
+        self.__fetch_color_buffer: Optional[memoryview] = None
+
     def get_color_image_no_copy(self) -> NDArray[(480, 640, 3), np.uint8]:
         if not self.__is_color_image_current:
-            self.__color_image = self.__request_color_image(False)
+            shared_frame = self.__racecar._RacecarSim__get_shared_frame()
+            if shared_frame is not None:
+                self.__color_image = self.__reduce_shared_color_image(
+                    shared_frame.color_image
+                )
+            elif not self.__racecar._RacecarSim__fetch_snapshot(
+                self.__racecar.Snapshot.color
+            ):
+                self.__color_image = self.__request_color_image(
+                    self.__get_output_image()
+                )
             self.__is_color_image_current = True
 
         return self.__color_image
 
     def get_color_image_async(self) -> NDArray[(480, 640, 3), np.uint8]:
-        return self.__request_color_image(True)
+        return self.__request_color_image(None, True)
 
     def get_depth_image(self) -> NDArray[(480, 640), np.float32]:
         if not self.__is_depth_image_current:
-            self.__depth_image = self.__request_depth_image(False)
-            self.__is_depth_image_current = False
+            depth_image_native, _ = self.get_depth_image_native()
+            self.__depth_image = self.__upscale_depth_image(depth_image_native)
+            self.__is_depth_image_current = True
 
         return self.__depth_image
 
+    def get_depth_image_native(self) -> Tuple[NDArray[(Any, Any), np.float32], int]:
+        if not self.__is_depth_image_native_current:
+            shared_frame = self.__racecar._RacecarSim__get_shared_frame()
+            if shared_frame is not None:
+                self.__depth_image_native = shared_frame.depth_image
+            elif not self.__racecar._RacecarSim__fetch_snapshot(
+                self.__racecar.Snapshot.depth
+            ):
+                self.__depth_image_native = self.__request_depth_image_native(
+                    self.__depth_buffer
+                )
+            self.__is_depth_image_native_current = True
+
+        return self.__depth_image_native, self.__get_depth_scale()
+
     def get_depth_image_async(self) -> NDArray[(480, 640), np.float32]:
-        return self.__request_depth_image(True)
+        depth_image_native = self.__request_depth_image_native(
+            self.__depth_buffer, True
+        )
+        return self.__upscale_depth_image(depth_image_native)
+
+    async def fetch_color_image_no_copy(self) -> NDArray[(480, 640, 3), np.uint8]:
+        if not (
+            self.__is_color_image_current
+            or self.__racecar._RacecarSim__has_snapshot(self.__racecar.Snapshot.color)
+        ):
+            shared_frame = self.__racecar._RacecarSim__get_shared_frame()
+            if shared_frame is not None:
+                self.__color_image = self.__reduce_shared_color_image(
+                    shared_frame.color_image
+                )
+            else:
+                if self.__color_image_fetch is None:
+                    self.__color_image_fetch = asyncio.ensure_future(
+                        self.__fetch_color_image(self.__get_output_image())
+                    )
+                self.__color_image = await self.__color_image_fetch
+        self.__is_color_image_current = True
+
+        return self.__color_image
+
+    async def fetch_depth_image(self) -> NDArray[(480, 640), np.float32]:
+        if not self.__is_depth_image_current:
+            depth_image_native, _ = await self.fetch_depth_image_native()
+            self.__depth_image = self.__upscale_depth_image(depth_image_native)
+            self.__is_depth_image_current = True
+
+        return self.__depth_image
+
+    async def fetch_depth_image_native(
+        self,
+    ) -> Tuple[NDArray[(Any, Any), np.float32], int]:
+        if not (
+            self.__is_depth_image_native_current
+            or self.__racecar._RacecarSim__has_snapshot(self.__racecar.Snapshot.depth)
+        ):
+            shared_frame = self.__racecar._RacecarSim__get_shared_frame()
+            if shared_frame is not None:
+                self.__depth_image_native = shared_frame.depth_image
+            else:
+                if self.__depth_image_fetch is None:
+                    self.__depth_image_fetch = asyncio.ensure_future(
+                        self.__fetch_depth_image_native()
+                    )
+                self.__depth_image_native = await self.__depth_image_fetch
+        self.__is_depth_image_native_current = True
+
+        return self.__depth_image_native, self.__get_depth_scale()
+
+    def __get_fetched(
+        self,
+    ) -> Tuple[
+        Optional[NDArray[(480, 640, 3), np.uint8]],
+        Optional[NDArray[(60, 80), np.float32]],
+    ]:
+        """
+        Returns this frame's color image and native depth image, each of which is
+        None unless it has already been fetched.
+        """
+        return (
+            self.__color_image if self.__is_color_image_current else None,
+            self.__depth_image_native if self.__is_depth_image_native_current else None,
+        )
 
     def __update(self) -> None:
+        self._start_color_frame()
         self.__is_color_image_current = False
         self.__is_depth_image_current = False
+        self.__is_depth_image_native_current = False
+        self.__color_image_fetch = None
+        self.__depth_image_fetch = None
+
+    async def __fetch_color_image(
+        self, dst: NDArray[(480, 640, 3), np.uint8]
+    ) -> NDArray[(480, 640, 3), np.uint8]:
+        if self.__fetch_color_buffer is None:
+            self.__fetch_color_buffer = memoryview(bytearray(len(self.__color_buffer)))
 
-    def __request_color_image(self, isAsync: bool) -> NDArray[(480, 640), np.uint8]:
+        suffix, reduction = self.__racecar._RacecarSim__get_color_request_suffix()
+        buffer = self.__fetch_color_buffer[: self.__get_color_size(reduction)]
+        await self.__racecar._RacecarSim__transport.request_fragmented(
+            self.__racecar.Header.camera_get_color_image, buffer, 32, suffix
+        )
+        return self.__decode_color_image(buffer, dst, reduction)
+
+    async def __fetch_depth_image_native(self) -> NDArray[(Any, Any), np.float32]:
+        raw_bytes = await self.__racecar._RacecarSim__transport.request(
+            struct.pack("B", self.__racecar.Header.camera_get_depth_image.value)
+        )
+        depth_width, depth_height = self.__get_depth_size(len(raw_bytes))
+        return self.__decode_depth_image(raw_bytes, depth_width, depth_height)
+
+    def __load_color_image(self, view: memoryview, offset: int, reduction: int) -> int:
+        """
+        Loads the color image section of a snapshot, which RacecarSim reduced by
+        reduction, and returns the next offset.
+        """
+        size = self.__get_color_size(reduction)
+        self.__color_image = self.__decode_color_image(
+            view[offset : offset + size], self.__get_output_image(), reduction
+        )
+        return offset + size
+
+    def __load_depth_image(self, view: memoryview, offset: int) -> int:
+        """
+        Loads the depth image section of a snapshot and returns the next offset.
+        """
+        depth_width, depth_height = struct.unpack_from("<HH", view, offset)
+        offset += 4
+        size = depth_width * depth_height * 4
+        self.__depth_image_native = self.__decode_depth_image(
+            view[offset : offset + size], depth_width, depth_height
+        )
+        return offset + size
+
+    def __request_color_image(
+        self, dst: Optional[NDArray[(480, 640, 3), np.uint8]], isAsync: bool = False
+    ) -> NDArray[(480, 640, 3), np.uint8]:
         # Ask for a the current color image
-        self.__racecar._RacecarSim__send_header(
-            self.__racecar.Header.camera_get_color_image, isAsync
+        suffix, reduction = self.__racecar._RacecarSim__get_color_request_suffix()
+        self.__racecar._RacecarSim__send_fragmented_request(
+            struct.pack("B", self.__racecar.Header.camera_get_color_image.value)
+            + suffix,
+            isAsync,
         )
 
         # Read the color image as 32 packets
-        raw_bytes = self.__racecar._RacecarSim__receive_fragmented(
-            32, self._WIDTH * self._HEIGHT * 4, isAsync
-        )
+        buffer = self.__color_buffer[: self.__get_color_size(reduction)]
+        self.__racecar._RacecarSim__receive_fragmented(buffer, 32, isAsync)
+        return self.__decode_color_image(buffer, dst, reduction)
+
+    def __decode_color_image(
+        self,
+        raw_bytes,
+        dst: Optional[NDArray[(480, 640, 3), np.uint8]],
+        reduction: int,
+    ) -> NDArray[(480, 640, 3), np.uint8]:
+        """
+        Converts a raw RGBA color image, whose width and height RacecarSim divided by
+        reduction, into a BGR image at the processing scale.
+        """
         color_image = np.frombuffer(raw_bytes, dtype=np.uint8)
-        color_image = np.reshape(color_image, (self._HEIGHT, self._WIDTH, 4), "C")
+        color_image = np.reshape(
+            color_image, (self._HEIGHT // reduction, self._WIDTH // reduction, 4), "C"
+        )
+        if reduction != self._reduction:
+            # RacecarSim could not send the image at the processing scale
+            color_image = cv.resize(
+                color_image,
+                (self.get_width(), self.get_height()),
+                interpolation=cv.INTER_AREA,
+            )
+
+        return cv.cvtColor(color_image, cv.COLOR_RGBA2BGR, dst)
 
-        color_image = cv.cvtColor(color_image, cv.COLOR_RGB2BGR)
-        return color_image
+    def __reduce_shared_color_image(
+        self, color_image: NDArray[(480, 640, 3), np.uint8]
+    ) -> NDArray[(480, 640, 3), np.uint8]:
+        """
+        Returns a full resolution color image read from the sensor ring at the
+        processing scale, which is only resized if it must be reduced.
+        """
+        if self._reduction == 1:
+            return color_image
+        return cv.resize(
+            color_image,
+            (self.get_width(), self.get_height()),
+            self.__get_output_image(),
+            interpolation=cv.INTER_AREA,
+        )
+
+    def __get_color_size(self, reduction: int) -> int:
+        """
+        Returns the size in bytes of a raw RGBA color image reduced by reduction.
+        """
+        return (self._WIDTH // reduction) * (self._HEIGHT // reduction) * 4
+
+    def __get_output_image(self) -> NDArray[(480, 640, 3), np.uint8]:
+        """
+        Returns a new output color image for this frame, at the processing scale.
 
-    def __request_depth_image(self, isAsync: bool) -> NDArray[(480, 640), np.float32]:
+        Note:
+            This is the only allocation a steady-state color frame makes (0.92 MB at
+            full scale).  Output images are never reused, since the program may keep
+            the image of an earlier frame (see Camera.get_color_image).
+        """
+        return np.empty((self.get_height(), self.get_width(), 3), np.uint8)
+
+    def __request_depth_image_native(
+        self, buffer: memoryview, isAsync: bool = False
+    ) -> NDArray[(Any, Any), np.float32]:
         self.__racecar._RacecarSim__send_header(
             self.__racecar.Header.camera_get_depth_image, isAsync
         )
-        raw_bytes: bytes = self.__racecar._RacecarSim__receive_data(
-            self._MAX_DEPTH_WIDTH * self._MAX_DEPTH_HEIGHT * 4
-        )
-        depth_image = np.frombuffer(raw_bytes, dtype=np.float32)
+        num_bytes: int = self.__racecar._RacecarSim__receive_data_into(buffer)
+
+        depth_width, depth_height = self.__get_depth_size(num_bytes)
+        return self.__decode_depth_image(buffer[:num_bytes], depth_width, depth_height)
+
+    def __get_depth_size(self, num_bytes: int) -> Tuple[int, int]:
+        """
+        Returns the width and height of a raw depth image from its size in bytes.
+        """
+        # Depth images have the same aspect ratio as the color image
+        num_pixels = num_bytes // 4
+        depth_width = math.isqrt(num_pixels * self._WIDTH // self._HEIGHT)
+        depth_height = num_pixels // max(depth_width, 1)
+        assert (
+            depth_width * depth_height == num_pixels
+        ), f"Received a depth image of unexpected size ({num_bytes} bytes)."
+        return depth_width, depth_height
 
-        # Calculate received height and width
-        n: int = (len(depth_image) // 300).bit_length() // 2
-        depth_width: int = 20 * 1 << n
-        depth_height: int = 15 * 1 << n
+    def __get_depth_scale(self) -> int:
+        """
+        Returns how many full resolution pixels each native depth pixel spans.
+        """
+        return self.get_width() // self.__depth_image_native.shape[1]
+
+    def __decode_depth_image(
+        self, raw_bytes, depth_width: int, depth_height: int
+    ) -> NDArray[(Any, Any), np.float32]:
+        """
+        Copies a raw depth image out of the buffer it was received into.
+        """
+        depth_image = np.frombuffer(raw_bytes, dtype=np.float32)
+        return np.reshape(depth_image, (depth_height, depth_width), "C").copy()
 
-        # Reshape and resize to full resolution
-        depth_image = np.reshape(depth_image, (depth_height, depth_width), "C")
-        depth_image = cv.resize(
-            depth_image, (self._WIDTH, self._HEIGHT), interpolation=cv.INTER_AREA
+    def __upscale_depth_image(
+        self, depth_image_native: NDArray[(Any, Any), np.float32]
+    ) -> NDArray[(480, 640), np.float32]:
+        """
+        Resizes a native resolution depth image to the processing scale.
+        """
+        return cv.resize(
+            depth_image_native,
+            (self.get_width(), self.get_height()),
+            interpolation=cv.INTER_AREA,
         )
-        return depth_image
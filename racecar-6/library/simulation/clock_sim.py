@@ -0,0 +1,9 @@
+from clock import Clock
+
+
+class ClockSim(Clock):
+    def __init__(self, racecar) -> None:
+        self.__racecar = racecar
+
+    def now(self) -> float:
+        return self.__racecar._RacecarSim__get_sim_time()
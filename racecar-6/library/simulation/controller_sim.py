@@ -1,96 +1,134 @@
-import sys
 import struct
-from enum import IntEnum
-from typing import Tuple, Dict
+from typing import Dict, Optional, Tuple
 
 from controller import Controller
 
 
 class ControllerSim(Controller):
+    # The layout of the gamepad state in a snapshot: bitmasks of the buttons which
+    # are down, were pressed, and were released, followed by the left and right
+    # trigger values and the (x, y) values of the left and right joysticks
+    __STATE_FORMAT = "<BBBffffff"
+
+    # The index of each part of the state
+    __DOWN = 0
+    __PRESSED = 1
+    __RELEASED = 2
+    __TRIGGERS = 3
+    __JOYSTICKS = 5
+
     def __init__(self, racecar) -> None:
         self.__racecar = racecar
-        self.__is_down_cache: Dict[Controller.Button, bool] = {}
-        self.__was_pressed_cache: Dict[Controller.Button, bool] = {}
-        self.__was_released_cache: Dict[Controller.Button, bool] = {}
-        self.__get_trigger_cache: Dict[Controller.Trigger, float] = {}
-        self.__get_joystick_cache: Dict[Controller.Joystick, Tuple[float, float]] = {}
+
+        # The whole gamepad state of this frame, which is received once (in a
+        # snapshot) and then read by every getter
+        self.__state: Tuple = ()
+        self.__is_state_current: bool = False
+
+        # The buffer which the state is received into when it is requested on its
+        # own, rather than as part of this frame's snapshot
+        self.__state_buffer = memoryview(
+            bytearray(4 + struct.calcsize(self.__STATE_FORMAT))
+        )
+
+        # Replies to individual queries, used when RacecarSim does not support
+        # snapshots, keyed by header and button, trigger, or joystick
+        self.__query_cache: Dict[Tuple[int, int], Tuple] = {}
 
     def is_down(self, button: Controller.Button) -> bool:
-        if button.value not in self.__is_down_cache:
-            self.__racecar._RacecarSim__send_data(
-                struct.pack(
-                    "BB", self.__racecar.Header.controller_is_down.value, button.value
-                )
+        state = self.__get_state()
+        if state is None:
+            return bool(
+                self.__query(self.__racecar.Header.controller_is_down, button)[0]
             )
-            self.__is_down_cache[button.value] = bool(
-                int.from_bytes(
-                    self.__racecar._RacecarSim__receive_data(), sys.byteorder
-                )
-            )
-        return self.__is_down_cache[button.value]
+        return bool(state[self.__DOWN] >> button & 1)
 
     def was_pressed(self, button: Controller.Button) -> bool:
-        if button.value not in self.__was_pressed_cache:
-            self.__racecar._RacecarSim__send_data(
-                struct.pack(
-                    "BB",
-                    self.__racecar.Header.controller_was_pressed.value,
-                    button.value,
-                )
+        state = self.__get_state()
+        if state is None:
+            return bool(
+                self.__query(self.__racecar.Header.controller_was_pressed, button)[0]
             )
-            self.__was_pressed_cache[button.value] = bool(
-                int.from_bytes(
-                    self.__racecar._RacecarSim__receive_data(), sys.byteorder
-                )
-            )
-        return self.__was_pressed_cache[button.value]
+        return bool(state[self.__PRESSED] >> button & 1)
 
     def was_released(self, button: Controller.Button) -> bool:
-        if button.value not in self.__was_released_cache:
-            self.__racecar._RacecarSim__send_data(
-                struct.pack(
-                    "BB",
-                    self.__racecar.Header.controller_was_released.value,
-                    button.value,
-                )
-            )
-            self.__was_released_cache[button.value] = bool(
-                int.from_bytes(
-                    self.__racecar._RacecarSim__receive_data(), sys.byteorder
-                )
+        state = self.__get_state()
+        if state is None:
+            return bool(
+                self.__query(self.__racecar.Header.controller_was_released, button)[0]
             )
-        return self.__was_released_cache[button.value]
+        return bool(state[self.__RELEASED] >> button & 1)
 
     def get_trigger(self, trigger: Controller.Trigger) -> float:
-        if trigger.value not in self.__get_trigger_cache:
-            self.__racecar._RacecarSim__send_data(
-                struct.pack(
-                    "BB",
-                    self.__racecar.Header.controller_get_trigger.value,
-                    trigger.value,
-                )
-            )
-            [value] = struct.unpack("f", self.__racecar._RacecarSim__receive_data())
-            self.__get_trigger_cache[trigger.value] = value
-        return self.__get_trigger_cache[trigger.value]
+        state = self.__get_state()
+        if state is None:
+            return self.__query(
+                self.__racecar.Header.controller_get_trigger, trigger, "f", 4
+            )[0]
+        return state[self.__TRIGGERS + trigger]
 
     def get_joystick(self, joystick: Controller.Joystick) -> Tuple[float, float]:
-        if joystick.value not in self.__get_joystick_cache:
-            self.__racecar._RacecarSim__send_data(
-                struct.pack(
-                    "BB",
-                    self.__racecar.Header.controller_get_joystick.value,
-                    joystick.value,
+        state = self.__get_state()
+        if state is None:
+            return self.__query(
+                self.__racecar.Header.controller_get_joystick, joystick, "ff", 8
+            )
+        index = self.__JOYSTICKS + 2 * joystick
+        return state[index : index + 2]
+
+    def __get_state(self) -> Optional[Tuple]:
+        """
+        Returns this frame's gamepad state, or None if RacecarSim does not support
+        snapshots and each value must be queried on its own.
+        """
+        if not self.__is_state_current:
+            if not self.__racecar._RacecarSim__fetch_snapshot(
+                self.__racecar.Snapshot.controller
+            ):
+                if (
+                    self.__racecar._RacecarSim__version
+                    < self.__racecar._RacecarSim__SNAPSHOT_VERSION
+                ):
+                    return None
+
+                # Snapshot mode is disabled, or this frame's snapshot did not include
+                # the controller, so request a snapshot of only the controller
+                self.__racecar._RacecarSim__request_snapshot(
+                    self.__racecar.Snapshot.controller, self.__state_buffer
                 )
+            self.__is_state_current = True
+        return self.__state
+
+    def __query(
+        self, header, index: int, reply_format: str = "B", reply_size: int = 1
+    ) -> Tuple:
+        """
+        Requests one value of the gamepad state, which is cached for the frame.
+        """
+        key = (header.value, index)
+        if key not in self.__query_cache:
+            self.__racecar._RacecarSim__send_data(
+                struct.pack("BB", header.value, index)
             )
-            self.__get_joystick_cache[joystick.value] = struct.unpack(
-                "ff", self.__racecar._RacecarSim__receive_data(8)
+            self.__query_cache[key] = struct.unpack(
+                reply_format, self.__racecar._RacecarSim__receive_data(reply_size)
             )
-        return self.__get_joystick_cache[joystick.value]
+        return self.__query_cache[key]
+
+    def __load_state(self, view: memoryview, offset: int) -> int:
+        """
+        Loads the controller section of a snapshot and returns the next offset.
+        """
+        self.__state = struct.unpack_from(self.__STATE_FORMAT, view, offset)
+        return offset + struct.calcsize(self.__STATE_FORMAT)
+
+    def __get_fetched(self) -> Optional[Tuple]:
+        """
+        Returns this frame's gamepad state, or None if it has not been fetched as a
+        whole.
+        """
+        return self.__state if self.__is_state_current else None
 
     def __update(self) -> None:
-        self.__is_down_cache.clear()
-        self.__was_pressed_cache.clear()
-        self.__was_released_cache.clear()
-        self.__get_trigger_cache.clear()
-        self.__get_joystick_cache.clear()
+        self.__is_state_current = False
+        self.__query_cache.clear()
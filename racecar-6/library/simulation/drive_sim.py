@@ -7,6 +7,9 @@ class DriveSim(Drive):
     def __init__(self, racecar) -> None:
         self.__racecar = racecar
 
+        # The speed and angle most recently set, which are recorded by sensor logs
+        self.__speed_angle = (0.0, 0.0)
+
     def set_speed_angle(self, speed: float, angle: float) -> None:
         assert (
             -1.0 <= speed <= 1.0
@@ -15,6 +18,7 @@ class DriveSim(Drive):
             -1.0 <= angle <= 1.0
         ), f"angle [{angle}] must be between -1.0 and 1.0 inclusive."
 
+        self.__speed_angle = (speed, angle)
         self.__racecar._RacecarSim__send_data(
             struct.pack(
                 "Bff", self.__racecar.Header.drive_set_speed_angle.value, speed, angle,
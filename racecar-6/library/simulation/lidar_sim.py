@@ -1,5 +1,7 @@
+import asyncio
 import sys
 import struct
+from typing import Optional
 import numpy as np
 from nptyping import NDArray
 
@@ -11,16 +13,23 @@ class LidarSim(Lidar):
         self.__racecar = racecar
         self.__ranges: NDArray[720, np.float32]
         self.__is_current: bool = False
+        self.__fetch: Optional[asyncio.Future] = None
 
     def get_samples(self) -> NDArray[720, np.float32]:
         if not self.__is_current:
-            self.__racecar._RacecarSim__send_header(
-                self.__racecar.Header.lidar_get_samples
-            )
-            raw_bytes: bytes = self.__racecar._RacecarSim__receive_data(
-                self._NUM_SAMPLES * 4
-            )
-            self.__ranges = np.frombuffer(raw_bytes, dtype=np.float32)
+            shared_frame = self.__racecar._RacecarSim__get_shared_frame()
+            if shared_frame is not None:
+                self.__ranges = shared_frame.lidar_samples
+            elif not self.__racecar._RacecarSim__fetch_snapshot(
+                self.__racecar.Snapshot.lidar
+            ):
+                self.__racecar._RacecarSim__send_header(
+                    self.__racecar.Header.lidar_get_samples
+                )
+                raw_bytes: bytes = self.__racecar._RacecarSim__receive_data(
+                    self._NUM_SAMPLES * 4
+                )
+                self.__ranges = np.frombuffer(raw_bytes, dtype=np.float32)
             self.__is_current = True
         return self.__ranges
 
@@ -33,5 +42,42 @@ class LidarSim(Lidar):
         )
         return np.frombuffer(raw_bytes, dtype=np.float32)
 
+    async def fetch_samples(self) -> NDArray[720, np.float32]:
+        if not self.__is_current and not self.__racecar._RacecarSim__has_snapshot(
+            self.__racecar.Snapshot.lidar
+        ):
+            shared_frame = self.__racecar._RacecarSim__get_shared_frame()
+            if shared_frame is not None:
+                self.__ranges = shared_frame.lidar_samples
+            else:
+                if self.__fetch is None:
+                    self.__fetch = asyncio.ensure_future(
+                        self.__racecar._RacecarSim__transport.request(
+                            struct.pack(
+                                "B", self.__racecar.Header.lidar_get_samples.value
+                            )
+                        )
+                    )
+                self.__ranges = np.frombuffer(await self.__fetch, dtype=np.float32)
+        self.__is_current = True
+
+        return self.__ranges
+
+    def __get_fetched(self) -> Optional[NDArray[720, np.float32]]:
+        """
+        Returns this frame's samples, or None if they have not been fetched.
+        """
+        return self.__ranges if self.__is_current else None
+
     def __update(self) -> None:
         self.__is_current = False
+        self.__fetch = None
+
+    def __load_samples(self, view: memoryview, offset: int) -> int:
+        """
+        Loads the lidar section of a snapshot and returns the next offset.
+        """
+        self.__ranges = np.frombuffer(
+            view, dtype=np.float32, count=self._NUM_SAMPLES, offset=offset
+        ).copy()
+        return offset + self._NUM_SAMPLES * 4
@@ -1,24 +1,132 @@
-import sys
 import struct
+from typing import Optional, Tuple
 import numpy as np
 from nptyping import NDArray
 
 from physics import Physics
 
+
 class PhysicsSim(Physics):
+    # The layout of the IMU in a snapshot: linear acceleration, then angular velocity
+    __IMU_FORMAT = "<ffffff"
+
     def __init__(self, racecar) -> None:
         self.__racecar = racecar
 
+        # Both vectors are copied into one new array each frame, and handed out as
+        # read-only views of its rows, so vectors kept from earlier frames never
+        # change.  The array is not reused between frames for that reason.
+        self.__set_imu(np.zeros((2, 3), np.float32))
+        self.__is_imu_current: bool = False
+
+        # The buffer which the IMU is received into when it is requested on its own,
+        # rather than as part of this frame's snapshot (delta time, then the IMU)
+        self.__imu_buffer = memoryview(
+            bytearray(4 + struct.calcsize(self.__IMU_FORMAT))
+        )
+
     def get_linear_acceleration(self) -> NDArray[3, np.float32]:
-        self.__racecar._RacecarSim__send_header(
+        self.__load()
+        return self.__linear_acceleration
+
+    def get_angular_velocity(self) -> NDArray[3, np.float32]:
+        self.__load()
+        return self.__angular_velocity
+
+    def get_imu(
+        self,
+    ) -> Tuple[NDArray[3, np.float32], NDArray[3, np.float32], float]:
+        self.__load()
+        return (
+            self.__linear_acceleration,
+            self.__angular_velocity,
+            self.__racecar.clock.now(),
+        )
+
+    async def fetch_linear_acceleration(self) -> NDArray[3, np.float32]:
+        if self.__is_imu_current or self.__has_snapshot():
+            return self.__linear_acceleration
+        return await self.__fetch_vector(
             self.__racecar.Header.physics_get_linear_acceleration
         )
-        values = struct.unpack("fff", self.__racecar._RacecarSim__receive_data(12))
-        return np.array(values)
 
-    def get_angular_velocity(self) -> NDArray[3, np.float32]:
-        self.__racecar._RacecarSim__send_header(
+    async def fetch_angular_velocity(self) -> NDArray[3, np.float32]:
+        if self.__is_imu_current or self.__has_snapshot():
+            return self.__angular_velocity
+        return await self.__fetch_vector(
             self.__racecar.Header.physics_get_angular_velocity
         )
-        values = struct.unpack("fff", self.__racecar._RacecarSim__receive_data(12))
-        return np.array(values)
+
+    async def __fetch_vector(self, header) -> NDArray[3, np.float32]:
+        raw_bytes = await self.__racecar._RacecarSim__transport.request(
+            struct.pack("B", header.value)
+        )
+        return np.array(struct.unpack("fff", raw_bytes), np.float32)
+
+    def __load(self) -> None:
+        """
+        Receives this frame's linear acceleration and angular velocity, unless they
+        have already been received.
+        """
+        if self.__is_imu_current or self.__racecar._RacecarSim__fetch_snapshot(
+            self.__racecar.Snapshot.physics
+        ):
+            return
+
+        if (
+            self.__racecar._RacecarSim__version
+            >= self.__racecar._RacecarSim__SNAPSHOT_VERSION
+        ):
+            # Snapshot mode is disabled, or this frame's snapshot did not include the
+            # IMU, so request both vectors (and the delta time) in a snapshot of only
+            # the IMU
+            self.__racecar._RacecarSim__request_snapshot(
+                self.__racecar.Snapshot.physics, self.__imu_buffer
+            )
+        else:
+            imu = np.empty((2, 3), np.float32)
+            for row, header in enumerate(
+                (
+                    self.__racecar.Header.physics_get_linear_acceleration,
+                    self.__racecar.Header.physics_get_angular_velocity,
+                )
+            ):
+                self.__racecar._RacecarSim__send_header(header)
+                imu[row] = struct.unpack(
+                    "fff", self.__racecar._RacecarSim__receive_data(12)
+                )
+            self.__set_imu(imu)
+            self.__is_imu_current = True
+
+    def __has_snapshot(self) -> bool:
+        return self.__racecar._RacecarSim__has_snapshot(self.__racecar.Snapshot.physics)
+
+    def __load_imu(self, view: memoryview, offset: int) -> int:
+        """
+        Loads the physics section of a snapshot and returns the next offset.
+        """
+        self.__set_imu(
+            np.frombuffer(view, "<f4", 6, offset).reshape((2, 3)).astype(np.float32)
+        )
+        self.__is_imu_current = True
+        return offset + struct.calcsize(self.__IMU_FORMAT)
+
+    def __set_imu(self, imu: NDArray[(2, 3), np.float32]) -> None:
+        """
+        Hands out the rows of a new IMU array as this frame's vectors.
+        """
+        imu.flags.writeable = False
+        self.__linear_acceleration: NDArray[3, np.float32] = imu[0]
+        self.__angular_velocity: NDArray[3, np.float32] = imu[1]
+
+    def __get_fetched(self) -> Optional[Tuple[float, ...]]:
+        """
+        Returns this frame's linear acceleration and angular velocity as six values,
+        or None if they have not been fetched.
+        """
+        if not self.__is_imu_current:
+            return None
+        return (*self.__linear_acceleration, *self.__angular_velocity)
+
+    def __update(self) -> None:
+        self.__is_imu_current = False
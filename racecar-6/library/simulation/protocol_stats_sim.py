@@ -0,0 +1,228 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Instrumentation of the RacecarSim protocol, used to find out how much of each frame
+is spent waiting for RacecarSim rather than running user code.
+"""
+
+import bisect
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Type
+
+
+class HeaderStats:
+    """
+    The calls, bytes, and round-trip times of one packet header.
+
+    Only requests (packets which RacecarSim answers or acts on) have round-trip
+    times; protocol control packets such as python_fragment_ack are only counted.
+    """
+
+    def __init__(self, num_bins: int) -> None:
+        self.count = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.rtt_count = 0
+        self.rtt_total = 0.0
+        self.rtt_max = 0.0
+        self.rtt_histogram: List[int] = [0] * num_bins
+
+
+class ProtocolStats:
+    """
+    Records, per packet header, the number of calls, bytes sent and received, and a
+    histogram of round-trip times, along with the time between the arrival of each
+    unity_start or unity_update command and the python_finished reply.
+
+    In the synchronous protocol only one request is in flight at a time, so a
+    request's round trip lasts from when it is sent until the last of its reply is
+    received (or until it is sent, for requests without a reply).  Requests made
+    through the asyncio transport are each timed until their reply completes, and
+    since they may overlap, the protocol time of a frame may exceed its frame time.
+
+    Histograms have logarithmic bins, whose upper edges are BIN_EDGES seconds; the
+    final bin holds every time above the largest edge.
+
+    Args:
+        header_type: The packet headers of the protocol, used to name each header.
+    """
+
+    # Ten bins per decade, from 10 us to 1 s
+    BIN_EDGES: List[float] = [10 ** (exponent / 10) for exponent in range(-50, 1)]
+
+    # Protocol control packets, which are not requests of their own
+    __CONTROL_HEADERS = (
+        "error",
+        "connect",
+        "unity_start",
+        "unity_update",
+        "unity_exit",
+        "python_finished",
+        "python_send_next",
+        "python_exit",
+        "python_fragment_ack",
+    )
+
+    def __init__(self, header_type: Type[IntEnum]) -> None:
+        self.__header_type = header_type
+        self.__control_headers = frozenset(
+            header_type[name].value
+            for name in self.__CONTROL_HEADERS
+            if name in header_type.__members__
+        )
+        self.__python_finished = header_type["python_finished"].value
+
+        # The synchronous request awaiting its reply
+        self.__pending: Optional[HeaderStats] = None
+        self.__pending_start = 0.0
+        self.__pending_end = 0.0
+
+        self.__frame_start: Optional[float] = None
+        self.__frame_protocol_time = 0.0
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clears every statistic recorded so far.
+        """
+        self.headers: Dict[int, HeaderStats] = {}
+        self.num_frames = 0
+        self.frame_time_total = 0.0
+        self.protocol_time_total = 0.0
+        self.frame_histogram: List[int] = [0] * (len(self.BIN_EDGES) + 1)
+        self.protocol_histogram: List[int] = [0] * (len(self.BIN_EDGES) + 1)
+
+    def get_header(self, header: int) -> HeaderStats:
+        """
+        Returns the statistics of a header, which are created on first use.
+        """
+        stats = self.headers.get(header)
+        if stats is None:
+            stats = HeaderStats(len(self.BIN_EDGES) + 1)
+            self.headers[header] = stats
+        return stats
+
+    def begin_frame(self) -> None:
+        """
+        Marks the arrival of a unity_start or unity_update command.
+        """
+        self.__frame_start = time.perf_counter()
+        self.__frame_protocol_time = 0.0
+
+    def sent(self, data: bytes, synchronous: bool = True) -> None:
+        """
+        Records a packet sent to RacecarSim.
+
+        Args:
+            data: The packet, whose first byte is its header.
+            synchronous: True if the packet was sent on the synchronous path, in
+                which case a request starts its round trip.
+        """
+        now = time.perf_counter()
+        header = data[0]
+        stats = self.get_header(header)
+        stats.count += 1
+        stats.bytes_out += len(data)
+
+        if header in self.__control_headers:
+            if header == self.__python_finished:
+                self.__finish_pending()
+                self.__end_frame(now)
+        elif synchronous:
+            self.__finish_pending()
+            self.__pending = stats
+            self.__pending_start = now
+            self.__pending_end = now
+
+    def received(self, num_bytes: int) -> None:
+        """
+        Records part of the reply to the synchronous request in flight.
+        """
+        self.__pending_end = time.perf_counter()
+        if self.__pending is not None:
+            self.__pending.bytes_in += num_bytes
+
+    def add_request(self, header: int, rtt: float, bytes_in: int) -> None:
+        """
+        Records a request made through the asyncio transport once it completes.
+        """
+        stats = self.get_header(header)
+        stats.bytes_in += bytes_in
+        self.__add_rtt(stats, rtt)
+
+    def summary(self) -> str:
+        """
+        Returns a table of the statistics recorded so far, averaged per frame.
+        """
+        frames = max(self.num_frames, 1)
+        frame_ms = self.frame_time_total / frames * 1000
+        protocol_ms = self.protocol_time_total / frames * 1000
+        frame_p95_ms = self.percentile(self.frame_histogram, 95) * 1000
+        lines = [
+            f">> Protocol stats over {self.num_frames} frames: "
+            f"frame {frame_ms:.2f} ms (p95 {frame_p95_ms:.2f} ms) = "
+            f"protocol {protocol_ms:.2f} ms + "
+            f"user code {frame_ms - protocol_ms:.2f} ms",
+            f"    {'header':<32}{'calls':>8}{'out B':>10}{'in B':>10}"
+            f"{'rtt ms':>9}{'p95 ms':>9}{'max ms':>9}",
+        ]
+        for header, stats in sorted(self.headers.items()):
+            try:
+                name = self.__header_type(header).name
+            except ValueError:
+                name = str(header)
+            if stats.rtt_count > 0:
+                rtt = (
+                    f"{stats.rtt_total / stats.rtt_count * 1000:>9.3f}"
+                    f"{self.percentile(stats.rtt_histogram, 95) * 1000:>9.3f}"
+                    f"{stats.rtt_max * 1000:>9.3f}"
+                )
+            else:
+                rtt = f"{'-':>9}{'-':>9}{'-':>9}"
+            lines.append(
+                f"    {name:<32}{stats.count / frames:>8.2f}"
+                f"{stats.bytes_out / frames:>10.0f}{stats.bytes_in / frames:>10.0f}"
+                + rtt
+            )
+        return "\n".join(lines)
+
+    def percentile(self, histogram: List[int], percent: float) -> float:
+        """
+        Returns the upper edge of the histogram bin containing a percentile, in
+        seconds (or infinity if it is in the final bin).
+        """
+        target = sum(histogram) * percent / 100
+        total = 0
+        for i, count in enumerate(histogram):
+            total += count
+            if count > 0 and total >= target:
+                return self.BIN_EDGES[i] if i < len(self.BIN_EDGES) else float("inf")
+        return 0.0
+
+    def __finish_pending(self) -> None:
+        if self.__pending is not None:
+            self.__add_rtt(self.__pending, self.__pending_end - self.__pending_start)
+            self.__pending = None
+
+    def __add_rtt(self, stats: HeaderStats, rtt: float) -> None:
+        stats.rtt_count += 1
+        stats.rtt_total += rtt
+        stats.rtt_max = max(stats.rtt_max, rtt)
+        stats.rtt_histogram[bisect.bisect_left(self.BIN_EDGES, rtt)] += 1
+        self.__frame_protocol_time += rtt
+
+    def __end_frame(self, now: float) -> None:
+        if self.__frame_start is None:
+            return
+        frame_time = now - self.__frame_start
+        self.__frame_start = None
+        self.num_frames += 1
+        self.frame_time_total += frame_time
+        self.protocol_time_total += self.__frame_protocol_time
+        self.frame_histogram[bisect.bisect_left(self.BIN_EDGES, frame_time)] += 1
+        self.protocol_histogram[
+            bisect.bisect_left(self.BIN_EDGES, self.__frame_protocol_time)
+        ] += 1
@@ -6,30 +6,107 @@ Summer 2020
 Manages communication with RacecarSim.
 """
 
+import asyncio
+import inspect
+import math
+import queue
 import struct
 import socket
 import sys
 import select
-from enum import IntEnum
+import threading
+import time
+from enum import IntEnum, IntFlag
 from signal import signal, SIGINT
-from typing import Callable, Optional
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 
+import async_transport_sim
 import camera_sim
+import clock_sim
 import controller_sim
 import display_sim
 import drive_sim
 import lidar_sim
 import physics_sim
+import protocol_stats_sim
+import shared_memory_sim
 
+import clock
+from frame_budget import FrameBudget
+from periodic_scheduler import PeriodicScheduler, PeriodicTask
 from racecar_core import Racecar
 import racecar_utils as rc_utils
+from sensor_log import SensorLogWriter
+
+
+class PrefetchTiming(NamedTuple):
+    """
+    The average time, per frame, spent prefetching sensor data (see set_prefetch).
+    """
+
+    num_frames: int
+    # Seconds from the arrival of unity_update until the prefetched data was received
+    fetch_time: float
+    # Seconds which the program spent blocked waiting for the prefetched data
+    wait_time: float
+    # Seconds of the fetch which overlapped with the program (fetch_time - wait_time)
+    time_saved: float
 
 
 class RacecarSim(Racecar):
+    """
+    Runs a program against RacecarSim, which it communicates with over UDP.
+
+    Args:
+        isHeadless: If True, the display module is disabled.
+        port: The port on which RacecarSim serves sync requests.
+        async_port: The port on which RacecarSim serves async requests, including
+            the handshake.
+
+    Note:
+        The ports only need to be changed to reach a RacecarSimServer (the stand-in
+        for RacecarSim) which listens on other ports, such as when several run at
+        once.
+    """
+
     __IP = "127.0.0.1"
-    __UNITY_PORT = (__IP, 5065)
-    __UNITY_ASYNC_PORT = (__IP, 5064)
-    __VERSION = 1
+    __UNITY_PORT = 5065
+    __UNITY_ASYNC_PORT = 5064
+
+    # The newest protocol version we speak, and the oldest we can fall back to
+    __VERSION = 5
+    __MIN_VERSION = 1
+
+    # The first protocol version which supports racecar_get_snapshot
+    __SNAPSHOT_VERSION = 2
+
+    # The first protocol version which sends fragments through a sliding window
+    __WINDOWED_VERSION = 3
+
+    # The first protocol version which supports racecar_open_shared_memory
+    __SHARED_MEMORY_VERSION = 4
+
+    # The first protocol version in which requests for a color image (or a snapshot
+    # containing one) give the factor by which to reduce its width and height
+    __COLOR_SCALE_VERSION = 5
+
+    # In the windowed protocol, each fragment is prefixed with the unity_fragment
+    # header, its transfer id, and its sequence number, and at most _FRAGMENT_WINDOW
+    # fragments past the first missing one may be in flight.  The window is kept
+    # small enough that a full window of color image fragments fits in the default
+    # socket receive buffer.
+    _FRAGMENT_HEADER_FORMAT = "<BBH"
+    _FRAGMENT_WINDOW = 4
+
+    # Requested socket receive buffer size, so that bursts of fragments are not
+    # dropped by the operating system (the OS may grant less)
+    __RECEIVE_BUFFER_SIZE = 1 << 20
+
+    # Seconds to wait for the next fragment before asking RacecarSim to resend
+    _FRAGMENT_TIMEOUT = 0.05
+
+    # The largest payload which fits in a single UDP datagram
+    __MAX_FRAGMENT_SIZE = 65507
 
     class Header(IntEnum):
         """
@@ -65,6 +142,10 @@ class RacecarSim(Racecar):
         lidar_get_samples = 26
         physics_get_linear_acceleration = 27
         physics_get_angular_velocity = 28
+        racecar_get_snapshot = 29
+        python_fragment_ack = 30
+        racecar_open_shared_memory = 31
+        unity_fragment = 32
 
     class Error(IntEnum):
         """
@@ -79,6 +160,27 @@ class RacecarSim(Racecar):
         racecarsim_outdated = 5
         fragment_mismatch = 6
 
+    class Snapshot(IntFlag):
+        """
+        The sensor sections which can be requested in a racecar_get_snapshot call.
+
+        A snapshot reply always begins with the delta time of the frame (f), followed
+        by one section per requested sensor in the order listed here:
+            color: the RGBA color image (4 bytes per pixel), whose width and height
+                are divided by the reduction which follows the sensors in the
+                request in the color scale protocol
+            depth: the depth image width and height (HH), then its float32 values
+            lidar: the float32 lidar samples
+            physics: linear acceleration and angular velocity (ffffff)
+            controller: the packed gamepad state (see ControllerSim)
+        """
+
+        color = 1
+        depth = 2
+        lidar = 4
+        physics = 8
+        controller = 16
+
     def __send_header(self, function_code: Header, is_async: bool = False) -> None:
         self.__send_data(struct.pack("B", function_code.value), is_async)
 
@@ -86,84 +188,567 @@ class RacecarSim(Racecar):
         self.__send_data(struct.pack("BB", self.Header.error, error), is_async)
 
     def __send_data(self, data: bytes, is_async: bool = False) -> None:
+        if (
+            self.__prefetch_pending
+            and threading.current_thread() is not self.__prefetch_thread
+        ):
+            # The socket belongs to the prefetch thread until its reply is received
+            self.__wait_for_prefetch()
+
+        if self.__stats is not None:
+            self.__stats.sent(data)
+
+        if self.__transport is not None:
+            # Replies to outstanding asyncio requests arrive first, so receive them
+            # before making a synchronous request
+            self.__transport.drain()
+
         if is_async:
-            self.__socket.sendto(data, self.__UNITY_ASYNC_PORT)
+            self.__socket.sendto(data, self.__unity_async_address)
         else:
-            self.__socket.sendto(data, self.__UNITY_PORT)
+            self.__socket.sendto(data, self.__unity_address)
 
     def __receive_data(self, buffer_size: int = 8) -> bytes:
-        data, _ = self.__socket.recvfrom(buffer_size)
+        datagram = self.__receive_datagram()
+        data = bytes(datagram[:buffer_size])
+        if self.__stats is not None:
+            self.__stats.received(len(data))
         return data
 
+    def __receive_data_into(self, buffer: memoryview) -> int:
+        datagram = self.__receive_datagram()
+        num_bytes = min(len(datagram), len(buffer))
+        buffer[:num_bytes] = datagram[:num_bytes]
+        if self.__stats is not None:
+            self.__stats.received(num_bytes)
+        return num_bytes
+
+    def __receive_datagram(self) -> memoryview:
+        """
+        Receives the next datagram other than a stale fragment, in full so that stale
+        fragments can be recognized, and returns a view of it which is only valid
+        until the next datagram is received.
+        """
+        while True:
+            self.__wait_for_reply()
+            num_bytes = self.__socket.recv_into(self.__fragment_datagram)
+            datagram = self.__fragment_datagram[:num_bytes]
+            if not self._is_stale_fragment(datagram):
+                return datagram
+
+    def __receive_command(self) -> bytes:
+        """
+        Waits for the next command from RacecarSim.
+        """
+        num_bytes = self.__socket.recv_into(self.__fragment_datagram)
+        return bytes(self.__fragment_datagram[:num_bytes])
+
+    def __wait_for_reply(self) -> None:
+        # While the asyncio transport is running, the socket is non-blocking, so wait
+        # here for the reply to a synchronous request
+        if self.__transport is not None:
+            select.select([self.__socket], [], [])
+
+    # The connection which AsyncTransport shares with the synchronous API, through
+    # these protected members rather than the private state of RacecarSim
+
+    def _next_transfer_id(self) -> int:
+        """
+        Returns the id of a new windowed transfer.
+        """
+        self.__transfer_id = (self.__transfer_id + 1) % 256
+        # Transfer ids wrap around, so forget the earlier transfer with the same id
+        self.__finished_transfers.pop(self.__transfer_id, None)
+        return self.__transfer_id
+
+    def _finish_transfer(
+        self, transfer_id: int, num_bytes: int, num_fragments: int
+    ) -> None:
+        """
+        Records that a windowed transfer of a num_bytes message is complete, so that
+        its fragments are recognized as stale if they arrive later.
+        """
+        self.__finished_transfers[transfer_id] = (num_bytes, num_fragments)
+
+    def _get_socket(self) -> socket.socket:
+        """
+        Returns the socket connected to RacecarSim.
+        """
+        return self.__socket
+
+    def _get_unity_address(self) -> Tuple[str, int]:
+        """
+        Returns the address to which synchronous requests are sent.
+        """
+        return self.__unity_address
+
+    def _is_stale_fragment(self, data) -> bool:
+        """
+        Returns whether a datagram which was expected to be a command or a reply is
+        instead a fragment of a windowed transfer which is already complete.
+
+        Fragments are only received during their transfer, so one which arrives
+        later is a duplicate of a fragment which was resent, and must be skipped.
+        A datagram is only taken as such a fragment if it begins with the
+        unity_fragment header and the id of a finished transfer, and its sequence
+        number and size match a fragment of that transfer.  Commands never begin
+        with unity_fragment, and a reply would have to match all of these to be
+        mistaken for a fragment.
+        """
+        header_size = len(self.__fragment_header)
+        if len(data) < header_size or data[0] != self.Header.unity_fragment:
+            return False
+
+        _, transfer_id, sequence = struct.unpack_from(
+            self._FRAGMENT_HEADER_FORMAT, data
+        )
+        transfer = self.__finished_transfers.get(transfer_id)
+        if transfer is None:
+            return False
+        num_bytes, num_fragments = transfer
+        fragment_size = math.ceil(num_bytes / num_fragments)
+        return sequence < num_fragments and len(data) - header_size == min(
+            fragment_size, num_bytes - sequence * fragment_size
+        )
+
+    def _is_pipelined(self) -> bool:
+        """
+        Returns whether RacecarSim queues requests which arrive during a fragmented
+        transfer, so that several requests may be in flight at once.
+        """
+        return self.__version >= self.__WINDOWED_VERSION
+
+    def __get_color_request_suffix(self) -> Tuple[bytes, int]:
+        """
+        Returns the bytes which follow the header (and the sensors of a snapshot) in a
+        request for a color image, and the reduction of the image RacecarSim will send.
+
+        Note:
+            Before the color scale protocol, RacecarSim always sends full resolution
+            color images, which CameraSim reduces to the processing scale itself.
+        """
+        if self.__version < self.__COLOR_SCALE_VERSION:
+            return b"", 1
+        reduction = self.camera._reduction
+        return struct.pack("B", reduction), reduction
+
+    def __send_fragmented_request(self, data: bytes, is_async: bool = False) -> None:
+        """
+        Sends a request which RacecarSim answers with a fragmented message.
+
+        Note:
+            In the windowed protocol, the request ends with a transfer id which
+            RacecarSim attaches to every fragment of its reply, so that stale
+            fragments from an earlier transfer are never mistaken for new ones.
+        """
+        if self.__version >= self.__WINDOWED_VERSION:
+            data += struct.pack("B", self._next_transfer_id())
+        self.__send_data(data, is_async)
+
     def __receive_fragmented(
-        self, num_fragments: int, total_bytes: int, is_async: bool = False
-    ) -> bytes:
-        raw_bytes: bytes = bytes()
-        fragment_size = total_bytes // num_fragments
-        for i in range(0, num_fragments):
-            raw_bytes += self.__receive_data(fragment_size)
-            self.__send_header(self.Header.python_send_next, is_async)
-        return raw_bytes
-
-    def __init__(self, isHeadless: bool = False) -> None:
+        self, buffer: memoryview, num_fragments: int, is_async: bool = False
+    ) -> int:
+        """
+        Receives a fragmented message directly into buffer, without intermediate
+        copies, and returns the number of bytes received.
+        """
+        if self.__version >= self.__WINDOWED_VERSION:
+            received = self.__receive_windowed(buffer, num_fragments, is_async)
+        else:
+            # The final fragment may be shorter than the others
+            fragment_size = math.ceil(len(buffer) / num_fragments)
+            received = 0
+            for i in range(0, num_fragments):
+                self.__wait_for_reply()
+                received += self.__socket.recv_into(
+                    buffer[received : received + fragment_size]
+                )
+                self.__send_header(self.Header.python_send_next, is_async)
+
+        if self.__stats is not None:
+            self.__stats.received(received)
+        return received
+
+    def __receive_windowed(
+        self, buffer: memoryview, num_fragments: int, is_async: bool
+    ) -> int:
+        """
+        Receives a fragmented message sent through a sliding window.
+
+        Fragments are acknowledged cumulatively every half window, and any missing
+        fragments are listed in the acknowledgement so that RacecarSim resends only
+        those.  Each missing fragment is only listed once, since listing it again
+        while its resend is in flight would produce a duplicate which could arrive
+        after the transfer is complete.  If no fragment arrives in time, the
+        acknowledgement is repeated and lists every missing fragment in the window.
+        """
+        fragment_size = math.ceil(len(buffer) / num_fragments)
+        received = bytearray(num_fragments)
+        requested = bytearray(num_fragments)
+        received_bytes = 0
+        next_expected = 0
+        highest = -1
+        unacknowledged = 0
+
+        self.__socket.settimeout(self._FRAGMENT_TIMEOUT)
+        try:
+            while next_expected < num_fragments:
+                # Receive in place assuming the fragment after the highest one so far
+                # is next, which holds unless a fragment was lost or reordered
+                slot = highest + 1
+                if (slot + 1) * fragment_size <= len(buffer):
+                    target = buffer[slot * fragment_size : (slot + 1) * fragment_size]
+                else:
+                    target = self.__fragment_scratch[:fragment_size]
+
+                try:
+                    num_bytes = self.__receive_fragment(target)
+                except socket.timeout:
+                    requested[:] = bytes(num_fragments)
+                    self.__send_fragment_ack(
+                        next_expected,
+                        self.__find_missing(
+                            received, requested, next_expected, num_fragments
+                        ),
+                        is_async,
+                    )
+                    continue
+
+                _, transfer_id, sequence = struct.unpack_from(
+                    self._FRAGMENT_HEADER_FORMAT, self.__fragment_header
+                )
+                if (
+                    transfer_id != self.__transfer_id
+                    or sequence >= num_fragments
+                    or received[sequence]
+                ):
+                    # Ignore stale and duplicate fragments
+                    continue
+
+                if sequence != slot or target.obj is not buffer.obj:
+                    start = sequence * fragment_size
+                    buffer[start : start + num_bytes] = target[:num_bytes]
+
+                received[sequence] = 1
+                received_bytes += num_bytes
+                highest = max(highest, sequence)
+                while next_expected < num_fragments and received[next_expected]:
+                    next_expected += 1
+
+                unacknowledged += 1
+                if (
+                    sequence != slot
+                    or unacknowledged >= self._FRAGMENT_WINDOW // 2
+                    or next_expected == num_fragments
+                ):
+                    self.__send_fragment_ack(
+                        next_expected,
+                        self.__find_missing(
+                            received, requested, next_expected, highest + 1
+                        ),
+                        is_async,
+                    )
+                    unacknowledged = 0
+        finally:
+            # The asyncio transport requires a non-blocking socket
+            self.__socket.settimeout(None if self.__transport is None else 0)
+
+        self._finish_transfer(self.__transfer_id, len(buffer), num_fragments)
+        return received_bytes
+
+    def __receive_fragment(self, target: memoryview) -> int:
+        """
+        Receives one windowed fragment, storing its header in __fragment_header and
+        its payload in target, and returns the size of the payload.
+        """
+        header_size = len(self.__fragment_header)
+        if hasattr(self.__socket, "recvmsg_into"):
+            num_bytes, _, _, _ = self.__socket.recvmsg_into(
+                [self.__fragment_header, target]
+            )
+            return num_bytes - header_size
+
+        # Scatter receives are not available on every platform
+        datagram = self.__fragment_datagram[: header_size + len(target)]
+        num_bytes = self.__socket.recv_into(datagram)
+        self.__fragment_header[:] = datagram[:header_size]
+        target[: num_bytes - header_size] = datagram[header_size:num_bytes]
+        return num_bytes - header_size
+
+    def __find_missing(
+        self, received: bytearray, requested: bytearray, start: int, end: int
+    ) -> List[int]:
+        """
+        Returns the sequence numbers in [start, end) which have been neither received
+        nor requested, limited to the fragment window, and marks them as requested.
+        """
+        end = min(end, len(received), start + self._FRAGMENT_WINDOW)
+        missing = [i for i in range(start, end) if not received[i] | requested[i]]
+        for i in missing:
+            requested[i] = 1
+        return missing
+
+    def __send_fragment_ack(
+        self, next_expected: int, missing: List[int], is_async: bool
+    ) -> None:
+        self.__send_data(
+            struct.pack(
+                f"<BBH{len(missing)}H",
+                self.Header.python_fragment_ack.value,
+                self.__transfer_id,
+                next_expected,
+                *missing,
+            ),
+            is_async,
+        )
+
+    def __init__(
+        self,
+        isHeadless: bool = False,
+        port: int = __UNITY_PORT,
+        async_port: int = __UNITY_ASYNC_PORT,
+    ) -> None:
+        # The addresses to which sync and async requests are sent
+        self.__unity_address = (self.__IP, port)
+        self.__unity_async_address = (self.__IP, async_port)
+
         self.camera = camera_sim.CameraSim(self)
         self.controller = controller_sim.ControllerSim(self)
         self.display = display_sim.DisplaySim(isHeadless)
         self.drive = drive_sim.DriveSim(self)
         self.physics = physics_sim.PhysicsSim(self)
         self.lidar = lidar_sim.LidarSim(self)
+        self.clock = clock_sim.ClockSim(self)
+        clock.set_current(self.clock)
 
         self.__start: Callable[[], None]
         self.__update: Callable[[], None]
-        self.__update_slow: Optional[Callable[[], None]]
+        self.__update_slow: Optional[Callable[[], None]] = None
         self.__update_slow_time: float = 1
-        self.__update_slow_counter: float = 0
+
+        # Functions run after update at fixed periods, including update_slow, which
+        # is scheduled every update_slow_time seconds
+        self.__scheduler = PeriodicScheduler()
+        self.__update_slow_tasks: List[PeriodicTask] = []
         self.__delta_time: float = -1
 
+        # The simulation time (the sum of the delta time of every frame), which is
+        # only tracked once it is first read, since that requires the delta time of
+        # every frame
+        self.__sim_time: float = 0
+        self.__is_sim_time_tracked: bool = False
+
         self.__socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.__socket.setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF, self.__RECEIVE_BUFFER_SIZE
+        )
         self.__in_call: bool = False
+        self.__version: int = self.__MIN_VERSION
+
+        # Whether the handshake offers protocol versions newer than the first one
+        self.__negotiate_version: bool = False
+
+        # The number of the car assigned by RacecarSim in the handshake
+        self.__car_index: Optional[int] = None
+
+        # The asyncio transport, which is only used when start or update is a
+        # coroutine function
+        self.__transport: Optional[async_transport_sim.AsyncTransport] = None
+
+        # Windowed protocol state, including the message size and number of fragments
+        # of each finished transfer, by transfer id
+        self.__transfer_id: int = 0
+        self.__finished_transfers: Dict[int, Tuple[int, int]] = {}
+        self.__fragment_header = bytearray(
+            struct.calcsize(self._FRAGMENT_HEADER_FORMAT)
+        )
+        self.__fragment_scratch = memoryview(bytearray(self.__MAX_FRAGMENT_SIZE))
+        self.__fragment_datagram = memoryview(
+            bytearray(len(self.__fragment_header) + self.__MAX_FRAGMENT_SIZE)
+        )
+
+        # Snapshot state: the sensors read during the previous frame are requested
+        # together in a single racecar_get_snapshot call during the next frame
+        self.__snapshot_enabled: bool = False
+        self.__snapshot_taken: bool = False
+        self.__snapshot_sensors: RacecarSim.Snapshot = self.Snapshot(0)
+        self.__snapshot_subscriptions: RacecarSim.Snapshot = self.Snapshot(0)
+        self.__snapshot_used: RacecarSim.Snapshot = self.Snapshot(0)
+
+        # Snapshots are received into a persistent buffer, which the modules copy
+        # each sensor's section out of, so it may be reused every frame
+        self.__snapshot_buffer = bytearray()
+
+        # Shared memory state: when RacecarSim runs on the same machine, it writes the
+        # color image, depth image, and lidar samples of each frame to a sensor ring,
+        # and only control packets are sent over UDP
+        self.__shared_memory_enabled: bool = True
+        self.__shared_memory: Optional[shared_memory_sim.SensorRing] = None
+        self.__shared_frame: Optional[shared_memory_sim.SharedFrame] = None
+
+        # The sensor log written at the end of each frame, if logging was started
+        self.__sensor_log: Optional[SensorLogWriter] = None
+
+        # The time of each frame, from the arrival of unity_start or unity_update until
+        # python_finished, and the optional work shed once a frame runs long.  Logging
+        # is critical, so an overrun frame is never silently left out of the log, and
+        # is registered so that its time is reported alongside the optional tasks.
+        self.frame_budget = FrameBudget()
+        self.__log_task = self.frame_budget.register(
+            "sensor_log", SensorLogWriter.log_frame, critical=True
+        )
+
+        # Protocol instrumentation, which is None unless enabled so that each packet
+        # only pays for a single check
+        self.__stats: Optional[protocol_stats_sim.ProtocolStats] = None
+        self.__stats_summary: bool = False
+
+        # The time.perf_counter() time at which the next summary is printed, so that
+        # deciding whether one is due never asks RacecarSim for the delta time
+        self.__next_summary_time: float = 0
+
+        # Prefetch state: the sensors declared with set_prefetch are requested as soon
+        # as unity_start or unity_update arrives, in a snapshot received by a
+        # background thread while the user program runs
+        self.__prefetch_sensors: RacecarSim.Snapshot = self.Snapshot(0)
+        self.__prefetch_pending: bool = False
+        self.__prefetch_requests: queue.Queue = queue.Queue()
+        self.__prefetch_done = threading.Event()
+        self.__prefetch_thread: Optional[threading.Thread] = None
+        self.__prefetch_error: Optional[BaseException] = None
+        self.__prefetch_start: float = 0
+        self.__prefetch_end: float = 0
+        self.__prefetch_frames: int = 0
+        self.__prefetch_fetch_total: float = 0
+        self.__prefetch_wait_total: float = 0
+        self.__prefetch_tasks: List[asyncio.Future] = []
 
         signal(SIGINT, self.__handle_sigint)
 
     def go(self) -> None:
         print(">> Python script loaded, awaiting connection from RacecarSim.")
 
-        # Repeatedly try to connect to RacecarSim (async) until we receive a response
-        while True:
-            self.__send_data(
-                struct.pack("BB", self.Header.connect, self.__VERSION), True
+        if not self.__connect():
+            return
+
+        try:
+            # Coroutine user functions are run on an asyncio event loop, so that they
+            # can await several sensor requests at once
+            if any(
+                inspect.iscoroutinefunction(function)
+                for function in (self.__start, self.__update, self.__update_slow)
+            ):
+                asyncio.run(self.__go_async())
+                return
+
+            self.__check_prefetch()
+            # Respond to start/update commands from RacecarSim (sync) until we receive
+            # an exit or error command
+            while self.__handle_command(self.__receive_command()):
+                pass
+
+            self.stop_logging()
+        finally:
+            self.__close_shared_memory()
+
+    def __handle_command(self, data: bytes) -> bool:
+        """
+        Responds to a single command from RacecarSim, returning whether to keep
+        listening for commands.
+        """
+        if self._is_stale_fragment(data):
+            return True
+
+        header = int(data[0])
+        if self.__stats is not None and header in (
+            self.Header.unity_start.value,
+            self.Header.unity_update.value,
+        ):
+            self.__stats.begin_frame()
+        if header in (self.Header.unity_start.value, self.Header.unity_update.value):
+            self.frame_budget.begin_frame()
+        if self.__prefetch_sensors and header in (
+            self.Header.unity_start.value,
+            self.Header.unity_update.value,
+        ):
+            self.__start_prefetch()
+
+        if header == self.Header.unity_start.value:
+            try:
+                self.__in_call = True
+                self.set_update_slow_time()
+                self.__start()
+                self.__end_frame()
+                self.__in_call = False
+            except SystemExit:
+                raise
+            except:
+                self.__send_error(self.Error.python_exception)
+                raise
+        elif header == self.Header.unity_update.value:
+            try:
+                self.__in_call = True
+                self.__handle_update()
+                self.__in_call = False
+            except SystemExit:
+                raise
+            except:
+                self.__send_error(self.Error.python_exception)
+                raise
+        elif header == self.Header.unity_exit.value:
+            rc_utils.print_warning(
+                ">> Exit command received from RacecarSim, closing script..."
             )
-            ready = select.select([self.__socket], [], [], 0.25)
-            if ready[0]:
-                data, _ = self.__socket.recvfrom(2)
-                header = int(data[0])
-                if header == self.Header.connect.value:
-                    car_index = int(data[1])
-                    rc_utils.print_colored(
-                        f">> Connection established with RacecarSim (assigned to car number {car_index}). Enter user program mode in RacecarSim to begin...",
-                        rc_utils.TerminalColor.green,
-                    )
-                    break
-                elif header == self.Header.error.value:
-                    self.__handle_error(int(data[1]))
-                else:
-                    rc_utils.print_error(
-                        ">> Invalid handshake with RacecarSim, closing script..."
-                    )
-                    self.__send_header(self.Header.error)
-                    return
+            return False
+        elif header == self.Header.error:
+            error = int(data[1]) if len(data) > 1 else self.Error.generic
+            self.__handle_error(error)
+        else:
+            rc_utils.print_error(
+                f">> Error: unexpected packet with header [{header}] received from RacecarSim, closing script..."
+            )
+            self.__send_header(self.Header.error)
+            return False
+
+        self.frame_budget.end_frame()
+        self.__send_header(self.Header.python_finished)
+        return True
+
+    async def __go_async(self) -> None:
+        """
+        Responds to start/update commands like go, but through the asyncio transport.
+        """
+        loop = asyncio.get_running_loop()
+        _, self.__transport = await loop.create_datagram_endpoint(
+            lambda: async_transport_sim.AsyncTransport(self), sock=self.__socket
+        )
 
-        # Respond to start/update commands from RacecarSim (sync) until we receive an
-        # exit or error command
         while True:
-            data, _ = self.__socket.recvfrom(8)
+            data = await self.__transport.receive_command()
             header = int(data[0])
+            if self.__stats is not None and header in (
+                self.Header.unity_start.value,
+                self.Header.unity_update.value,
+            ):
+                self.__stats.begin_frame()
+            if header in (
+                self.Header.unity_start.value,
+                self.Header.unity_update.value,
+            ):
+                self.frame_budget.begin_frame()
+            if self.__prefetch_sensors and header in (
+                self.Header.unity_start.value,
+                self.Header.unity_update.value,
+            ):
+                self.__start_prefetch_async()
 
             if header == self.Header.unity_start.value:
                 try:
                     self.__in_call = True
                     self.set_update_slow_time()
-                    self.__start()
+                    await self.__call_async(self.__start)
+                    await self.__finish_prefetch_async()
+                    self.__end_frame()
                     self.__in_call = False
                 except SystemExit:
                     raise
@@ -173,7 +758,7 @@ class RacecarSim(Racecar):
             elif header == self.Header.unity_update.value:
                 try:
                     self.__in_call = True
-                    self.__handle_update()
+                    await self.__handle_update_async()
                     self.__in_call = False
                 except SystemExit:
                     raise
@@ -195,8 +780,103 @@ class RacecarSim(Racecar):
                 self.__send_header(self.Header.error)
                 break
 
+            self.frame_budget.end_frame()
             self.__send_header(self.Header.python_finished)
 
+        self.stop_logging()
+
+    async def __handle_update_async(self) -> None:
+        await self.__call_async(self.__update)
+
+        if self.__scheduler:
+            for task in self.__scheduler.advance(self.get_delta_time()):
+                start = time.perf_counter()
+                await self.__call_async(task.function)
+                task.record(time.perf_counter() - start)
+        self.frame_budget.run_deferred()
+        self.__print_protocol_summary()
+
+        await self.__finish_prefetch_async()
+        self.__end_frame()
+
+    @staticmethod
+    async def __call_async(function: Callable) -> None:
+        # Synchronous user functions may be mixed with coroutine functions
+        result = function()
+        if inspect.isawaitable(result):
+            await result
+
+    def __connect(self) -> bool:
+        """
+        Performs the handshake with RacecarSim, returning whether it succeeded.
+        """
+        # Repeatedly try to connect to RacecarSim (async) until we receive a response.
+        # With protocol negotiation, start with the newest protocol version and fall
+        # back to older ones if RacecarSim reports that it does not support them.
+        self.__version = (
+            self.__VERSION if self.__negotiate_version else self.__MIN_VERSION
+        )
+        while True:
+            self.__send_data(
+                struct.pack("BB", self.Header.connect, self.__version), True
+            )
+            ready = select.select([self.__socket], [], [], 0.25)
+            if ready[0]:
+                data, _ = self.__socket.recvfrom(2)
+                header = int(data[0])
+                if header == self.Header.connect.value:
+                    self.__car_index = int(data[1])
+                    rc_utils.print_colored(
+                        f">> Connection established with RacecarSim (assigned to car number {self.__car_index}). Enter user program mode in RacecarSim to begin...",
+                        rc_utils.TerminalColor.green,
+                    )
+                    if (
+                        self.__shared_memory_enabled
+                        and self.__version >= self.__SHARED_MEMORY_VERSION
+                    ):
+                        self.__open_shared_memory()
+                    return True
+                elif header == self.Header.error.value:
+                    error = int(data[1])
+                    if (
+                        error == self.Error.racecarsim_outdated
+                        and self.__version > self.__MIN_VERSION
+                    ):
+                        self.__version -= 1
+                        continue
+                    self.__handle_error(error)
+                else:
+                    rc_utils.print_error(
+                        ">> Invalid handshake with RacecarSim, closing script..."
+                    )
+                    self.__send_header(self.Header.error)
+                    return False
+
+    def __open_shared_memory(self) -> None:
+        """
+        Asks RacecarSim for its sensor ring, and opens it if it is on this machine.
+        """
+        # The reply is whether RacecarSim offers a sensor ring (B), then its path
+        self.__send_header(self.Header.racecar_open_shared_memory, True)
+        data = self.__receive_data(4096)
+        if data[0]:
+            path = data[1:].decode()
+            self.__shared_memory = shared_memory_sim.SensorRing.open(path)
+            if self.__shared_memory is not None:
+                rc_utils.print_colored(
+                    f">> Reading sensor data from shared memory ({path}).",
+                    rc_utils.TerminalColor.green,
+                )
+
+    def __close_shared_memory(self) -> None:
+        """
+        Unmaps the sensor ring, if one was opened.
+        """
+        self.__shared_frame = None
+        if self.__shared_memory is not None:
+            self.__shared_memory.close()
+            self.__shared_memory = None
+
     def set_start_update(
         self,
         start: Callable[[], None],
@@ -206,9 +886,19 @@ class RacecarSim(Racecar):
         self.__start = start
         self.__update = update
         self.__update_slow = update_slow
+        self.__schedule_update_slow()
+
+    def get_car_index(self) -> Optional[int]:
+        """
+        Returns the number of the car assigned to this script by RacecarSim, or None
+        if it has not connected yet.
+        """
+        return self.__car_index
 
     def get_delta_time(self) -> float:
-        if self.__delta_time < 0:
+        # Every snapshot carries the delta time, so only ask for it on its own if a
+        # snapshot cannot be taken this frame
+        if self.__delta_time < 0 and not self.__fetch_snapshot(self.Snapshot(0)):
             self.__send_header(self.Header.racecar_get_delta_time)
             [value] = struct.unpack("f", self.__receive_data())
             self.__delta_time = value
@@ -216,20 +906,485 @@ class RacecarSim(Racecar):
 
     def set_update_slow_time(self, update_slow_time: float = 1.0) -> None:
         self.__update_slow_time = update_slow_time
+        self.__schedule_update_slow()
+
+    def schedule_periodic(
+        self,
+        function: Callable[[], None],
+        period: float,
+        phase: Optional[float] = None,
+        budget: Optional[float] = None,
+    ) -> PeriodicTask:
+        return self.__scheduler.add(function, period, phase, budget)
+
+    def __schedule_update_slow(self) -> None:
+        """
+        Schedules update_slow every update_slow_time seconds, starting with the next
+        update.
+        """
+        for task in self.__update_slow_tasks:
+            task.cancel()
+        self.__update_slow_tasks = [
+            self.__scheduler.add(function, self.__update_slow_time, 0)
+            for function in [self.__update_slow]
+            if function is not None
+        ]
+
+    def __get_sim_time(self) -> float:
+        """
+        Returns the seconds of simulation time from the start of the frame in which
+        the simulation time was first read until the end of the current frame (or of
+        the previous frame, outside of start and update).
+        """
+        self.__is_sim_time_tracked = True
+        if not self.__in_call:
+            return self.__sim_time
+        return self.__sim_time + self.get_delta_time()
+
+    def set_protocol_negotiation(self, enabled: bool = True) -> None:
+        """
+        Enables or disables negotiating a newer protocol version with RacecarSim.
+
+        Args:
+            enabled: If True, the handshake offers the newest protocol version, and
+                falls back one version at a time each time RacecarSim answers that
+                it is outdated.  If False, the handshake offers the first protocol
+                version, which every RacecarSim supports.
+
+        Note:
+            Protocol negotiation is disabled by default, since the RacecarSim builds
+            distributed with this library only speak the first version, and a build
+            which does not answer a newer version with racecarsim_outdated would
+            never connect.  Snapshots (see set_snapshot_mode), the windowed fragment
+            protocol, shared memory (see set_shared_memory_mode), and reduced
+            resolution color images from RacecarSim all require a newer version.
+            This must be set before go() is called.
+        """
+        self.__negotiate_version = enabled
+
+    def set_snapshot_mode(self, enabled: bool = True) -> None:
+        """
+        Enables or disables batching sensor requests into one snapshot per frame.
+
+        Args:
+            enabled: If True, the first sensor read of each frame requests every
+                sensor read during the previous frame in a single round trip, and
+                later reads in that frame are served from the module caches.
+
+        Note:
+            Snapshot mode is disabled by default (set_prefetch enables it), and has
+            no effect unless a protocol version which supports racecar_get_snapshot
+            was negotiated (see set_protocol_negotiation).  Each snapshot requests
+            every sensor read during the previous frame, so it only pays off when
+            the round trips it saves are slow, such as with prefetching (see
+            set_prefetch) or when RacecarSim runs on another machine; on the same
+            machine, requesting each sensor when it is read is faster.
+        """
+        self.__snapshot_enabled = enabled
+
+    def set_shared_memory_mode(self, enabled: bool = True) -> None:
+        """
+        Enables or disables reading sensor data from shared memory.
+
+        Args:
+            enabled: If True, and RacecarSim runs on the same machine, the color
+                image, depth image, and lidar samples are read from a ring of frames
+                in shared memory instead of being sent over UDP.
+
+        Note:
+            Shared memory mode is enabled by default, but requires protocol
+            negotiation (see set_protocol_negotiation), and must be set before go()
+            is called.  Each frame's color image, depth image, and lidar samples are
+            copied out of the ring the first time one of them is read, and the
+            copies are checked against the ring's sequence lock, so a frame which
+            RacecarSim overwrote mid-read is read again.  The returned arrays are
+            owned by the program, and stay valid after the frame.
+        """
+        self.__shared_memory_enabled = enabled
+
+    def set_protocol_stats(self, enabled: bool = True, summary: bool = False) -> None:
+        """
+        Enables or disables recording statistics of the RacecarSim protocol.
+
+        Args:
+            enabled: If True, the calls, bytes, and round-trip times of each packet
+                header are recorded, along with the time from each unity_update
+                command to the python_finished reply (see ProtocolStats).
+            summary: If True, a summary of the statistics is printed and cleared
+                after update every update_slow_time seconds, as measured by the
+                same clock as the statistics rather than the simulation time.
+
+        Note:
+            Statistics are disabled by default, in which case each packet only costs
+            a single check.  Enabling them again clears the statistics.
+        """
+        self.__stats = (
+            protocol_stats_sim.ProtocolStats(self.Header) if enabled else None
+        )
+        self.__stats_summary = enabled and summary
+        self.__next_summary_time = time.perf_counter() + self.__update_slow_time
+
+    def get_protocol_stats(self) -> Optional[protocol_stats_sim.ProtocolStats]:
+        """
+        Returns the protocol statistics recorded so far, or None if they are disabled.
+
+        Example::
+
+            rc.set_protocol_stats()
+            ...
+            print(rc.get_protocol_stats().summary())
+        """
+        return self.__stats
+
+    def __print_protocol_summary(self) -> None:
+        """
+        Prints and clears the protocol statistics if a summary is due.
+        """
+        if not self.__stats_summary or self.__stats is None:
+            return
+        now = time.perf_counter()
+        if now >= self.__next_summary_time:
+            self.__next_summary_time = now + self.__update_slow_time
+            print(self.__stats.summary())
+            self.__stats.reset()
+
+    def set_prefetch(
+        self,
+        camera: bool = False,
+        depth: bool = False,
+        lidar: bool = False,
+        physics: bool = False,
+        controller: bool = False,
+    ) -> None:
+        """
+        Declares which sensors the program reads every frame, so that they are
+        requested before start or update is called.
+
+        Args:
+            camera: If True, the color image is prefetched.
+            depth: If True, the depth image is prefetched.
+            lidar: If True, the lidar samples are prefetched.
+            physics: If True, the linear acceleration and angular velocity are
+                prefetched.
+            controller: If True, the controller state is prefetched.
+
+        Note:
+            As soon as unity_start or unity_update arrives, the declared sensors (and
+            any others read during the previous frame) are requested in a single
+            snapshot, which a background thread receives into the module caches while
+            start or update runs.  The program only waits if it reads a sensor, or
+            makes another request, before the snapshot has arrived.  The time saved
+            is reported by get_prefetch_timing().
+
+            Prefetching takes snapshots, so declaring any sensor enables snapshot mode
+            (see set_snapshot_mode).  Sensors read from shared memory are never
+            prefetched, since reading them does not wait on RacecarSim, and a
+            warning is printed on connecting if no declared sensor can be
+            prefetched.  When start or update is a coroutine function, the color
+            image, depth image, and lidar samples are instead fetched through the
+            asyncio transport, and are not timed.
+
+        Example::
+
+            # Receive the IMU and controller state while update starts running (and,
+            # without shared memory, the color image and lidar scan as well)
+            rc.set_prefetch(camera=True, lidar=True, physics=True, controller=True)
+        """
+        self.__prefetch_sensors = self.Snapshot(0)
+        if camera:
+            self.__prefetch_sensors |= self.Snapshot.color
+        if depth:
+            self.__prefetch_sensors |= self.Snapshot.depth
+        if lidar:
+            self.__prefetch_sensors |= self.Snapshot.lidar
+        if physics:
+            self.__prefetch_sensors |= self.Snapshot.physics
+        if controller:
+            self.__prefetch_sensors |= self.Snapshot.controller
+        if self.__prefetch_sensors:
+            self.set_snapshot_mode(True)
+
+    def get_prefetch_timing(self) -> PrefetchTiming:
+        """
+        Returns the average time per frame spent prefetching sensor data, and the
+        time saved by overlapping it with the program (see set_prefetch).
+        """
+        frames = max(self.__prefetch_frames, 1)
+        fetch_time = self.__prefetch_fetch_total / frames
+        wait_time = self.__prefetch_wait_total / frames
+        return PrefetchTiming(
+            self.__prefetch_frames, fetch_time, wait_time, fetch_time - wait_time
+        )
+
+    def __get_prefetchable(self, sensors: Snapshot) -> Snapshot:
+        """
+        Returns the sensors which can be prefetched out of the given sensors.
+        """
+        if not self.__snapshot_enabled or self.__version < self.__SNAPSHOT_VERSION:
+            return self.Snapshot(0)
+        if self.__shared_memory is not None:
+            sensors &= ~(
+                self.Snapshot.color | self.Snapshot.depth | self.Snapshot.lidar
+            )
+        return sensors
+
+    def __check_prefetch(self) -> None:
+        """
+        Warns once connected if sensors were declared with set_prefetch, but none of
+        them can be prefetched.
+        """
+        if self.__prefetch_sensors and not self.__get_prefetchable(
+            self.__prefetch_sensors
+        ):
+            rc_utils.print_warning(
+                ">> None of the sensors declared with set_prefetch can be prefetched, "
+                "since snapshot mode is disabled, RacecarSim does not support "
+                "snapshots (see set_protocol_negotiation), or the sensors are read "
+                "from shared memory."
+            )
+
+    def __start_prefetch(self) -> None:
+        """
+        Requests this frame's snapshot on the prefetch thread.
+        """
+        sensors = self.__get_prefetchable(
+            self.__prefetch_sensors | self.__snapshot_subscriptions
+        )
+        if not sensors:
+            return
+
+        if self.__prefetch_thread is None:
+            self.__prefetch_thread = threading.Thread(
+                target=self.__run_prefetch, daemon=True
+            )
+            self.__prefetch_thread.start()
+
+        # Later sensor reads this frame are served by the prefetched snapshot
+        self.__snapshot_taken = True
+        self.__snapshot_sensors = sensors
+        self.__prefetch_done.clear()
+        self.__prefetch_pending = True
+        self.__prefetch_start = time.perf_counter()
+        self.__prefetch_requests.put(sensors)
+
+    def __run_prefetch(self) -> None:
+        while True:
+            sensors = self.__prefetch_requests.get()
+            try:
+                self.__request_snapshot(sensors)
+            except BaseException as exception:
+                self.__prefetch_error = exception
+            self.__prefetch_end = time.perf_counter()
+            self.__prefetch_done.set()
+
+    def __wait_for_prefetch(self) -> None:
+        """
+        Blocks until the prefetch thread has received this frame's snapshot.
+        """
+        if not self.__prefetch_pending:
+            return
+
+        wait_start = time.perf_counter()
+        self.__prefetch_done.wait()
+        self.__prefetch_pending = False
+        self.__prefetch_frames += 1
+        self.__prefetch_wait_total += time.perf_counter() - wait_start
+        self.__prefetch_fetch_total += self.__prefetch_end - self.__prefetch_start
+
+        if self.__prefetch_error is not None:
+            error, self.__prefetch_error = self.__prefetch_error, None
+            raise error
+
+    def __start_prefetch_async(self) -> None:
+        """
+        Starts fetching the declared sensors through the asyncio transport, which
+        start or update then await along with any other reads of this frame.
+        """
+        if self.__prefetch_sensors & self.Snapshot.color:
+            self.__prefetch_tasks.append(
+                asyncio.ensure_future(self.camera.fetch_color_image_no_copy())
+            )
+        if self.__prefetch_sensors & self.Snapshot.depth:
+            self.__prefetch_tasks.append(
+                asyncio.ensure_future(self.camera.fetch_depth_image_native())
+            )
+        if self.__prefetch_sensors & self.Snapshot.lidar:
+            self.__prefetch_tasks.append(
+                asyncio.ensure_future(self.lidar.fetch_samples())
+            )
+
+    async def __finish_prefetch_async(self) -> None:
+        """
+        Waits for prefetches which start or update did not await, since their
+        replies must be received before python_finished is sent.
+        """
+        if self.__prefetch_tasks:
+            await asyncio.gather(*self.__prefetch_tasks)
+            self.__prefetch_tasks.clear()
+
+    def start_logging(self, path: str, chunk_frames: int = 600) -> SensorLogWriter:
+        """
+        Begins recording the sensor data of every frame to a log (see SensorLogWriter).
+
+        Args:
+            path: The directory in which to write the log.
+            chunk_frames: The number of frames in each chunk file of the log.
+
+        Returns:
+            The log writer, whose frames_written and frames_dropped counters report
+            whether the disk is keeping up.
+
+        Note:
+            Only the sensors which the program read during a frame are logged for that
+            frame, so logging never requests sensor data of its own.  Sensors which
+            were not read are left out of the frame, and replay as zeros.
+        """
+        self.stop_logging()
+        self.__sensor_log = SensorLogWriter(path, chunk_frames)
+        return self.__sensor_log
+
+    def stop_logging(self) -> None:
+        """
+        Finishes writing the sensor log, if logging was started.
+        """
+        if self.__sensor_log is not None:
+            self.__sensor_log.close()
+            rc_utils.print_colored(
+                f">> Logged {self.__sensor_log.frames_written} frames to "
+                f"[{self.__sensor_log.path}] ({self.__sensor_log.frames_dropped} "
+                "dropped).",
+                rc_utils.TerminalColor.green,
+            )
+            self.__sensor_log = None
+
+    def __get_shared_frame(self) -> Optional[shared_memory_sim.SharedFrame]:
+        """
+        Returns this frame's sensor data from shared memory, or None if the calling
+        module must request its sensor over UDP.
+        """
+        if self.__shared_frame is None and self.__shared_memory is not None:
+            self.__shared_frame = self.__shared_memory.read()
+        return self.__shared_frame
+
+    def __fetch_snapshot(self, sensor: Snapshot) -> bool:
+        """
+        Fills the module caches for this frame with a single snapshot request.
+
+        Args:
+            sensor: The sensor which the calling module needs.
+
+        Returns:
+            True if this frame's snapshot included the requested sensor, in which
+            case the module has already loaded it; False if the module must request
+            the sensor on its own.
+        """
+        if not self.__snapshot_enabled or self.__version < self.__SNAPSHOT_VERSION:
+            return False
+
+        self.__wait_for_prefetch()
+        self.__snapshot_used |= sensor
+        if not self.__snapshot_taken:
+            self.__snapshot_taken = True
+            self.__snapshot_sensors = self.__snapshot_subscriptions | sensor
+            self.__request_snapshot(self.__snapshot_sensors)
+
+        return self.__snapshot_sensors & sensor == sensor
+
+    def __has_snapshot(self, sensor: Snapshot) -> bool:
+        """
+        Returns whether this frame's snapshot has already loaded the sensor, without
+        requesting a snapshot.
+        """
+        return self.__snapshot_taken and self.__snapshot_sensors & sensor == sensor
+
+    def __request_snapshot(
+        self, sensors: Snapshot, buffer: Optional[memoryview] = None
+    ) -> None:
+        """
+        Requests a snapshot of the given sensors and loads it into the module caches.
+
+        Args:
+            sensors: The sensors to request.
+            buffer: The buffer to receive the snapshot into, which must be large
+                enough to hold it.  If None, the snapshot is received into the
+                persistent snapshot buffer.
+        """
+        suffix, color_reduction = self.__get_color_request_suffix()
+        self.__send_fragmented_request(
+            struct.pack("BB", self.Header.racecar_get_snapshot.value, sensors.value)
+            + suffix
+        )
+        total_bytes, num_fragments = struct.unpack("<IH", self.__receive_data(6))
+
+        if buffer is None:
+            if len(self.__snapshot_buffer) < total_bytes:
+                self.__snapshot_buffer = bytearray(total_bytes)
+            buffer = self.__snapshot_buffer
+
+        view = memoryview(buffer)[:total_bytes]
+        self.__receive_fragmented(view, num_fragments)
+
+        [self.__delta_time] = struct.unpack_from("<f", view)
+        offset = 4
+
+        if sensors & self.Snapshot.color:
+            offset = self.camera._CameraSim__load_color_image(
+                view, offset, color_reduction
+            )
+        if sensors & self.Snapshot.depth:
+            offset = self.camera._CameraSim__load_depth_image(view, offset)
+        if sensors & self.Snapshot.lidar:
+            offset = self.lidar._LidarSim__load_samples(view, offset)
+        if sensors & self.Snapshot.physics:
+            offset = self.physics._PhysicsSim__load_imu(view, offset)
+        if sensors & self.Snapshot.controller:
+            offset = self.controller._ControllerSim__load_state(view, offset)
 
     def __handle_update(self) -> None:
         self.__update()
 
+        if self.__scheduler:
+            self.__scheduler.run(self.get_delta_time())
+        self.frame_budget.run_deferred()
+        self.__print_protocol_summary()
+
+        self.__end_frame()
+
+    def __end_frame(self) -> None:
+        """
+        Invalidates the per-frame caches once start or update has finished.
+        """
+        # The prefetch thread may still be loading the module caches
+        self.__wait_for_prefetch()
+
+        if self.__sensor_log is not None:
+            # Log only what the program fetched, so logging sends no extra requests
+            color, depth = self.camera._CameraSim__get_fetched()
+            self.__log_task(
+                self.__sensor_log,
+                self.clock.now(),
+                self.get_delta_time(),
+                color,
+                depth,
+                self.lidar._LidarSim__get_fetched(),
+                self.physics._PhysicsSim__get_fetched(),
+                self.controller._ControllerSim__get_fetched(),
+                self.drive._DriveSim__speed_angle,
+            )
+
+        if self.__is_sim_time_tracked:
+            self.__sim_time += self.get_delta_time()
+
         self.__delta_time = -1
-        if self.__update_slow is not None:
-            self.__update_slow_counter -= self.get_delta_time()
-            if self.__update_slow_counter < 0:
-                self.__update_slow()
-                self.__update_slow_counter = self.__update_slow_time
+        self.__snapshot_subscriptions = self.__snapshot_used
+        self.__snapshot_used = self.Snapshot(0)
+        self.__snapshot_taken = False
+        self.__shared_frame = None
 
         self.camera._CameraSim__update()
         self.controller._ControllerSim__update()
         self.lidar._LidarSim__update()
+        self.physics._PhysicsSim__update()
 
     def __handle_sigint(self, signal_received: int, frame) -> None:
         # Send exit command to sync port if we are in the middle of servicing a start
@@ -241,6 +1396,7 @@ class RacecarSim(Racecar):
             f">> CTRL-C (SIGINT) detected. Sending exit command to Unity ({label})..."
         )
         self.__send_header(self.Header.python_exit, is_async)
+        self.stop_logging()
 
         print(">> Closing script...")
         exit(0)
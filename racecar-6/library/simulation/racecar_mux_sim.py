@@ -0,0 +1,162 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Drives several RacecarSim cars from a single Python process.
+"""
+
+import concurrent.futures
+import inspect
+import selectors
+from signal import signal, SIGINT
+from typing import Callable, List, Optional
+
+import clock
+from racecar_core_sim import RacecarSim
+import racecar_utils as rc_utils
+
+
+class RacecarMux:
+    """
+    Drives several RacecarSim connections through one event loop.
+
+    Each car is a RacecarSim with its own start and update functions, and is
+    assigned its own car by RacecarSim in the handshake (since each RacecarSim has
+    its own socket).  Once every car is connected, the mux waits on all of their
+    sockets at once and runs the start or update function of whichever car RacecarSim
+    has sent a command to, so one car's frame never waits for another car's.
+
+    Start and update functions run one at a time on the thread which called go, and
+    while they run, their car's clock is the current clock (see clock.get_current).
+    Perception work may be handed to the worker pool shared by every car, so that
+    cars can share results (and the cost of computing them).
+
+    Args:
+        max_workers: The number of threads in the shared worker pool, or None to use
+            the concurrent.futures default.
+
+    Note:
+        Coroutine start and update functions are not supported, since each car's
+        sensor requests are made synchronously on its own socket.
+
+    Example::
+
+        mux = RacecarMux(max_workers=4)
+
+        fast = RacecarSim(True)
+        fast.set_start_update(fast_start, fast_update)
+        mux.add_car(fast)
+
+        slow = RacecarSim(True)
+        slow.set_start_update(slow_start, slow_update)
+        mux.add_car(slow)
+
+        # In fast_update, find the line on the worker pool while reading the lidar
+        future = mux.submit(find_line, fast.camera.get_color_image_no_copy())
+        samples = fast.lidar.get_samples()
+        line = future.result()
+
+        mux.go()
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self.__cars: List[RacecarSim] = []
+        self.__pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix="racecar_mux"
+        )
+        self.__selector = selectors.DefaultSelector()
+
+        # The car whose start or update function is running, if any
+        self.__current: Optional[RacecarSim] = None
+
+    def add_car(self, racecar: RacecarSim) -> None:
+        """
+        Adds a car, whose start and update functions must already be set, to be
+        connected and driven by go.
+        """
+        self.__cars.append(racecar)
+
+    def get_cars(self) -> List[RacecarSim]:
+        """
+        Returns every car which has been added, in the order they were added.
+        """
+        return list(self.__cars)
+
+    def submit(self, function: Callable, *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Runs a function on the shared worker pool, and returns the Future of its
+        result.
+        """
+        return self.__pool.submit(function, *args, **kwargs)
+
+    def get_pool(self) -> concurrent.futures.ThreadPoolExecutor:
+        """
+        Returns the worker pool shared by every car.
+        """
+        return self.__pool
+
+    def go(self) -> None:
+        """
+        Connects every car to RacecarSim, then responds to start and update commands
+        for each of them until every car has received an exit command.
+        """
+        for racecar in self.__cars:
+            if any(
+                inspect.iscoroutinefunction(function)
+                for function in (
+                    racecar._RacecarSim__start,
+                    racecar._RacecarSim__update,
+                    racecar._RacecarSim__update_slow,
+                )
+            ):
+                raise ValueError(
+                    "RacecarMux does not support coroutine start or update functions"
+                )
+
+        # Each RacecarSim handles CTRL-C for itself, so replace its handler with one
+        # which tells RacecarSim that every car is exiting
+        signal(SIGINT, self.__handle_sigint)
+
+        print(
+            f">> Python script loaded with {len(self.__cars)} cars, awaiting connection from RacecarSim."
+        )
+        for racecar in self.__cars:
+            if not racecar._RacecarSim__connect():
+                return
+            self.__selector.register(
+                racecar._RacecarSim__socket, selectors.EVENT_READ, racecar
+            )
+
+        try:
+            while self.__selector.get_map():
+                for key, _ in self.__selector.select():
+                    racecar = key.data
+                    data = racecar._RacecarSim__receive_command()
+                    self.__current = racecar
+                    clock.set_current(racecar.clock)
+                    keep_going = racecar._RacecarSim__handle_command(data)
+                    self.__current = None
+                    if not keep_going:
+                        self.__selector.unregister(key.fileobj)
+                        racecar.stop_logging()
+                        racecar._RacecarSim__close_shared_memory()
+        finally:
+            # Cars which were still running when the loop was interrupted
+            for racecar in self.__cars:
+                racecar._RacecarSim__close_shared_memory()
+            self.__pool.shutdown(wait=False)
+
+    def __handle_sigint(self, signal_received: int, frame) -> None:
+        rc_utils.print_warning(
+            ">> CTRL-C (SIGINT) detected. Sending exit command to Unity for every car..."
+        )
+
+        # Only the car whose function is running is waiting on the sync port
+        for racecar in self.__cars:
+            is_async = racecar is not self.__current
+            racecar._RacecarSim__send_header(RacecarSim.Header.python_exit, is_async)
+            racecar.stop_logging()
+
+        print(">> Closing script...")
+        exit(0)
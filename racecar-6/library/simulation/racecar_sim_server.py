@@ -0,0 +1,943 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+A Python stand-in for RacecarSim which speaks its UDP protocol, so that racecar_core
+programs can be run, tested, and benchmarked without Unity.
+
+Start the server, then run a program in simulation mode as usual:
+    python3 racecar_sim_server.py [--tick-rate 60] [--frames N] [--recording log.npz]
+                                  [--fixed-step 0.0167]
+    python3 grand_prix.py -s -h
+"""
+
+import argparse
+import collections
+import math
+import os
+import queue
+import random
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+from nptyping import NDArray
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from controller import Controller
+from racecar_core_sim import RacecarSim
+from shared_memory_sim import SensorRing
+
+Header = RacecarSim.Header
+Error = RacecarSim.Error
+Snapshot = RacecarSim.Snapshot
+
+
+class SensorFrame(NamedTuple):
+    """
+    The sensor data served to a car during one frame.
+    """
+
+    # The RGBA color image, as sent by RacecarSim
+    color: memoryview
+    # The low resolution depth image (in cm), which RacecarSim sends at 80x60
+    depth: NDArray[(60, 80), np.float32]
+    # The lidar samples (in cm), clockwise from the front of the car
+    lidar: NDArray[720, np.float32]
+    linear_acceleration: Tuple[float, float, float]
+    angular_velocity: Tuple[float, float, float]
+
+
+class SyntheticSensors:
+    """
+    Generates the sensor data of a car driving down a straight hallway.
+
+    The hallway has a colored line down its center, and the car's position, heading,
+    and IMU readings follow the drive commands which it receives.
+    """
+
+    __WIDTH = 640
+    __HEIGHT = 480
+    __DEPTH_WIDTH = 80
+    __DEPTH_HEIGHT = 60
+    __NUM_SAMPLES = 720
+
+    # The distance (in cm) from the center of the hallway to each wall
+    __HALF_WIDTH = 100.0
+
+    # The top speed (in cm/s), the maximum steering angle (in radians), and the
+    # distance (in cm) between the axles of the car
+    __TOP_SPEED = 400.0
+    __MAX_STEERING = math.radians(20)
+    __WHEELBASE = 32.0
+
+    def __init__(self) -> None:
+        # The color image is a gray floor below a white wall, with an orange line
+        # down the center of the floor
+        color = np.full((self.__HEIGHT, self.__WIDTH, 4), 255, np.uint8)
+        color[self.__HEIGHT // 2 :, :, :3] = 90
+        center = self.__WIDTH // 2
+        color[self.__HEIGHT // 2 :, center - 20 : center + 20, :3] = (255, 128, 0)
+        self.__color = memoryview(color.tobytes())
+
+        # The floor grows closer toward the bottom of the depth image
+        rows = np.linspace(1000, 20, self.__DEPTH_HEIGHT, dtype=np.float32)
+        self.__depth = np.repeat(rows[:, np.newaxis], self.__DEPTH_WIDTH, axis=1)
+
+        self.__angles = np.radians(np.arange(self.__NUM_SAMPLES) / 2)
+        self.__offset = 0.0
+        self.__heading = 0.0
+        self.__velocity = 0.0
+
+    def read(self, delta_time: float, speed: float, angle: float) -> SensorFrame:
+        """
+        Advances the car by one frame and returns its sensor data.
+
+        Args:
+            delta_time: The number of seconds elapsed since the previous frame.
+            speed: The speed most recently set by the car, scaled by its max speed.
+            angle: The angle most recently set by the car.
+        """
+        velocity = speed * self.__TOP_SPEED
+        yaw_rate = velocity * math.tan(angle * self.__MAX_STEERING) / self.__WHEELBASE
+        acceleration = (velocity - self.__velocity) / delta_time if delta_time else 0
+        self.__velocity = velocity
+
+        # Positive headings and offsets are toward the right wall, which stops the car
+        self.__heading += yaw_rate * delta_time
+        self.__offset += velocity * math.sin(self.__heading) * delta_time
+        self.__offset = max(-self.__HALF_WIDTH, min(self.__offset, self.__HALF_WIDTH))
+
+        # Cast each lidar ray to whichever wall it is facing
+        sines = np.sin(self.__angles + self.__heading)
+        with np.errstate(divide="ignore"):
+            lidar = np.where(
+                sines > 0,
+                (self.__HALF_WIDTH - self.__offset) / sines,
+                (self.__HALF_WIDTH + self.__offset) / -sines,
+            )
+        lidar = np.minimum(lidar, 1000).astype(np.float32)
+
+        return SensorFrame(
+            self.__color,
+            self.__depth,
+            lidar,
+            (0.0, 0.0, acceleration / 100),
+            (0.0, yaw_rate, 0.0),
+        )
+
+
+class RecordedSensors:
+    """
+    Replays recorded sensor data in a loop, ignoring drive commands.
+
+    Args:
+        path: An .npz file containing any of the arrays color (N x 480 x 640 x 3 BGR
+            images, as returned by get_color_image), depth (N x height x width, in
+            cm), lidar (N x 720), linear_acceleration (N x 3), and angular_velocity
+            (N x 3).  Sensors missing from the recording are synthesized.
+    """
+
+    __DEPTH_WIDTH = 80
+    __DEPTH_HEIGHT = 60
+
+    def __init__(self, path: str) -> None:
+        recording = np.load(path)
+        self.__synthetic = SyntheticSensors()
+        self.__frame = 0
+
+        self.__color: List[memoryview] = []
+        if "color" in recording:
+            for image in recording["color"]:
+                rgba = cv.cvtColor(image, cv.COLOR_BGR2RGBA)
+                self.__color.append(memoryview(rgba.tobytes()))
+
+        # RacecarSim only sends low resolution depth images
+        self.__depth: List[NDArray] = []
+        if "depth" in recording:
+            for image in recording["depth"].astype(np.float32):
+                self.__depth.append(
+                    cv.resize(
+                        image,
+                        (self.__DEPTH_WIDTH, self.__DEPTH_HEIGHT),
+                        interpolation=cv.INTER_AREA,
+                    )
+                )
+
+        def load(name: str) -> Optional[np.ndarray]:
+            return recording[name].astype(np.float32) if name in recording else None
+
+        self.__lidar = load("lidar")
+        self.__linear_acceleration = load("linear_acceleration")
+        self.__angular_velocity = load("angular_velocity")
+
+    def read(self, delta_time: float, speed: float, angle: float) -> SensorFrame:
+        """
+        Returns the next recorded frame, starting over after the last one.
+        """
+        synthetic = self.__synthetic.read(delta_time, speed, angle)
+        frame = self.__frame
+        self.__frame += 1
+
+        def select_frame(frames, default):
+            if frames is None or len(frames) == 0:
+                return default
+            return frames[frame % len(frames)]
+
+        return SensorFrame(
+            select_frame(self.__color, synthetic.color),
+            select_frame(self.__depth, synthetic.depth),
+            select_frame(self.__lidar, synthetic.lidar),
+            tuple(
+                select_frame(self.__linear_acceleration, synthetic.linear_acceleration)
+            ),
+            tuple(select_frame(self.__angular_velocity, synthetic.angular_velocity)),
+        )
+
+
+class _Car:
+    """
+    The state of one connected Python script.
+    """
+
+    def __init__(self, index: int, version: int, sensors) -> None:
+        self.index = index
+        self.version = version
+        self.sensors = sensors
+        self.started = False
+        self.frame_start = 0.0
+        self.delta_time = 0.0
+        self.frame: Optional[SensorFrame] = None
+        self.speed = 0.0
+        self.angle = 0.0
+        self.max_speed = 0.25
+        self.payload = bytearray()
+
+        # The sensor ring which the car reads, and the BGR image staged for it
+        self.ring: Optional[SensorRing] = None
+        self.color_image: Optional[NDArray[(480, 640, 3), np.uint8]] = None
+
+
+class RacecarSimServer:
+    """
+    Serves the RacecarSim protocol on the ports used by RacecarSim.
+
+    Each connected script is assigned a car, which is started immediately and then
+    sent an update every tick, as if the user had entered user program mode.
+
+    Args:
+        max_version: The newest protocol version to accept in the handshake.
+        drop_rate: The probability of dropping each outgoing fragment, used to
+            simulate a lossy link (only the windowed protocol recovers from this).
+        duplicate_rate: The probability of sending each fragment of a windowed
+            transfer again once the transfer is complete, used to simulate a
+            resent fragment which arrives after the client stopped waiting for it.
+        tick_rate: The number of frames per second, or 0 to begin each frame as soon
+            as every car has finished the previous one.
+        auto_start: If False, cars are never started and only sensor requests are
+            served, as if the user never entered user program mode.
+        max_frames: If provided, every car is sent unity_exit after this many frames.
+        latency: The number of seconds by which every outgoing datagram is delayed,
+            to simulate RacecarSim running on another machine.
+        recording: An .npz file of sensor data to serve (see RecordedSensors); if
+            not provided, the data is synthesized (see SyntheticSensors).
+        shared_memory: If True, cars which ask for it are also sent their color image,
+            depth image, and lidar samples through a sensor ring in shared memory.
+        fixed_step: If provided, every frame after the first advances the simulation
+            by this many seconds, however long it takes, so that runs are repeatable.
+            With a tick_rate of 0, the simulation runs in lockstep with the program,
+            as fast as the program can run.
+        port: The port on which the sync requests of each car are served.
+        async_port: The port on which the async requests of each car are served.
+
+    Note:
+        Only one of RacecarSim and RacecarSimServer can run at a time, since they
+        listen on the same ports.  Servers listening on other ports can only be
+        reached by scripts which send to those ports instead.
+
+    Example::
+
+        server = RacecarSimServer(tick_rate=0, max_frames=1000)
+        server.start()
+
+        # Run a program in simulation mode, then wait for it to finish
+        program = subprocess.Popen(["python3", "grand_prix.py", "-s", "-h"])
+        server.wait()
+        server.stop()
+    """
+
+    # These must match the ports used by RacecarSim
+    __IP = "127.0.0.1"
+    __PORT = 5065
+    __ASYNC_PORT = 5064
+
+    __MIN_VERSION = 1
+    __MAX_VERSION = 5
+    __SNAPSHOT_VERSION = 2
+    __WINDOWED_VERSION = 3
+    __SHARED_MEMORY_VERSION = 4
+    __COLOR_SCALE_VERSION = 5
+
+    # Seconds to wait for an acknowledgement before abandoning a transfer
+    __ACK_TIMEOUT = 1.0
+
+    # Seconds between checks for whether the server has been stopped
+    __POLL_TIME = 0.1
+
+    # The size of each color image fragment, and the largest snapshot fragment
+    __NUM_COLOR_FRAGMENTS = 32
+    __SNAPSHOT_FRAGMENT_SIZE = 38400
+
+    # The size of the sensor data which a sensor ring can hold
+    __WIDTH = 640
+    __HEIGHT = 480
+    __MAX_DEPTH_WIDTH = 80
+    __MAX_DEPTH_HEIGHT = 60
+    __NUM_SAMPLES = 720
+
+    def __init__(
+        self,
+        max_version: int = __MAX_VERSION,
+        drop_rate: float = 0.0,
+        duplicate_rate: float = 0.0,
+        tick_rate: float = 60.0,
+        auto_start: bool = True,
+        max_frames: Optional[int] = None,
+        recording: Optional[str] = None,
+        latency: float = 0.0,
+        shared_memory: bool = True,
+        fixed_step: Optional[float] = None,
+        port: int = __PORT,
+        async_port: int = __ASYNC_PORT,
+    ) -> None:
+        self.__max_version = max_version
+        self.__drop_rate = drop_rate
+        self.__duplicate_rate = duplicate_rate
+        self.__tick_rate = tick_rate
+        self.__auto_start = auto_start
+        self.__max_frames = max_frames
+        self.__recording = recording
+        self.__latency = latency
+        self.__shared_memory = shared_memory
+        self.__fixed_step = fixed_step
+        self.__random = random.Random(0)
+
+        # The connected cars, by the address of their script
+        self.__cars: Dict[Tuple[str, int], _Car] = {}
+        self.__num_cars = 0
+
+        # The controller state shared by every car: bitmasks of the buttons which are
+        # down, were pressed this frame, and were released this frame, followed by
+        # the trigger and joystick values.  Button changes are staged until the next
+        # frame begins, so that they are consistent throughout a frame.
+        self.__buttons_down = 0
+        self.__buttons_pressed = 0
+        self.__buttons_released = 0
+        self.__next_buttons_down = 0
+        self.__next_buttons_pressed = 0
+        self.__next_buttons_released = 0
+        self.__triggers = [0.0, 0.0]
+        self.__joysticks = [0.0, 0.0, 0.0, 0.0]
+
+        # Transfer statistics
+        self.fragments_sent = 0
+        self.fragments_resent = 0
+        self.fragments_dropped = 0
+        self.fragments_duplicated = 0
+
+        # Frame statistics: the number of completed frames, and the seconds between
+        # sending each frame and every car reporting python_finished
+        self.frames = 0
+        self.frame_times: List[float] = []
+
+        self.__socket = self.__bind(port)
+        self.__async_socket = self.__bind(async_port)
+
+        # Packets which arrived from another car during a fragmented transfer
+        self.__deferred: Dict[socket.socket, Deque] = {
+            self.__socket: collections.deque(),
+            self.__async_socket: collections.deque(),
+        }
+
+        self.__threads: List[threading.Thread] = []
+        self.__running = False
+        self.__finished = threading.Event()
+
+        # Delayed datagrams, as (send time, socket, data, address), in send order
+        self.__outgoing: queue.Queue = queue.Queue()
+
+    def start(self) -> None:
+        """
+        Begins serving requests and sending frames on background threads.
+        """
+        self.__running = True
+        sync_target = self.__run_frames if self.__auto_start else self.__serve
+        for target, sock in (
+            (sync_target, self.__socket),
+            (self.__serve, self.__async_socket),
+        ):
+            thread = threading.Thread(target=target, args=(sock,), daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+        if self.__latency > 0:
+            thread = threading.Thread(target=self.__send_delayed, daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+
+    def stop(self) -> None:
+        """
+        Stops serving requests and releases the ports.
+        """
+        self.__running = False
+        self.__outgoing.put(None)
+        for thread in self.__threads:
+            thread.join()
+        self.__threads.clear()
+        for sock in (self.__socket, self.__async_socket):
+            sock.close()
+        for car in list(self.__cars.values()):
+            self.__close_ring(car)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until max_frames frames have been sent.
+
+        Returns:
+            True if every frame was sent before the timeout.
+        """
+        return self.__finished.wait(timeout)
+
+    def get_drive(self, car_index: int = 0) -> Tuple[float, float, float]:
+        """
+        Returns the speed, angle, and max speed most recently set by a car.
+        """
+        for car in list(self.__cars.values()):
+            if car.index == car_index:
+                return car.speed, car.angle, car.max_speed
+        raise KeyError(f"car [{car_index}] is not connected")
+
+    def press(self, button: Controller.Button) -> None:
+        """
+        Presses a controller button, starting in the next frame.
+        """
+        self.__next_buttons_down |= 1 << button
+        self.__next_buttons_pressed |= 1 << button
+
+    def release(self, button: Controller.Button) -> None:
+        """
+        Releases a controller button, starting in the next frame.
+        """
+        self.__next_buttons_down &= ~(1 << button)
+        self.__next_buttons_released |= 1 << button
+
+    def set_trigger(self, trigger: Controller.Trigger, value: float) -> None:
+        self.__triggers[trigger] = value
+
+    def set_joystick(self, joystick: Controller.Joystick, x: float, y: float) -> None:
+        self.__joysticks[2 * joystick : 2 * joystick + 2] = [x, y]
+
+    def __bind(self, port: int) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.__IP, port))
+        return sock
+
+    def __send(self, sock: socket.socket, data, address: Tuple[str, int]) -> None:
+        if self.__latency > 0:
+            # Copy the data, since fragments are views into buffers which are reused
+            deadline = time.perf_counter() + self.__latency
+            self.__outgoing.put((deadline, sock, bytes(data), address))
+        else:
+            sock.sendto(data, address)
+
+    def __send_delayed(self) -> None:
+        """
+        Sends each delayed datagram once its latency has elapsed.
+        """
+        while True:
+            item = self.__outgoing.get()
+            if item is None:
+                return
+            deadline, sock, data, address = item
+            time.sleep(max(0, deadline - time.perf_counter()))
+            sock.sendto(data, address)
+
+    def __receive_request(
+        self, sock: socket.socket
+    ) -> Optional[Tuple[bytes, Tuple[str, int]]]:
+        """
+        Returns the next request, or None if none arrived before the poll time.
+        """
+        if self.__deferred[sock]:
+            return self.__deferred[sock].popleft()
+
+        # Wake up periodically to check whether stop() was called
+        ready = select.select([sock], [], [], self.__POLL_TIME)
+        if ready[0]:
+            return sock.recvfrom(65507)
+        return None
+
+    def __serve(self, sock: socket.socket) -> None:
+        while self.__running:
+            request = self.__receive_request(sock)
+            if request is not None:
+                self.__handle_request(sock, request[1], request[0])
+
+    def __run_frames(self, sock: socket.socket) -> None:
+        """
+        Starts each newly connected car, then sends every car an update each tick and
+        serves its requests until it reports python_finished.
+        """
+        next_frame = time.perf_counter()
+        while self.__running:
+            cars = list(self.__cars.items())
+            if not cars or self.__finished.is_set():
+                request = self.__receive_request(sock)
+                if request is not None:
+                    self.__handle_request(sock, request[1], request[0])
+                next_frame = time.perf_counter()
+                continue
+
+            self.__buttons_down = self.__next_buttons_down
+            self.__buttons_pressed = self.__next_buttons_pressed
+            self.__buttons_released = self.__next_buttons_released
+            self.__next_buttons_pressed = 0
+            self.__next_buttons_released = 0
+
+            frame_start = time.perf_counter()
+            for address, car in cars:
+                self.__begin_frame(car, frame_start)
+                header = Header.unity_update if car.started else Header.unity_start
+                car.started = True
+                self.__send(sock, struct.pack("B", header), address)
+
+            waiting = set(address for address, _ in cars)
+            while waiting and self.__running:
+                request = self.__receive_request(sock)
+                if request is None:
+                    continue
+                data, address = request
+                header = self.__handle_request(sock, address, data)
+                if header in (Header.python_finished, Header.python_exit, Header.error):
+                    waiting.discard(address)
+
+            self.frames += 1
+            self.frame_times.append(time.perf_counter() - frame_start)
+            if self.__max_frames is not None and self.frames >= self.__max_frames:
+                for address, _ in cars:
+                    self.__send(sock, struct.pack("B", Header.unity_exit), address)
+                self.__finished.set()
+
+            # Wait for the next tick without trying to catch up on missed ones
+            if self.__tick_rate > 0:
+                next_frame = max(next_frame + 1 / self.__tick_rate, frame_start)
+                time.sleep(max(0, next_frame - time.perf_counter()))
+
+    def __begin_frame(self, car: _Car, frame_start: float) -> None:
+        if not car.started:
+            car.delta_time = 0.0
+        elif self.__fixed_step is not None:
+            car.delta_time = self.__fixed_step
+        else:
+            car.delta_time = frame_start - car.frame_start
+        car.frame_start = frame_start
+        car.frame = car.sensors.read(
+            car.delta_time, car.speed * car.max_speed, car.angle
+        )
+        if car.ring is not None:
+            # The ring holds BGR images, so that the car can use them without a copy
+            color = np.frombuffer(car.frame.color, np.uint8).reshape(
+                (self.__HEIGHT, self.__WIDTH, 4)
+            )
+            cv.cvtColor(color, cv.COLOR_RGBA2BGR, car.color_image)
+            car.ring.write(car.color_image, car.frame.depth, car.frame.lidar)
+
+    def __handle_request(
+        self, sock: socket.socket, address: Tuple[str, int], data: bytes
+    ) -> int:
+        """
+        Responds to a single request, and returns its header.
+        """
+        header = data[0]
+        if header == Header.connect:
+            self.__handle_connect(sock, address, data[1])
+            return header
+
+        car = self.__cars.get(address)
+        if header in (Header.python_exit, Header.error):
+            car = self.__cars.pop(address, None)
+            if car is not None:
+                self.__close_ring(car)
+        elif car is None or header in (
+            Header.python_finished,
+            Header.python_send_next,
+            Header.python_fragment_ack,
+        ):
+            # Acknowledgements which arrive after a transfer are stale
+            pass
+        elif header == Header.drive_set_speed_angle:
+            # DriveSim packs these with native alignment, padding after the header
+            _, car.speed, car.angle = struct.unpack("Bff", data)
+        elif header == Header.drive_stop:
+            car.speed, car.angle = 0.0, 0.0
+        elif header == Header.drive_set_max_speed:
+            _, car.max_speed = struct.unpack("Bf", data)
+        elif header == Header.racecar_get_delta_time:
+            self.__send(sock, struct.pack("f", car.delta_time), address)
+        elif header == Header.camera_get_color_image:
+            reduction = data[1] if car.version >= self.__COLOR_SCALE_VERSION else 1
+            self.__send_fragmented(
+                sock,
+                address,
+                data[1:],
+                self.__get_color(car, reduction),
+                self.__NUM_COLOR_FRAGMENTS,
+            )
+        elif header == Header.camera_get_depth_image:
+            self.__send(sock, self.__get_frame(car).depth.tobytes(), address)
+        elif header == Header.lidar_get_samples:
+            self.__send(sock, self.__get_frame(car).lidar.tobytes(), address)
+        elif header == Header.physics_get_linear_acceleration:
+            frame = self.__get_frame(car)
+            self.__send(sock, struct.pack("fff", *frame.linear_acceleration), address)
+        elif header == Header.physics_get_angular_velocity:
+            frame = self.__get_frame(car)
+            self.__send(sock, struct.pack("fff", *frame.angular_velocity), address)
+        elif header == Header.controller_is_down:
+            self.__send(sock, bytes([self.__buttons_down >> data[1] & 1]), address)
+        elif header == Header.controller_was_pressed:
+            self.__send(sock, bytes([self.__buttons_pressed >> data[1] & 1]), address)
+        elif header == Header.controller_was_released:
+            self.__send(sock, bytes([self.__buttons_released >> data[1] & 1]), address)
+        elif header == Header.controller_get_trigger:
+            self.__send(sock, struct.pack("f", self.__triggers[data[1]]), address)
+        elif header == Header.controller_get_joystick:
+            joystick = self.__joysticks[2 * data[1] : 2 * data[1] + 2]
+            self.__send(sock, struct.pack("ff", *joystick), address)
+        elif header == Header.racecar_get_snapshot and (
+            car.version >= self.__SNAPSHOT_VERSION
+        ):
+            reduction = data[2] if car.version >= self.__COLOR_SCALE_VERSION else 1
+            self.__send_snapshot(
+                sock, address, car, Snapshot(data[1]), reduction, data[2:]
+            )
+        elif header == Header.racecar_open_shared_memory and (
+            car.version >= self.__SHARED_MEMORY_VERSION
+        ):
+            self.__open_ring(sock, address, car)
+        else:
+            self.__send(sock, struct.pack("BB", Header.error, Error.generic), address)
+        return header
+
+    def __handle_connect(
+        self, sock: socket.socket, address: Tuple[str, int], version: int
+    ) -> None:
+        if version > self.__max_version:
+            reply = struct.pack("BB", Header.error, Error.racecarsim_outdated)
+        elif version < self.__MIN_VERSION:
+            reply = struct.pack("BB", Header.error, Error.python_outdated)
+        else:
+            if address not in self.__cars:
+                sensors = (
+                    RecordedSensors(self.__recording)
+                    if self.__recording is not None
+                    else SyntheticSensors()
+                )
+                self.__cars[address] = _Car(self.__num_cars, version, sensors)
+                self.__num_cars += 1
+            self.__cars[address].version = version
+            reply = struct.pack("BB", Header.connect, self.__cars[address].index)
+        self.__send(sock, reply, address)
+
+    def __open_ring(
+        self, sock: socket.socket, address: Tuple[str, int], car: _Car
+    ) -> None:
+        """
+        Replies with whether the car is offered a sensor ring (B), then its path.
+        """
+        if not self.__shared_memory:
+            self.__send(sock, struct.pack("B", 0), address)
+            return
+
+        if car.ring is None:
+            # The ring is opened on the async thread, so assign it last
+            car.color_image = np.empty((self.__HEIGHT, self.__WIDTH, 3), np.uint8)
+            car.ring = SensorRing.create(
+                f"racecar_sim_{os.getpid()}_{car.index}",
+                self.__WIDTH,
+                self.__HEIGHT,
+                self.__MAX_DEPTH_WIDTH,
+                self.__MAX_DEPTH_HEIGHT,
+                self.__NUM_SAMPLES,
+            )
+        self.__send(sock, struct.pack("B", 1) + car.ring.path.encode(), address)
+
+    def __close_ring(self, car: _Car) -> None:
+        if car.ring is not None:
+            car.ring.unlink()
+            car.ring = None
+
+    def __get_frame(self, car: _Car) -> SensorFrame:
+        # Cars which have not been started are served data without advancing them
+        if car.frame is None:
+            car.frame = car.sensors.read(0.0, 0.0, 0.0)
+        return car.frame
+
+    def __get_color(self, car: _Car, reduction: int) -> memoryview:
+        """
+        Returns the car's RGBA color image with its width and height divided by
+        reduction.
+        """
+        color = self.__get_frame(car).color
+        if reduction == 1:
+            return color
+        image = np.frombuffer(color, np.uint8).reshape((self.__HEIGHT, self.__WIDTH, 4))
+        image = cv.resize(
+            image,
+            (self.__WIDTH // reduction, self.__HEIGHT // reduction),
+            interpolation=cv.INTER_AREA,
+        )
+        return memoryview(image).cast("B")
+
+    def __send_snapshot(
+        self,
+        sock: socket.socket,
+        address: Tuple[str, int],
+        car: _Car,
+        sensors: Snapshot,
+        color_reduction: int,
+        request_suffix: bytes,
+    ) -> None:
+        """
+        Sends the requested sensor sections (see RacecarSim.Snapshot) after a header
+        holding the total size and number of fragments.
+        """
+        frame = self.__get_frame(car)
+        sections = [struct.pack("<f", car.delta_time)]
+        if sensors & Snapshot.color:
+            sections.append(self.__get_color(car, color_reduction))
+        if sensors & Snapshot.depth:
+            sections.append(
+                struct.pack("<HH", frame.depth.shape[1], frame.depth.shape[0])
+            )
+            sections.append(frame.depth.tobytes())
+        if sensors & Snapshot.lidar:
+            sections.append(frame.lidar.tobytes())
+        if sensors & Snapshot.physics:
+            sections.append(
+                struct.pack(
+                    "<ffffff", *frame.linear_acceleration, *frame.angular_velocity
+                )
+            )
+        if sensors & Snapshot.controller:
+            sections.append(
+                struct.pack(
+                    "<BBBffffff",
+                    self.__buttons_down,
+                    self.__buttons_pressed,
+                    self.__buttons_released,
+                    *self.__triggers,
+                    *self.__joysticks,
+                )
+            )
+
+        # Assemble the payload in a persistent buffer to avoid allocating per frame
+        total_bytes = sum(len(section) for section in sections)
+        if len(car.payload) < total_bytes:
+            car.payload = bytearray(total_bytes)
+        offset = 0
+        for section in sections:
+            car.payload[offset : offset + len(section)] = section
+            offset += len(section)
+        payload = memoryview(car.payload)[:total_bytes]
+
+        num_fragments = math.ceil(total_bytes / self.__SNAPSHOT_FRAGMENT_SIZE)
+        self.__send(sock, struct.pack("<IH", total_bytes, num_fragments), address)
+        self.__send_fragmented(sock, address, request_suffix, payload, num_fragments)
+
+    def __send_fragmented(
+        self,
+        sock: socket.socket,
+        address: Tuple[str, int],
+        request_suffix: bytes,
+        payload: memoryview,
+        num_fragments: int,
+    ) -> None:
+        """
+        Sends payload as num_fragments fragments using the negotiated protocol.
+
+        Args:
+            request_suffix: The trailing bytes of the request, which hold the
+                transfer id in the windowed protocol.
+        """
+        fragment_size = math.ceil(len(payload) / num_fragments)
+        if self.__cars[address].version >= self.__WINDOWED_VERSION:
+            self.__send_windowed(
+                sock, address, request_suffix[-1], payload, num_fragments
+            )
+            return
+
+        # Stop-and-wait: each fragment waits for python_send_next
+        for i in range(num_fragments):
+            fragment = payload[i * fragment_size : (i + 1) * fragment_size]
+            if not self.__send_fragment(sock, address, fragment):
+                # A lost fragment cannot be recovered in this protocol
+                return
+            if not self.__receive_ack(sock, address, Header.python_send_next):
+                return
+
+    def __send_windowed(
+        self,
+        sock: socket.socket,
+        address: Tuple[str, int],
+        transfer_id: int,
+        payload: memoryview,
+        num_fragments: int,
+    ) -> None:
+        """
+        Sends payload through a sliding window, resending only the fragments which
+        the client reports as missing.
+        """
+        fragment_size = math.ceil(len(payload) / num_fragments)
+        window = RacecarSim._FRAGMENT_WINDOW
+
+        def send(sequence: int) -> None:
+            start = sequence * fragment_size
+            header = struct.pack(
+                RacecarSim._FRAGMENT_HEADER_FORMAT,
+                Header.unity_fragment,
+                transfer_id,
+                sequence,
+            )
+            self.__send_fragment(
+                sock, address, header + payload[start : start + fragment_size]
+            )
+
+        base = 0
+        next_to_send = 0
+        while base < num_fragments:
+            while next_to_send < min(num_fragments, base + window):
+                send(next_to_send)
+                next_to_send += 1
+
+            ack = self.__receive_ack(sock, address, Header.python_fragment_ack)
+            if ack is None:
+                return
+            ack_id, next_expected = struct.unpack_from("<BH", ack, 1)
+            if ack_id != transfer_id:
+                continue
+
+            base = max(base, next_expected)
+            num_missing = (len(ack) - 4) // 2
+            for sequence in struct.unpack_from(f"<{num_missing}H", ack, 4):
+                if sequence < next_to_send:
+                    self.fragments_resent += 1
+                    send(sequence)
+
+        # The client has every fragment, so these duplicates arrive after the transfer
+        for sequence in range(num_fragments):
+            if self.__random.random() < self.__duplicate_rate:
+                self.fragments_duplicated += 1
+                send(sequence)
+
+    def __send_fragment(
+        self, sock: socket.socket, address: Tuple[str, int], fragment
+    ) -> bool:
+        """
+        Sends one fragment, or drops it with probability drop_rate.
+
+        Returns:
+            True if the fragment was sent.
+        """
+        self.fragments_sent += 1
+        if self.__drop_rate > 0 and self.__random.random() < self.__drop_rate:
+            self.fragments_dropped += 1
+            return False
+        self.__send(sock, fragment, address)
+        return True
+
+    def __receive_ack(
+        self, sock: socket.socket, address: Tuple[str, int], header: Header
+    ) -> Optional[bytes]:
+        """
+        Waits for an acknowledgement with the provided header from address, returning
+        None if the client stops responding.  Requests which arrive in the meantime,
+        including pipelined requests from the same car, are deferred until the
+        transfer is complete.
+        """
+        sock.settimeout(self.__ACK_TIMEOUT)
+        try:
+            while True:
+                data, sender = sock.recvfrom(65507)
+                if sender == address and data[0] == header:
+                    return data
+                if sender != address or data[0] not in (
+                    Header.python_send_next,
+                    Header.python_fragment_ack,
+                ):
+                    self.__deferred[sock].append((data, sender))
+        except socket.timeout:
+            return None
+        finally:
+            sock.settimeout(None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--max-version", type=int, default=5)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--tick-rate", type=float, default=60.0, help="frames per second (0: unlimited)"
+    )
+    parser.add_argument("--frames", type=int, help="exit after this many frames")
+    parser.add_argument("--recording", help="an .npz file of sensor data to serve")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds to delay each datagram"
+    )
+    parser.add_argument(
+        "--no-shared-memory",
+        action="store_true",
+        help="send every sensor over UDP, as if RacecarSim were on another machine",
+    )
+    parser.add_argument(
+        "--fixed-step", type=float, help="seconds of simulation time per frame"
+    )
+    args = parser.parse_args()
+
+    server = RacecarSimServer(
+        max_version=args.max_version,
+        drop_rate=args.drop_rate,
+        duplicate_rate=args.duplicate_rate,
+        tick_rate=args.tick_rate,
+        max_frames=args.frames,
+        recording=args.recording,
+        latency=args.latency,
+        shared_memory=not args.no_shared_memory,
+        fixed_step=args.fixed_step,
+    )
+    server.start()
+    print(">> RacecarSim stand-in running, waiting for a Python script to connect...")
+    try:
+        server.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+    if server.frame_times:
+        print(
+            f">> Sent {server.frames} frames, "
+            f"mean frame time {np.mean(server.frame_times) * 1000:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+A ring of sensor frames in shared memory, used in place of UDP for the color image,
+depth image, and lidar scan when RacecarSim runs on the same machine.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+from typing import NamedTuple, Optional
+
+import numpy as np
+from nptyping import NDArray
+
+
+class SharedFrame(NamedTuple):
+    """
+    A frame read from a sensor ring, whose arrays are copies owned by the reader.
+    """
+
+    frame: int
+    color_image: NDArray[(480, 640, 3), np.uint8]
+    # The low resolution depth image, as sent by RacecarSim
+    depth_image: NDArray[(60, 80), np.float32]
+    lidar_samples: NDArray[720, np.float32]
+
+
+class SensorRing:
+    """
+    A memory-mapped file holding the most recent sensor frames written by RacecarSim.
+
+    The file begins with a header describing the layout and the number of the latest
+    complete frame, followed by num_slots slots which are written round-robin.  Each
+    slot is protected by a sequence lock: its sequence number is odd while the slot
+    is being written, so a reader which sees the same even sequence number before and
+    after reading knows that it read a complete frame.
+
+    Layout (little endian):
+        header: magic (4s), layout version (I), num_slots (I), width (I), height (I),
+            max depth width (I), max depth height (I), num lidar samples (I),
+            latest frame (Q), padded to _HEADER_SIZE bytes
+        each slot: sequence (Q), frame (Q), depth width (I), depth height (I), padded
+            to _SLOT_HEADER_SIZE bytes, then the BGR color image, the float32 depth
+            image (at its maximum size), and the float32 lidar samples
+
+    Note:
+        A reader copies the slot out of the ring before checking its sequence number
+        again, so it never returns data which was overwritten while it was reading,
+        and the frames it returns remain valid however long they are kept.
+    """
+
+    _MAGIC = b"RCSM"
+    _LAYOUT_VERSION = 1
+    _NUM_SLOTS = 4
+
+    _HEADER_FORMAT = "<4sIIIIIII"
+    _LATEST_FORMAT = "<Q"
+    _LATEST_OFFSET = 32
+    _HEADER_SIZE = 64
+
+    _SLOT_HEADER_FORMAT = "<QQII"
+    _SLOT_HEADER_SIZE = 64
+
+    # The number of times to retry reading a slot which is being overwritten
+    __MAX_ATTEMPTS = 100
+
+    def __init__(self, path: str, mapping: mmap.mmap) -> None:
+        self.path = path
+        self.__mapping = mapping
+        self.__view = memoryview(mapping)
+
+        (
+            magic,
+            layout_version,
+            self.__num_slots,
+            self.__width,
+            self.__height,
+            self.__max_depth_width,
+            self.__max_depth_height,
+            self.__num_samples,
+        ) = struct.unpack_from(self._HEADER_FORMAT, mapping)
+        if magic != self._MAGIC or layout_version != self._LAYOUT_VERSION:
+            raise ValueError(f"[{path}] is not a sensor ring this version can read")
+
+        self.__color_size = self.__width * self.__height * 3
+        self.__depth_size = self.__max_depth_width * self.__max_depth_height * 4
+        self.__slot_size = self.__get_slot_size(
+            self.__width,
+            self.__height,
+            self.__max_depth_width,
+            self.__max_depth_height,
+            self.__num_samples,
+        )
+
+    @classmethod
+    def create(
+        cls,
+        name: str,
+        width: int,
+        height: int,
+        max_depth_width: int,
+        max_depth_height: int,
+        num_samples: int,
+    ) -> "SensorRing":
+        """
+        Creates a writable sensor ring, in /dev/shm if it is available.
+
+        Args:
+            name: The file name of the ring.
+            width: The width of the color image.
+            height: The height of the color image.
+            max_depth_width: The largest width of depth image which will be written.
+            max_depth_height: The largest height of depth image which will be written.
+            num_samples: The number of samples in a lidar scan.
+        """
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        path = os.path.join(directory, name)
+        size = cls._HEADER_SIZE + cls._NUM_SLOTS * cls.__get_slot_size(
+            width, height, max_depth_width, max_depth_height, num_samples
+        )
+
+        with open(path, "w+b") as file:
+            file.truncate(size)
+            mapping = mmap.mmap(file.fileno(), size)
+        struct.pack_into(
+            cls._HEADER_FORMAT,
+            mapping,
+            0,
+            cls._MAGIC,
+            cls._LAYOUT_VERSION,
+            cls._NUM_SLOTS,
+            width,
+            height,
+            max_depth_width,
+            max_depth_height,
+            num_samples,
+        )
+        return cls(path, mapping)
+
+    @classmethod
+    def open(cls, path: str) -> Optional["SensorRing"]:
+        """
+        Opens an existing sensor ring for reading.
+
+        Returns:
+            The sensor ring, or None if the file does not exist (for example, because
+            RacecarSim is running on another machine).
+        """
+        try:
+            with open(path, "rb") as file:
+                mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        return cls(path, mapping)
+
+    def close(self) -> None:
+        """
+        Unmaps the sensor ring.
+        """
+        self.__view.release()
+        self.__mapping.close()
+
+    def unlink(self) -> None:
+        """
+        Closes and deletes the sensor ring.
+        """
+        self.close()
+        os.remove(self.path)
+
+    def write(
+        self,
+        color_image: NDArray[(480, 640, 3), np.uint8],
+        depth_image: NDArray[(60, 80), np.float32],
+        lidar_samples: NDArray[720, np.float32],
+    ) -> int:
+        """
+        Writes a frame to the next slot, and returns its frame number.
+        """
+        [latest] = struct.unpack_from(
+            self._LATEST_FORMAT, self.__mapping, self._LATEST_OFFSET
+        )
+        frame = latest + 1
+        offset = self.__get_slot_offset(frame)
+        [sequence] = struct.unpack_from("<Q", self.__mapping, offset)
+
+        # An odd sequence number marks the slot as being written
+        struct.pack_into("<Q", self.__mapping, offset, sequence + 1)
+        color, depth, lidar = self.__get_sections(
+            offset, depth_image.shape[1], depth_image.shape[0], writable=True
+        )
+        np.copyto(color, color_image)
+        np.copyto(depth, depth_image)
+        np.copyto(lidar, lidar_samples)
+        struct.pack_into(
+            self._SLOT_HEADER_FORMAT,
+            self.__mapping,
+            offset,
+            sequence + 2,
+            frame,
+            depth_image.shape[1],
+            depth_image.shape[0],
+        )
+
+        struct.pack_into(
+            self._LATEST_FORMAT, self.__mapping, self._LATEST_OFFSET, frame
+        )
+        return frame
+
+    def read(self) -> Optional[SharedFrame]:
+        """
+        Returns the latest complete frame, or None if no frame has been written yet.
+        """
+        for _ in range(self.__MAX_ATTEMPTS):
+            [frame] = struct.unpack_from(
+                self._LATEST_FORMAT, self.__view, self._LATEST_OFFSET
+            )
+            if frame == 0:
+                return None
+
+            offset = self.__get_slot_offset(frame)
+            sequence, slot_frame, depth_width, depth_height = struct.unpack_from(
+                self._SLOT_HEADER_FORMAT, self.__view, offset
+            )
+            if sequence % 2 == 1 or slot_frame != frame:
+                # The writer has already moved on to this slot, so try the new latest
+                continue
+
+            # Copy the slot before checking that it was not rewritten meanwhile
+            sections = [
+                np.array(section)
+                for section in self.__get_sections(offset, depth_width, depth_height)
+            ]
+            [sequence_after] = struct.unpack_from("<Q", self.__view, offset)
+            if sequence_after == sequence:
+                return SharedFrame(frame, *sections)
+
+        raise RuntimeError(f"Unable to read a consistent frame from [{self.path}]")
+
+    @classmethod
+    def __get_slot_size(
+        cls,
+        width: int,
+        height: int,
+        max_depth_width: int,
+        max_depth_height: int,
+        num_samples: int,
+    ) -> int:
+        return (
+            cls._SLOT_HEADER_SIZE
+            + width * height * 3
+            + max_depth_width * max_depth_height * 4
+            + num_samples * 4
+        )
+
+    def __get_slot_offset(self, frame: int) -> int:
+        return self._HEADER_SIZE + (frame % self.__num_slots) * self.__slot_size
+
+    def __get_sections(
+        self, offset: int, depth_width: int, depth_height: int, writable: bool = False
+    ):
+        buffer = self.__mapping if writable else self.__view
+        offset += self._SLOT_HEADER_SIZE
+        color = np.frombuffer(buffer, np.uint8, self.__color_size, offset).reshape(
+            (self.__height, self.__width, 3)
+        )
+        offset += self.__color_size
+        depth = np.frombuffer(
+            buffer, np.float32, depth_width * depth_height, offset
+        ).reshape((depth_height, depth_width))
+        offset += self.__depth_size
+        lidar = np.frombuffer(buffer, np.float32, self.__num_samples, offset)
+        return color, depth, lidar
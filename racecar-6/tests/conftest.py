@@ -0,0 +1,14 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Makes the library importable from the tests, as the labs and benchmarks do.
+"""
+
+import os
+import sys
+
+LIBRARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "library")
+for directory in ("", "simulation", "real", "replay"):
+    sys.path.insert(1, os.path.join(LIBRARY, directory))
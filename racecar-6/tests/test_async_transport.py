@@ -0,0 +1,115 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests AsyncTransport against datagrams delivered by hand, in place of RacecarSim.
+"""
+
+import asyncio
+import struct
+from typing import List, Tuple
+
+from async_transport_sim import AsyncTransport
+from racecar_core_sim import RacecarSim
+
+ADDRESS = ("127.0.0.1", 5065)
+
+
+class Racecar:
+    """
+    The protected interface of RacecarSim used by AsyncTransport, for a RacecarSim
+    which speaks the windowed protocol.
+    """
+
+    Header = RacecarSim.Header
+    _FRAGMENT_HEADER_FORMAT = RacecarSim._FRAGMENT_HEADER_FORMAT
+    _FRAGMENT_WINDOW = RacecarSim._FRAGMENT_WINDOW
+    _FRAGMENT_TIMEOUT = RacecarSim._FRAGMENT_TIMEOUT
+
+    def __init__(self) -> None:
+        self.transfer_id = 0
+
+    def _next_transfer_id(self) -> int:
+        self.transfer_id += 1
+        return self.transfer_id
+
+    def _get_unity_address(self) -> Tuple[str, int]:
+        return ADDRESS
+
+    def _is_pipelined(self) -> bool:
+        return True
+
+    def _finish_transfer(
+        self, transfer_id: int, num_bytes: int, num_fragments: int
+    ) -> None:
+        pass
+
+    def _is_stale_fragment(self, data) -> bool:
+        return False
+
+    def get_protocol_stats(self) -> None:
+        return None
+
+
+class DatagramTransport:
+    """
+    Records the datagrams sent by AsyncTransport.
+    """
+
+    def __init__(self) -> None:
+        self.sent: List[bytes] = []
+
+    def sendto(self, data: bytes, address) -> None:
+        self.sent.append(data)
+
+
+def make_fragment(transfer_id: int, sequence: int, payload: bytes) -> bytes:
+    return (
+        struct.pack(
+            RacecarSim._FRAGMENT_HEADER_FORMAT,
+            RacecarSim.Header.unity_fragment,
+            transfer_id,
+            sequence,
+        )
+        + payload
+    )
+
+
+def test_commands_during_a_windowed_transfer_are_queued() -> None:
+    async def run() -> None:
+        racecar = Racecar()
+        transport = AsyncTransport(racecar)
+        transport.connection_made(DatagramTransport())
+
+        buffer = memoryview(bytearray(8))
+        request = asyncio.ensure_future(
+            transport.request_fragmented(
+                RacecarSim.Header.camera_get_color_image, buffer, 2
+            )
+        )
+        await asyncio.sleep(0)
+
+        # An error command, shorter than a fragment header, and an exit command
+        # arrive between the fragments of the reply
+        error = struct.pack(
+            "BB", RacecarSim.Header.error, RacecarSim.Error.python_outdated
+        )
+        exit_command = struct.pack("B", RacecarSim.Header.unity_exit)
+        transport.datagram_received(
+            make_fragment(racecar.transfer_id, 0, b"abcd"), ADDRESS
+        )
+        transport.datagram_received(error, ADDRESS)
+        transport.datagram_received(exit_command, ADDRESS)
+        assert not request.done()
+        transport.datagram_received(
+            make_fragment(racecar.transfer_id, 1, b"efgh"), ADDRESS
+        )
+
+        assert await asyncio.wait_for(request, 1) == 8
+        assert bytes(buffer) == b"abcdefgh"
+        assert await asyncio.wait_for(transport.receive_command(), 1) == error
+        assert await asyncio.wait_for(transport.receive_command(), 1) == exit_command
+        assert not transport.has_outstanding_requests()
+
+    asyncio.run(run())
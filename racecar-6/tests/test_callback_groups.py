@@ -0,0 +1,154 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests the real camera and lidar callbacks under a MultiThreadedExecutor, with
+synthetic messages published from another node in place of the car's sensors.
+
+Requires ROS 2 (rclpy, sensor_msgs, and cv_bridge), but no hardware.
+"""
+
+import threading
+import time
+from typing import Callable, Iterator, Tuple
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+ros2 = pytest.importorskip("rclpy")
+pytest.importorskip("sensor_msgs.msg")
+pytest.importorskip("cv_bridge")
+
+from rclpy.executors import MultiThreadedExecutor
+from rclpy.qos import qos_profile_sensor_data
+from sensor_msgs.msg import Image, LaserScan
+
+from camera_real import CameraReal
+from lidar_real import LidarReal
+
+# Seconds to keep publishing a message before giving up on its callback
+TIMEOUT = 5.0
+
+
+@pytest.fixture
+def modules() -> Iterator[Tuple[CameraReal, LidarReal, Callable, Callable]]:
+    """
+    Yields a camera and lidar spun by a MultiThreadedExecutor, as in RacecarReal,
+    along with functions which publish a color image message and a scan message.
+    """
+    ros2.init()
+    camera = CameraReal()
+    lidar = LidarReal()
+    sensors = ros2.create_node("synthetic_sensors")
+    color_publisher = sensors.create_publisher(
+        Image, CameraReal._CameraReal__COLOR_TOPIC, qos_profile_sensor_data
+    )
+    scan_publisher = sensors.create_publisher(
+        LaserScan, LidarReal._LidarReal__SCAN_TOPIC, qos_profile_sensor_data
+    )
+
+    executor = MultiThreadedExecutor(4)
+    executor.add_node(camera.node)
+    executor.add_node(lidar.node)
+    thread = threading.Thread(target=executor.spin, daemon=True)
+    thread.start()
+    try:
+        yield camera, lidar, color_publisher.publish, scan_publisher.publish
+    finally:
+        camera._CameraReal__color_listener = None
+        executor.shutdown()
+        thread.join()
+        for node in (camera.node, lidar.node, sensors):
+            node.destroy_node()
+        ros2.shutdown()
+
+
+def make_color_message(value: int) -> Image:
+    """
+    Returns a color image message holding a JPEG image of a single gray value.
+    """
+    image = np.full((480, 640, 3), value, np.uint8)
+    _, jpeg = cv.imencode(".jpg", image)
+    message = Image()
+    message.height, message.width = image.shape[:2]
+    message.data = jpeg.tobytes()
+    return message
+
+
+def make_scan_message(distance: float) -> LaserScan:
+    """
+    Returns a scan message whose 720 samples are all distance meters away.
+    """
+    message = LaserScan()
+    message.ranges = [distance] * 720
+    return message
+
+
+def publish_until(publish: Callable, message, condition: Callable[[], bool]) -> bool:
+    """
+    Publishes a message repeatedly until condition is true, since best effort
+    messages sent before the subscription is discovered are lost.
+    """
+    deadline = time.monotonic() + TIMEOUT
+    while not condition() and time.monotonic() < deadline:
+        publish(message)
+        time.sleep(0.02)
+    return condition()
+
+
+def test_callbacks_store_synthetic_messages(modules) -> None:
+    camera, lidar, publish_color, publish_scan = modules
+
+    assert publish_until(
+        publish_color, make_color_message(200), lambda: camera.frames_received > 0
+    )
+    camera._CameraReal__update()
+    image = camera.get_color_image_no_copy()
+    assert image.shape == (480, 640, 3)
+    assert abs(int(image.mean()) - 200) <= 2
+
+    # Samples are stored in centimeters
+    assert publish_until(
+        publish_scan,
+        make_scan_message(1.5),
+        lambda: len(lidar.get_samples_async()) == 720,
+    )
+    lidar._LidarReal__update()
+    assert np.allclose(lidar.get_samples(), 150)
+
+
+def test_blocked_color_callback_does_not_delay_scans(modules) -> None:
+    camera, lidar, publish_color, publish_scan = modules
+
+    # Hold the color callback group inside the color callback until released
+    entered = threading.Event()
+    released = threading.Event()
+
+    def block() -> None:
+        entered.set()
+        released.wait(TIMEOUT)
+
+    camera._CameraReal__color_listener = block
+    try:
+        assert publish_until(publish_color, make_color_message(100), entered.is_set)
+
+        # Scans are handled in their own group while the color callback is blocked
+        assert publish_until(
+            publish_scan,
+            make_scan_message(2.0),
+            lambda: len(lidar.get_samples_async()) == 720,
+        )
+        assert not released.is_set()
+        assert np.allclose(lidar.get_samples_async(), 200)
+
+        # Color images which arrive meanwhile wait for the blocked callback, since
+        # the callbacks of one group never run at the same time
+        received = camera.frames_received
+        publish_color(make_color_message(50))
+        time.sleep(0.2)
+        assert camera.frames_received == received
+    finally:
+        camera._CameraReal__color_listener = None
+        released.set()
@@ -0,0 +1,106 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests that rc.clock follows the simulation time in simulation and replay, so that
+programs timed with it behave the same however long each frame takes to run.
+"""
+
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+import clock
+from racecar_core_replay import RacecarReplay
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer
+from sensor_log import SensorLogWriter
+
+NUM_FRAMES = 8
+FIXED_STEP = 0.05
+
+
+def run_sim(sleeps: List[float]) -> List[Tuple[float, float, float]]:
+    """
+    Runs a program against a stand-in server in lockstep, sleeping for sleeps[i]
+    seconds in update i, and returns the clock at the start and end of each frame
+    along with the speed it set from the clock.
+    """
+    server = RacecarSimServer(
+        tick_rate=0, max_frames=NUM_FRAMES, shared_memory=False, fixed_step=FIXED_STEP
+    )
+    times: List[Tuple[float, float, float]] = []
+    server.start()
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+
+        def update() -> None:
+            start = rc.clock.now()
+            time.sleep(sleeps[len(times)])
+            speed = 1.0 if start % 0.2 < 0.1 else -1.0
+            rc.drive.set_speed_angle(speed, 0)
+            times.append((start, clock.now(), speed))
+
+        rc.set_start_update(lambda: None, update)
+        rc.go()
+        assert server.wait(5)
+    finally:
+        server.stop()
+    return times
+
+
+def test_sim_clock_advances_by_the_fixed_step() -> None:
+    fast = run_sim([0.0] * NUM_FRAMES)
+    slow = run_sim([0.02 * (i % 3) for i in range(NUM_FRAMES)])
+
+    # The clock stands still within each frame, and advances by exactly the fixed
+    # step between frames, however long each frame took
+    assert len(fast) == NUM_FRAMES - 1
+    assert np.allclose(
+        [start for start, _, _ in fast], FIXED_STEP * np.arange(1, NUM_FRAMES)
+    )
+    for start, end, _ in fast:
+        assert start == end
+    assert fast == slow
+
+
+def run_replay(path: str, sleep: float) -> Tuple[List[float], np.ndarray]:
+    """
+    Replays the log at path as fast as possible, sleeping for sleep seconds each
+    frame, and returns the clock each frame along with the replayed drive outputs.
+    """
+    rc = RacecarReplay(path, True)
+    times: List[float] = []
+
+    def update() -> None:
+        times.append(rc.clock.now())
+        time.sleep(sleep)
+        rc.drive.set_speed_angle(1.0 if clock.now() % 0.2 < 0.1 else -1.0, 0)
+
+    rc.set_start_update(update, update)
+    rc.go()
+    return times, rc.drive.get_outputs()
+
+
+def test_replay_clock_follows_the_recorded_delta_times(tmp_path) -> None:
+    path = str(tmp_path / "log")
+    delta_times = np.array([0, 1, 2, 1, 3, 1, 2, 1], np.float32) / 30
+    writer = SensorLogWriter(path)
+    for frame, delta_time in enumerate(delta_times):
+        writer.log_frame(
+            float(np.sum(delta_times[: frame + 1])),
+            delta_time,
+            lidar=np.full(720, 100, np.float32),
+        )
+    writer.close()
+
+    times, outputs = run_replay(path, 0.0)
+    assert np.allclose(times, np.cumsum(delta_times))
+
+    # Replaying again at another speed gives identical outputs
+    slow_times, slow_outputs = run_replay(path, 0.01)
+    assert slow_times == times
+    assert np.array_equal(slow_outputs, outputs)
@@ -0,0 +1,82 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests reading native resolution depth images from the stand-in RacecarSim server,
+through each transport.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+
+import racecar_utils as rc_utils
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer, SyntheticSensors
+
+NUM_FRAMES = 5
+
+# The number of color image pixels spanned by each simulated depth pixel
+SCALE = 8
+
+
+@pytest.mark.parametrize("mode", ["sync", "snapshot", "shared_memory", "async"])
+def test_returns_native_depth_images_with_their_scale(mode: str) -> None:
+    server = RacecarSimServer(
+        tick_rate=0, max_frames=NUM_FRAMES, shared_memory=mode == "shared_memory"
+    )
+    native_images: List[Tuple[np.ndarray, int]] = []
+    full_images: List[np.ndarray] = []
+
+    server.start()
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+        rc.set_snapshot_mode(mode == "snapshot")
+        rc.set_shared_memory_mode(mode == "shared_memory")
+
+        if mode == "async":
+
+            async def update() -> None:
+                native_images.append(await rc.camera.fetch_depth_image_native())
+                full_images.append(await rc.camera.fetch_depth_image())
+
+        else:
+
+            def update() -> None:
+                native_images.append(rc.camera.get_depth_image_native())
+                full_images.append(rc.camera.get_depth_image())
+
+        rc.set_start_update(lambda: None, update)
+        rc.go()
+        assert server.wait(5)
+    finally:
+        server.stop()
+
+    expected = SyntheticSensors().read(0, 0, 0).depth
+    assert len(native_images) == NUM_FRAMES - 1
+    for (native, scale), full in zip(native_images, full_images):
+        # Every frame's image is kept intact, since each is captured into new memory
+        assert scale == SCALE
+        assert native.shape == (60, 80)
+        assert np.array_equal(native, expected)
+
+        # The full resolution image is only resized from the native image
+        assert full.shape == (60 * SCALE, 80 * SCALE)
+        assert abs(float(full.mean()) - float(native.mean())) < 1
+
+    # Pixel coordinates are given at full resolution with either image
+    native, scale = native_images[-1]
+    full = full_images[-1]
+    row, col = rc_utils.get_closest_pixel(native, scale=scale)
+    assert row == 59 * SCALE + SCALE // 2
+    assert 0 <= col < 80 * SCALE
+    assert rc_utils.get_closest_pixel(full)[0] >= 59 * SCALE
+
+    distance = rc_utils.get_pixel_average_distance(native, (100, 20), scale=scale)
+    assert distance == native[100 // SCALE, 20 // SCALE]
+    assert abs(rc_utils.get_pixel_average_distance(full, (100, 20)) - distance) < (
+        native[0, 0] - native[1, 0]
+    )
@@ -0,0 +1,157 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests FrameBudget, on a fake clock and against the stand-in RacecarSim server.
+"""
+
+import time
+from typing import List
+
+import numpy as np
+import pytest
+
+import frame_budget
+from frame_budget import FrameBudget
+from loop_timing import LoopTiming
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer
+
+
+class FakeTime:
+    """
+    Stands in for the time module in frame_budget, with a clock which only advances
+    when told to.
+    """
+
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_time(monkeypatch) -> FakeTime:
+    fake = FakeTime()
+    monkeypatch.setattr(frame_budget, "time", fake)
+    return fake
+
+
+def test_sheds_optional_tasks_after_the_threshold(fake_time) -> None:
+    budget = FrameBudget(frame_time=0.02, threshold=0.5)
+    critical = budget.register("critical", lambda x: x, critical=True)
+    optional = budget.register("optional", lambda x: x)
+
+    budget.begin_frame()
+    fake_time.now += 0.005
+    assert optional(1) == 1
+    fake_time.now += 0.006
+    assert not budget.has_time()
+    assert optional(2) is None
+    assert critical(3) == 3
+    budget.end_frame()
+
+    assert (optional.runs, optional.skipped) == (1, 1)
+    assert (critical.runs, critical.skipped) == (1, 0)
+
+    # A disabled budget only times frames
+    budget.enabled = False
+    budget.begin_frame()
+    fake_time.now += 0.05
+    assert optional(4) == 4
+
+
+def test_runs_only_the_newest_deferred_call_in_a_later_frame(fake_time) -> None:
+    budget = FrameBudget(frame_time=0.02, threshold=0.5)
+    shown: List[int] = []
+    show = budget.register("display", shown.append, defer=True)
+
+    budget.begin_frame()
+    fake_time.now += 0.015
+    show(1)
+    show(2)
+    budget.run_deferred()
+    budget.end_frame()
+    assert shown == []
+    assert (show.deferred, show.skipped) == (2, 1)
+
+    # The next frame has time to spare after update
+    budget.begin_frame()
+    budget.run_deferred()
+    budget.end_frame()
+    assert shown == [2]
+
+    # A newer call which fits in its frame supersedes a deferred one
+    budget.begin_frame()
+    fake_time.now += 0.015
+    show(3)
+    budget.end_frame()
+    budget.begin_frame()
+    show(4)
+    budget.run_deferred()
+    budget.end_frame()
+    assert shown == [2, 4]
+    assert (show.runs, show.skipped) == (2, 2)
+
+
+def test_times_frames_against_the_deadline(fake_time) -> None:
+    budget = FrameBudget(frame_time=0.02, history=4)
+    for frame_time in (0.01, 0.03, 0.01, 0.05, 0.01, 0.01):
+        budget.begin_frame()
+        fake_time.now += frame_time
+        budget.end_frame()
+        fake_time.now += 0.005
+
+    assert budget.num_frames == 6
+    assert budget.deadline_misses == 2
+
+    # Only the most recent frames are kept for percentiles
+    timing = budget.timing
+    assert np.allclose(timing.get_percentiles(LoopTiming.FRAME, (0, 100)), (0.01, 0.05))
+    assert np.allclose(
+        timing.get_percentiles(LoopTiming.PERIOD, (0, 100)), (0.015, 0.055)
+    )
+    assert f"over {budget.num_frames} frames" in budget.summary()
+
+
+def test_sheds_and_defers_work_in_slow_frames_of_a_sim_run() -> None:
+    num_frames = 11
+    server = RacecarSimServer(tick_rate=0, max_frames=num_frames, shared_memory=False)
+    ran: List[int] = []
+    shown: List[int] = []
+    server.start()
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+        rc.frame_budget.frame_time = 0.02
+        optional = rc.frame_budget.register("optional", ran.append)
+        show = rc.frame_budget.register("display", shown.append, defer=True)
+        updates: List[int] = []
+
+        # Every other update overruns its frame before calling the tasks
+        def update() -> None:
+            frame = len(updates)
+            updates.append(frame)
+            rc.lidar.get_samples()
+            if frame % 2 == 1:
+                time.sleep(0.03)
+                show(frame)
+            optional(frame)
+
+        rc.set_start_update(lambda: None, update)
+        rc.go()
+        assert server.wait(5)
+    finally:
+        server.stop()
+
+    # Start and every update are timed
+    assert rc.frame_budget.num_frames == num_frames
+    assert rc.frame_budget.deadline_misses >= 5
+
+    # Optional work is shed in the slow frames, and the display is shown after the
+    # next fast frame's update
+    assert ran == [0, 2, 4, 6, 8]
+    assert shown == [1, 3, 5, 7]
+    assert show.deferred == 5
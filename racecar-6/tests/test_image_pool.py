@@ -0,0 +1,105 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests ImagePool, on its own and through the color image getters of the camera
+against the stand-in RacecarSim server.
+"""
+
+from typing import List
+
+import numpy as np
+import pytest
+
+import image_pool
+from image_pool import ImagePool
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer
+
+
+def test_reuses_released_buffers_of_the_same_shape_and_type() -> None:
+    pool = ImagePool(max_buffers=2)
+    image = np.full((4, 6, 3), 7, np.uint8)
+
+    first = pool.acquire(image)
+    assert first is not image
+    assert np.array_equal(first, image)
+    pool.release(first)
+
+    # A released buffer receives the next copy of the same shape and type
+    image[:] = 9
+    second = pool.acquire(image)
+    assert second is first
+    assert np.array_equal(second, image)
+
+    # Other shapes and types need their own buffers
+    assert pool.acquire(image[:2]) is not first
+    assert pool.acquire(image.astype(np.float32)) is not first
+    assert (pool.num_copies, pool.num_allocations) == (4, 3)
+
+
+def test_keeps_at_most_max_buffers_once_each() -> None:
+    pool = ImagePool(max_buffers=2)
+    image = np.zeros((2, 2, 3), np.uint8)
+    copies = [pool.acquire(image) for _ in range(3)]
+    for copy in copies:
+        pool.release(copy)
+    pool.release(copies[0])
+
+    reused = [pool.acquire(image) for _ in range(3)]
+    assert sum(any(r is c for c in copies) for r in reused) == 2
+    assert pool.num_allocations == 4
+
+    # Views of a copy cannot be released, since the copy may still be in use
+    with pytest.raises(AssertionError):
+        pool.release(reused[0][:1])
+
+
+def test_read_only_views_leave_the_image_writable() -> None:
+    image = np.zeros((2, 2), np.uint8)
+    view = image_pool.read_only(image)
+    with pytest.raises(ValueError):
+        view[0, 0] = 1
+    image[0, 0] = 1
+    assert view[0, 0] == 1
+    assert image_pool.read_only(None) is None
+
+
+def test_camera_copies_reuse_released_buffers() -> None:
+    num_frames = 10
+    server = RacecarSimServer(tick_rate=0, max_frames=num_frames, shared_memory=False)
+    pool = image_pool.get_default()
+    images: List[np.ndarray] = []
+    copies: List[np.ndarray] = []
+    server.start()
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+        allocations = pool.num_allocations
+
+        def update() -> None:
+            image = rc.camera.get_color_image()
+            assert rc.camera.get_color_image() is image
+            with pytest.raises(ValueError):
+                image[0, 0] = 0
+            images.append(image)
+
+            copy = rc.camera.get_color_image_copy()
+            copy[0, 0] = 0
+            copies.append(copy)
+            rc.camera.release_color_image_copy(copy)
+
+        rc.set_start_update(lambda: None, update)
+        rc.go()
+        assert server.wait(5)
+    finally:
+        server.stop()
+
+    # Each frame's image is captured into new memory, but its copy reuses the
+    # buffer released in the previous frame (or earlier, by another test)
+    assert len(images) == num_frames - 1
+    assert not np.shares_memory(images[0], images[1])
+    assert images[0][0, 0].tolist() == [255, 255, 255]
+    assert all(copy is copies[0] for copy in copies)
+    assert pool.num_allocations - allocations <= 1
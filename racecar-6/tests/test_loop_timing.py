@@ -0,0 +1,48 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests LoopTiming, which keeps the times of each phase of the real car's run loop.
+"""
+
+import numpy as np
+
+from loop_timing import LoopTiming
+
+# The phases and latencies timed by RacecarReal
+PHASES = ("update", "log", "modules", "periodic")
+LATENCIES = ("camera_latency", "lidar_latency")
+
+
+def test_keeps_phases_and_extras_in_their_columns() -> None:
+    timing = LoopTiming(PHASES, 0.02, extras=LATENCIES)
+    assert np.array_equal(timing.get_percentiles("update"), (0, 0, 0))
+
+    for i in range(1, 11):
+        timing.add_frame(
+            (0.001 * i, 0.002, 0.003, 0.004), 0.003 * i, 0.02, (0.01, 0.05)
+        )
+    assert timing.num_frames == 10
+    assert timing.deadline_misses == 4
+    assert np.allclose(timing.get_percentiles("update", (0, 100)), (0.001, 0.01))
+    assert np.allclose(timing.get_percentiles("periodic", (50,)), 0.004)
+    assert np.allclose(timing.get_percentiles("camera_latency", (50,)), 0.01)
+    assert np.allclose(timing.get_percentiles("lidar_latency", (50,)), 0.05)
+    assert np.allclose(timing.get_percentiles(LoopTiming.FRAME, (100,)), 0.03)
+    assert np.allclose(timing.get_percentiles(LoopTiming.PERIOD, (50,)), 0.02)
+
+    summary = timing.summary()
+    assert "4 over the 20.00 ms deadline" in summary
+    for name in PHASES + LATENCIES + (LoopTiming.FRAME, LoopTiming.PERIOD):
+        assert name in summary
+
+
+def test_keeps_only_the_most_recent_frames() -> None:
+    timing = LoopTiming(PHASES, 0.02, history=5, extras=LATENCIES)
+    for i in range(12):
+        timing.add_frame((i, 0, 0, 0), 0.01, 0.02, (0, 0))
+
+    # Frames 7 to 11 remain, but every frame counts toward the totals
+    assert timing.num_frames == 12
+    assert np.array_equal(timing.get_percentiles("update", (0, 100)), (7, 11))
@@ -0,0 +1,121 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests PeriodicScheduler, on its own and through rc.schedule_periodic against the
+stand-in RacecarSim server.
+"""
+
+from typing import List
+
+from periodic_scheduler import PeriodicScheduler
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer
+
+FRAME = 1 / 60
+
+
+def run_frames(scheduler: PeriodicScheduler, delta_times: List[float]) -> List[int]:
+    """
+    Advances the scheduler by each delta time, and returns the frames in which a
+    task was due.
+    """
+    return [
+        frame
+        for frame, delta_time in enumerate(delta_times)
+        if scheduler.advance(delta_time)
+    ]
+
+
+def test_runs_a_whole_number_of_frames_apart_without_drift() -> None:
+    scheduler = PeriodicScheduler()
+    task = scheduler.add(lambda: None, 0.1, 0)
+
+    # Runs are due at 0, 0.1, ... 10 seconds, in the frames ending closest to them
+    frames = run_frames(scheduler, [FRAME] * 600)
+    assert frames == [0] + list(range(5, 600, 6))
+    assert task.skipped == 0
+
+
+def test_skips_the_runs_missed_during_a_long_frame() -> None:
+    scheduler = PeriodicScheduler()
+    task = scheduler.add(lambda: None, 0.1, 0)
+
+    # A frame of 0.35 seconds ends at 0.45 seconds, after the runs due at 0.2 and
+    # 0.3 seconds, which are skipped; the run due at 0.4 seconds is made instead
+    frames = run_frames(scheduler, [FRAME] * 6 + [0.35] + [FRAME] * 12)
+    assert frames == [0, 5, 6, 9, 15]
+    assert task.skipped == 2
+
+
+def test_staggers_tasks_scheduled_without_a_phase() -> None:
+    scheduler = PeriodicScheduler()
+    first = scheduler.add(lambda: None, 0.1)
+    second = scheduler.add(lambda: None, 0.1)
+    assert (first.phase, second.phase) == (FRAME, 2 * FRAME)
+
+    due_together = 0
+    for _ in range(60):
+        due = scheduler.advance(FRAME)
+        due_together += first in due and second in due
+    assert due_together == 0
+
+
+def test_replaces_and_cancels_tasks() -> None:
+    calls: List[str] = []
+
+    def task() -> None:
+        calls.append("task")
+
+    scheduler = PeriodicScheduler()
+    scheduler.add(task, 0.5, 0)
+    replacement = scheduler.add(task, 0.1, 0)
+    assert scheduler.get_tasks() == [replacement]
+
+    scheduler.run(FRAME)
+    assert calls == ["task"]
+    assert replacement.runs == 1
+
+    replacement.cancel()
+    scheduler.run(0.2)
+    assert calls == ["task"]
+    assert not scheduler
+
+
+def test_counts_runs_which_exceed_their_budget() -> None:
+    scheduler = PeriodicScheduler()
+    task = scheduler.add(lambda: None, 0.1, 0, budget=0.01)
+    task.record(0.005)
+    task.record(0.02)
+    assert (task.runs, task.overruns) == (2, 1)
+    assert task.max_time == 0.02
+    assert abs(task.get_mean_time() - 0.0125) < 1e-9
+
+
+def test_schedules_periodic_tasks_in_simulation_time() -> None:
+    # Each frame lasts exactly a fiftieth of a second, however long it takes to run
+    num_frames = 51
+    server = RacecarSimServer(
+        tick_rate=0, max_frames=num_frames, shared_memory=False, fixed_step=0.02
+    )
+    runs: List[str] = []
+    server.start()
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+
+        def start() -> None:
+            rc.schedule_periodic(lambda: runs.append("fast"), 0.1, 0)
+            rc.schedule_periodic(lambda: runs.append("slow"), 0.25, 0)
+
+        rc.set_start_update(start, lambda: None)
+        rc.go()
+        assert server.wait(5)
+    finally:
+        server.stop()
+
+    # The 50 updates span a second of simulation time, and each task runs at both
+    # its start and its end
+    assert runs.count("fast") == 11
+    assert runs.count("slow") == 5
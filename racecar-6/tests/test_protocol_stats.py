@@ -0,0 +1,91 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests the protocol statistics recorded while running against the stand-in RacecarSim
+server, through both the synchronous API and the asyncio transport.
+"""
+
+import pytest
+
+from protocol_stats_sim import ProtocolStats
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer
+
+NUM_FRAMES = 10
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_records_each_request_and_frame(mode: str) -> None:
+    server = RacecarSimServer(tick_rate=0, max_frames=NUM_FRAMES, shared_memory=False)
+    server.start()
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+        rc.set_protocol_stats()
+
+        if mode == "async":
+
+            async def update() -> None:
+                await rc.lidar.fetch_samples()
+                await rc.camera.fetch_color_image_no_copy()
+                rc.drive.set_speed_angle(0.5, 0)
+
+        else:
+
+            def update() -> None:
+                rc.lidar.get_samples()
+                rc.camera.get_color_image_no_copy()
+                rc.drive.set_speed_angle(0.5, 0)
+
+        rc.set_start_update(lambda: None, update)
+        rc.go()
+        assert server.wait(5)
+    finally:
+        server.stop()
+
+    stats = rc.get_protocol_stats()
+    num_updates = NUM_FRAMES - 1
+
+    # Every frame, including the start, ends with python_finished
+    assert stats.num_frames == NUM_FRAMES
+    assert stats.get_header(RacecarSim.Header.python_finished).count == NUM_FRAMES
+    assert 0 < stats.protocol_time_total <= stats.frame_time_total
+    assert sum(stats.frame_histogram) == NUM_FRAMES
+
+    # Each reply is counted in full, however many fragments it was sent in, and
+    # RacecarSim sends color images with four channels
+    for header, bytes_in in (
+        (RacecarSim.Header.lidar_get_samples, 720 * 4),
+        (RacecarSim.Header.camera_get_color_image, 640 * 480 * 4),
+        (RacecarSim.Header.drive_set_speed_angle, 0),
+    ):
+        header_stats = stats.get_header(header)
+        assert header_stats.count == num_updates
+        assert header_stats.rtt_count == num_updates
+        assert sum(header_stats.rtt_histogram) == num_updates
+        assert header_stats.bytes_in == num_updates * bytes_in
+
+    # Fragment acknowledgements are counted, but are not requests of their own
+    ack_stats = stats.get_header(RacecarSim.Header.python_fragment_ack)
+    assert ack_stats.count > 0
+    assert ack_stats.rtt_count == 0
+
+    summary = stats.summary()
+    assert f"over {NUM_FRAMES} frames" in summary
+    assert "camera_get_color_image" in summary
+
+
+def test_reports_percentiles_from_the_histogram() -> None:
+    stats = ProtocolStats(RacecarSim.Header)
+    histogram = [0] * (len(stats.BIN_EDGES) + 1)
+    histogram[10] = 90
+    histogram[20] = 10
+    assert stats.percentile(histogram, 50) == stats.BIN_EDGES[10]
+    assert stats.percentile(histogram, 95) == stats.BIN_EDGES[20]
+
+    # Times above the largest edge are in the final bin
+    histogram[-1] = 100
+    assert stats.percentile(histogram, 99) == float("inf")
+    assert stats.percentile([0] * len(histogram), 50) == 0.0
@@ -0,0 +1,84 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests the protocol version handshake against stand-in RacecarSim servers which only
+speak older protocol versions.
+"""
+
+from typing import List
+
+import numpy as np
+import pytest
+
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer, SyntheticSensors
+
+NUM_FRAMES = 5
+
+
+def run(rc: RacecarSim, max_version: int) -> List[str]:
+    """
+    Runs rc against a server which speaks up to max_version, reading every sensor in
+    each update, and returns the sensors which did not match the synthetic hallway.
+    """
+    server = RacecarSimServer(
+        max_version=max_version,
+        tick_rate=0,
+        max_frames=NUM_FRAMES,
+        shared_memory=False,
+    )
+
+    # The car never drives, so every frame of the synthetic hallway is the same
+    expected = SyntheticSensors().read(0, 0, 0)
+    mismatches: List[str] = []
+
+    def update() -> None:
+        if not np.array_equal(rc.lidar.get_samples(), expected.lidar):
+            mismatches.append("lidar")
+        if not np.array_equal(rc.camera.get_depth_image_native()[0], expected.depth):
+            mismatches.append("depth")
+        if not np.allclose(
+            rc.physics.get_angular_velocity(), expected.angular_velocity
+        ):
+            mismatches.append("angular_velocity")
+        if rc.camera.get_color_image_no_copy()[0, 0].tolist() != [255, 255, 255]:
+            mismatches.append("color")
+
+    server.start()
+    try:
+        rc.set_protocol_stats()
+        rc.set_start_update(lambda: None, update)
+        rc.go()
+        assert server.wait(5)
+    finally:
+        server.stop()
+    return mismatches
+
+
+def test_offers_only_the_first_version_without_negotiation() -> None:
+    rc = RacecarSim(True)
+    rc.set_snapshot_mode(True)
+    assert run(rc, 5) == []
+
+    stats = rc.get_protocol_stats()
+    assert stats.get_header(RacecarSim.Header.connect).count == 1
+    assert stats.get_header(RacecarSim.Header.racecar_get_snapshot).count == 0
+    assert stats.get_header(RacecarSim.Header.lidar_get_samples).count > 0
+
+
+@pytest.mark.parametrize("max_version", [1, 2, 3, 4, 5])
+def test_negotiation_falls_back_to_the_version_of_racecarsim(max_version: int) -> None:
+    rc = RacecarSim(True)
+    rc.set_protocol_negotiation()
+    rc.set_snapshot_mode(True)
+    assert run(rc, max_version) == []
+
+    # Each version newer than the server's is answered with racecarsim_outdated
+    stats = rc.get_protocol_stats()
+    assert stats.get_header(RacecarSim.Header.connect).count == 6 - max_version
+    snapshots = stats.get_header(RacecarSim.Header.racecar_get_snapshot).count
+    assert (snapshots > 0) == (max_version >= 2)
+    acks = stats.get_header(RacecarSim.Header.python_fragment_ack).count
+    assert (acks > 0) == (max_version >= 3)
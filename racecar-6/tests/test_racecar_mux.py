@@ -0,0 +1,122 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests RacecarMux against two stand-in RacecarSim servers on loopback, one of which
+sends frames far more slowly than the other.
+"""
+
+import time
+from typing import Dict, List, Tuple
+
+from racecar_core_sim import RacecarSim
+from racecar_mux_sim import RacecarMux
+from racecar_sim_server import RacecarSimServer
+
+# The sync and async ports of each stand-in server, away from those of RacecarSim
+FAST_PORTS = (5165, 5164)
+SLOW_PORTS = (5265, 5264)
+
+FAST_FRAMES = 30
+SLOW_FRAMES = 3
+
+
+def make_car(
+    mux: RacecarMux,
+    name: str,
+    ports: Tuple[int, int],
+    speed: float,
+    updates: List[Tuple[str, float]],
+) -> RacecarSim:
+    """
+    Adds a car which sends to the stand-in server on ports, sets speed every frame,
+    and records the time of each of its updates.
+    """
+    racecar = RacecarSim(True, *ports)
+    racecar.set_protocol_negotiation()
+
+    def update() -> None:
+        racecar.lidar.get_samples()
+        racecar.drive.set_speed_angle(speed, 0)
+        updates.append((name, time.perf_counter()))
+
+    racecar.set_start_update(lambda: None, update)
+    mux.add_car(racecar)
+    return racecar
+
+
+def test_routes_each_car_to_its_server_without_waiting_on_the_slow_one() -> None:
+    servers: Dict[str, RacecarSimServer] = {
+        "fast": RacecarSimServer(
+            tick_rate=0,
+            max_frames=FAST_FRAMES,
+            shared_memory=False,
+            port=FAST_PORTS[0],
+            async_port=FAST_PORTS[1],
+        ),
+        "slow": RacecarSimServer(
+            tick_rate=2,
+            max_frames=SLOW_FRAMES,
+            shared_memory=False,
+            port=SLOW_PORTS[0],
+            async_port=SLOW_PORTS[1],
+        ),
+    }
+    drives: Dict[str, Tuple[float, float, float]] = {}
+    updates: List[Tuple[str, float]] = []
+    for server in servers.values():
+        server.start()
+    try:
+        mux = RacecarMux(max_workers=1)
+        cars = {
+            "fast": make_car(mux, "fast", FAST_PORTS, 0.5, updates),
+            "slow": make_car(mux, "slow", SLOW_PORTS, -0.25, updates),
+        }
+        mux.go()
+        for name, server in servers.items():
+            assert server.wait(5)
+            drives[name] = server.get_drive(cars[name].get_car_index())
+    finally:
+        for server in servers.values():
+            server.stop()
+
+    # Each car was started and updated by its own server, and drove only its own car
+    names = [name for name, _ in updates]
+    assert names.count("fast") == FAST_FRAMES - 1
+    assert names.count("slow") == SLOW_FRAMES - 1
+    assert drives["fast"][:2] == (0.5, 0)
+    assert drives["slow"][:2] == (-0.25, 0)
+
+    # The slow server sends a frame every half second, but the fast car finished
+    # every frame before the slow car's last update
+    last_slow = max(update_time for name, update_time in updates if name == "slow")
+    assert max(update_time for name, update_time in updates if name == "fast") < (
+        last_slow
+    )
+
+
+def test_closes_each_car_sensor_ring_on_exit() -> None:
+    server = RacecarSimServer(
+        tick_rate=0, max_frames=5, port=FAST_PORTS[0], async_port=FAST_PORTS[1]
+    )
+    server.start()
+    try:
+        mux = RacecarMux(max_workers=1)
+        racecar = make_car(mux, "fast", FAST_PORTS, 0.5, [])
+        racecar.set_shared_memory_mode()
+        opened: List[bool] = []
+        update = racecar._RacecarSim__update
+
+        def update_and_check() -> None:
+            update()
+            opened.append(racecar._RacecarSim__shared_memory is not None)
+
+        racecar.set_start_update(lambda: None, update_and_check)
+        mux.go()
+        assert server.wait(5)
+    finally:
+        server.stop()
+
+    assert opened and all(opened)
+    assert racecar._RacecarSim__shared_memory is None
@@ -0,0 +1,78 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests replaying a log recorded by SensorLogWriter through ReplayLog.
+"""
+
+import os
+
+import numpy as np
+
+from replay_log import ReplayLog
+from sensor_log import SensorLogWriter
+
+NUM_FRAMES = 6
+
+
+def write_log(path: str) -> None:
+    """
+    Writes a log whose color images are halved in size partway through, as after
+    set_processing_scale, and whose IMU is only recorded in odd frames.
+    """
+    writer = SensorLogWriter(path, chunk_frames=4)
+    for frame in range(NUM_FRAMES):
+        size = (480, 640) if frame < NUM_FRAMES // 2 else (240, 320)
+        writer.log_frame(
+            frame / 60,
+            1 / 60,
+            color=np.full(size + (3,), 10 * frame, np.uint8),
+            depth=np.full((60, 80), frame, np.float32),
+            lidar=np.full(720, 100 + frame, np.float32),
+            physics=(frame, 0, 0, 0, -frame, 0) if frame % 2 else None,
+            drive=(0.5, -0.25),
+        )
+    writer.close()
+
+
+def test_replays_a_sensor_log_recorded_with_l(tmp_path) -> None:
+    path = str(tmp_path / "log")
+    write_log(path)
+
+    log = ReplayLog(path)
+    assert log.num_frames == NUM_FRAMES
+    assert np.allclose(log.get("delta_time"), 1 / 60)
+
+    # Every color image is stored at the size of the first one
+    color = log.get("color")
+    assert color.shape == (NUM_FRAMES, 480, 640, 3)
+    for frame in range(NUM_FRAMES):
+        assert abs(int(color[frame].mean()) - 10 * frame) <= 2
+
+    assert np.array_equal(log.get("depth")[:, 0, 0], np.arange(NUM_FRAMES))
+    assert np.array_equal(log.get("lidar")[:, 0], 100 + np.arange(NUM_FRAMES))
+    assert np.allclose(log.get("drive"), (0.5, -0.25))
+
+    # Frames in which the IMU was not recorded replay as zeros
+    assert np.array_equal(log.get("linear_acceleration")[:, 0], [0, 1, 0, 3, 0, 5])
+    assert np.array_equal(log.get("angular_velocity")[:, 1], [0, -1, 0, -3, 0, -5])
+    assert log.get("controller_buttons") is None
+
+
+def test_reuses_the_export_until_the_log_is_written_again(tmp_path) -> None:
+    path = str(tmp_path / "log")
+    write_log(path)
+    ReplayLog(path)
+
+    export = os.path.join(path, "replay", "delta_time.npy")
+    exported = os.path.getmtime(export)
+    ReplayLog(path)
+    assert os.path.getmtime(export) == exported
+    assert not os.path.exists(os.path.join(path, "replay.partial"))
+
+    # Writing the log again exports it again
+    write_log(path)
+    os.utime(os.path.join(path, "index.bin"), (exported + 10, exported + 10))
+    assert ReplayLog(path).num_frames == NUM_FRAMES
+    assert os.path.getmtime(export) > exported
@@ -0,0 +1,71 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests writing a sensor log with SensorLogWriter and reading it back with
+SensorLogReader.
+"""
+
+import numpy as np
+
+from sensor_log import SensorLogReader, SensorLogWriter
+
+NUM_FRAMES = 10
+
+
+def test_reads_back_each_frame_across_chunks(tmp_path) -> None:
+    path = str(tmp_path / "log")
+    writer = SensorLogWriter(path, chunk_frames=3, pool_size=NUM_FRAMES)
+    for frame in range(NUM_FRAMES):
+        writer.log_frame(
+            frame / 60,
+            1 / 60,
+            color=np.full((48, 64, 3), 20 * frame, np.uint8),
+            depth=np.arange(12, dtype=np.float64).reshape(3, 4) + frame,
+            lidar=np.full(720, frame, np.float32),
+            physics=(frame, 1, 2, 3, 4, -frame),
+            controller=(frame, 1, 2, 0.5, -0.5, 0.25, -0.25, 1, -1),
+            drive=(0.5, -frame / 10),
+        )
+    writer.close()
+    assert writer.frames_written == NUM_FRAMES
+    assert writer.frames_dropped == 0
+
+    reader = SensorLogReader(path)
+    assert reader.num_frames == NUM_FRAMES
+    assert np.allclose(reader.get_timestamps(), np.arange(NUM_FRAMES) / 60)
+    assert reader.find(4.5 / 60) == 5
+
+    for frame in range(NUM_FRAMES):
+        data = reader.read(frame)
+        assert data["timestamp"] == frame / 60
+        assert np.isclose(data["delta_time"], 1 / 60)
+
+        # Color images are JPEG encoded, so are only approximately restored
+        assert data["color"].shape == (48, 64, 3)
+        assert abs(int(data["color"].mean()) - 20 * frame) <= 2
+
+        # Depth images are stored as float32 at their own resolution
+        assert data["depth"].dtype == np.float32
+        assert np.array_equal(data["depth"], np.arange(12).reshape(3, 4) + frame)
+        assert np.array_equal(data["lidar"], np.full(720, frame))
+        assert np.array_equal(data["linear_acceleration"], [frame, 1, 2])
+        assert np.array_equal(data["angular_velocity"], [3, 4, -frame])
+        assert data["controller_buttons"].tolist() == [frame, 1, 2]
+        assert np.array_equal(data["controller_axes"], [0.5, -0.5, 0.25, -0.25, 1, -1])
+        assert np.allclose(data["drive"], (0.5, -frame / 10))
+
+
+def test_leaves_out_sensors_which_were_not_fetched(tmp_path) -> None:
+    path = str(tmp_path / "log")
+    writer = SensorLogWriter(path)
+    writer.log_frame(0.0, 0.0, lidar=np.ones(720, np.float32))
+    writer.log_frame(0.1, 0.1, color=np.zeros((0, 0, 3), np.uint8), drive=(1, 0))
+    writer.close()
+
+    reader = SensorLogReader(path)
+    assert set(reader.read(0)) == {"timestamp", "delta_time", "lidar"}
+
+    # Empty images are not recorded
+    assert set(reader.read(1)) == {"timestamp", "delta_time", "drive"}
@@ -0,0 +1,98 @@
+"""
+Copyright MIT and Harvey Mudd College
+MIT License
+Summer 2020
+
+Tests the windowed fragment protocol against the stand-in RacecarSim server, with
+fragments which are dropped, or duplicated after their transfer is complete.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+
+from racecar_core_sim import RacecarSim
+from racecar_sim_server import RacecarSimServer, SyntheticSensors
+
+NUM_FRAMES = 20
+
+
+def run(mode: str, **options) -> Tuple[RacecarSimServer, List[str], List[str]]:
+    """
+    Reads every sensor each frame from a stand-in server created with options, and
+    returns the server, the mode of each update, and each mismatched reading.
+    """
+    server = RacecarSimServer(
+        tick_rate=0, max_frames=NUM_FRAMES, shared_memory=False, **options
+    )
+
+    # The car never drives, so every frame of the synthetic hallway is the same
+    expected = SyntheticSensors().read(0, 0, 0)
+    mismatches: List[str] = []
+
+    def check(angular_velocity, lidar, depth, color) -> None:
+        if not np.allclose(angular_velocity, expected.angular_velocity):
+            mismatches.append("angular_velocity")
+        if not np.array_equal(lidar, expected.lidar):
+            mismatches.append("lidar")
+        if not np.array_equal(depth, expected.depth):
+            mismatches.append("depth")
+        if color.shape != (480, 640, 3) or color[0, 0].tolist() != [255, 255, 255]:
+            mismatches.append("color")
+
+    server.start()
+    try:
+        rc = RacecarSim(True)
+        rc.set_protocol_negotiation()
+        rc.set_snapshot_mode(mode == "snapshot")
+        updates = []
+
+        # The IMU is read first, since without snapshot mode it is requested in a
+        # single fragment snapshot, whose duplicate is shorter than a lidar reply
+        if mode == "async":
+
+            async def update() -> None:
+                angular_velocity = await rc.physics.fetch_angular_velocity()
+                lidar = await rc.lidar.fetch_samples()
+                depth, _ = await rc.camera.fetch_depth_image_native()
+                color = await rc.camera.fetch_color_image_no_copy()
+                check(angular_velocity, lidar, depth, color)
+                updates.append(mode)
+
+        else:
+
+            def update() -> None:
+                angular_velocity = rc.physics.get_angular_velocity()
+                lidar = rc.lidar.get_samples()
+                depth, _ = rc.camera.get_depth_image_native()
+                color = rc.camera.get_color_image_no_copy()
+                check(angular_velocity, lidar, depth, color)
+                updates.append(mode)
+
+        rc.set_start_update(lambda: None, update)
+        rc.go()
+        assert server.wait(5)
+    finally:
+        server.stop()
+    return server, updates, mismatches
+
+
+@pytest.mark.parametrize("mode", ["sync", "snapshot", "async"])
+def test_skips_fragments_which_arrive_after_their_transfer(mode: str) -> None:
+    server, updates, mismatches = run(mode, duplicate_rate=0.5)
+
+    assert server.fragments_duplicated > 0
+    assert len(updates) == NUM_FRAMES - 1
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("mode", ["sync", "snapshot", "async"])
+def test_recovers_dropped_fragments(mode: str) -> None:
+    server, updates, mismatches = run(mode, drop_rate=0.1)
+
+    # Each dropped fragment is resent once it is reported missing or times out
+    assert server.fragments_dropped > 0
+    assert server.fragments_resent >= server.fragments_dropped
+    assert len(updates) == NUM_FRAMES - 1
+    assert mismatches == []